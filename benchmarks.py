@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Microbenchmarks for the lxa5 components.
+#
+#    Each benchmark times a current code path against the one it replaced
+#    (or against alternatives), and checks that they give the same results.
+#    Run "python3 benchmarks.py -h" for the list of benchmarks.
+#
+#------------------------------------------------------------------------------#
+
+import argparse
+import io
+import json
+import pickle
+import random
+import re
+import time
+from itertools import groupby
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse
+
+from lxa5lib import (sorted_alphabetized, json_pdump, json_pload)
+from manifold_module import (Normalize, compute_incidence_graph,
+                             compute_laplacian, compute_coordinates,
+                             compute_diameter,
+                             compute_shared_contexts_laplacian)
+from tokenizer import get_tokenizer
+
+
+def best_time(function, *args, repeat=3):
+    """Return (best wall time in seconds, result) over repeat calls."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def print_timings(title, timings):
+    """timings is a list of (label, seconds); the first one is the baseline"""
+    print("\n" + title)
+    baseline = timings[0][1]
+    for label, seconds in timings:
+        print("    {:40} {:10.4f} s  x{:.1f}".format(label, seconds,
+                                                   baseline / seconds))
+
+
+#------------------------------------------------------------------------------#
+#    tokenizer
+#------------------------------------------------------------------------------#
+
+def legacy_tokenize(lines):
+    """the str.replace path formerly used by ngrams.main"""
+    sentences = list()
+    for line in lines:
+        line = line.strip().casefold()
+        line = line.replace(".", " . ")
+        line = line.replace(",", " , ")
+        line = line.replace(";", " ; ")
+        line = line.replace("!", " ! ")
+        line = line.replace("?", " ? ")
+        line = line.replace(":", " : ")
+        line = line.replace(")", " ) ")
+        line = line.replace("(", " ( ")
+        sentences.append(line.split())
+    return sentences
+
+
+def regex_tokenize(lines, punctuation):
+    """single-pass alternative: one compiled regex per line"""
+    chars = re.escape(punctuation)
+    findall = re.compile(r"[{0}]|[^\s{0}]+".format(chars)).findall
+    return [findall(line.casefold()) for line in lines]
+
+
+def translate_tokenize(lines, punctuation):
+    """single-pass alternative: one str.translate table per line"""
+    table = str.maketrans({char: " " + char + " " for char in punctuation})
+    return [line.casefold().translate(table).split() for line in lines]
+
+
+def bench_tokenizer(args):
+    with Path(args.corpus).open() as f:
+        lines = f.read().split("\n")
+
+    tokenizer = get_tokenizer(args.language)
+    punctuation = tokenizer.punctuation
+
+    timings = list()
+    legacy_time, legacy_result = best_time(legacy_tokenize, lines,
+                                           repeat=args.repeat)
+    timings.append(("str.replace x 8 + split per line", legacy_time))
+
+    for label, function in [
+            ("compiled regex per line",
+             lambda x: regex_tokenize(x, punctuation)),
+            ("str.translate per line",
+             lambda x: translate_tokenize(x, punctuation)),
+            ("Tokenizer.tokenize_lines",
+             lambda x: list(tokenizer.tokenize_lines(x)))]:
+        seconds, result = best_time(function, lines, repeat=args.repeat)
+        timings.append((label, seconds))
+        if args.language is None and result != legacy_result:
+            print("WARNING: {} gives different tokens".format(label))
+
+    print_timings("tokenizer ({} lines)".format(len(lines)), timings)
+
+
+#------------------------------------------------------------------------------#
+#    sorted_alphabetized
+#------------------------------------------------------------------------------#
+
+def legacy_sorted_alphabetized(input_object, key=lambda x: x, reverse=False,
+                               subkey=lambda x: x, subreverse=False):
+    """the groupby implementation formerly in lxa5lib"""
+    if not input_object:
+        return
+    sorted_list = sorted(input_object, key=key, reverse=reverse)
+    sorted_list_with_key_values = [(key(item), item) for item in sorted_list]
+    output_list = list()
+    for _, group in groupby(sorted_list_with_key_values, key=lambda x: x[0]):
+        output_list.extend(sorted([item for _, item in group],
+                                  key=subkey, reverse=subreverse))
+    return output_list
+
+
+def composite_sorted(input_object, key, reverse, subkey):
+    """single-sort alternative: a (key, subkey) tuple for each item"""
+    if reverse:
+        return sorted(input_object, key=lambda x: (-key(x), subkey(x)))
+    return sorted(input_object, key=lambda x: (key(x), subkey(x)))
+
+
+def two_pass_sorted(input_object, key, reverse, subkey):
+    """alternative: two stable full sorts, by subkey and then by key"""
+    sorted_list = sorted(input_object, key=subkey)
+    sorted_list.sort(key=key, reverse=reverse)
+    return sorted_list
+
+
+def bench_sort(args):
+    rng = random.Random(args.seed)
+    words = ["w{}".format(i) for i in range(args.rows)]
+    rng.shuffle(words)
+
+    # (word, count) pairs like ngrams.main sorts: a few large groups of
+    # low counts, and many small groups of high counts
+    inputs = [("pareto counts", [(word, int(rng.paretovariate(1.0)))
+                                 for word in words]),
+              ("{} distinct counts".format(args.rows // 10),
+               [(word, rng.randrange(args.rows // 10)) for word in words])]
+
+    key = lambda x: x[1]
+
+    for title, items in inputs:
+        timings = list()
+        legacy_time, legacy_result = best_time(
+            lambda x: legacy_sorted_alphabetized(x, key=key, reverse=True),
+            items, repeat=args.repeat)
+        timings.append(("groupby + sort per group", legacy_time))
+
+        for label, function, expected in [
+                ("composite (key, subkey) tuple",
+                 lambda x: composite_sorted(x, key, True, lambda x: x),
+                 legacy_result),
+                ("two stable sorts (subkey, key)",
+                 lambda x: two_pass_sorted(x, key, True, lambda x: x),
+                 legacy_result),
+                ("sorted_alphabetized",
+                 lambda x: sorted_alphabetized(x, key=key, reverse=True),
+                 legacy_result),
+                ("sorted_alphabetized, top={}".format(args.top),
+                 lambda x: sorted_alphabetized(x, key=key, reverse=True,
+                                               top=args.top),
+                 legacy_result[:args.top])]:
+            seconds, result = best_time(function, items, repeat=args.repeat)
+            timings.append((label, seconds))
+            if result != expected:
+                print("WARNING: {} gives a different order".format(label))
+
+        print_timings("sort {} ({} rows)".format(title, len(items)), timings)
+
+
+#------------------------------------------------------------------------------#
+#    json_pdump / json_pload
+#------------------------------------------------------------------------------#
+
+def legacy_json_pdump(inputdict, outfile):
+    """the str() repr dump formerly in lxa5lib"""
+    json.dump({str(k): str(v) for k, v in inputdict.items()}, outfile,
+              ensure_ascii=False, indent=4, separators=(',', ': '))
+
+
+def legacy_json_pload(infile):
+    """the eval-based load formerly in lxa5lib"""
+    outdict = json.load(infile)
+
+    try:
+        _keys = [eval(k) for k in outdict.keys()]
+    except (NameError, SyntaxError):
+        convertkeys = False
+    else:
+        convertkeys = True
+
+    try:
+        _values = [eval(v) for v in outdict.values()]
+    except (NameError, SyntaxError):
+        convertvalues = False
+    else:
+        convertvalues = True
+
+    if convertkeys and convertvalues:
+        return {eval(k):eval(v) for k, v in outdict.items()}
+    elif convertkeys:
+        return {eval(k):v for k, v in outdict.items()}
+    elif convertvalues:
+        return {k:eval(v) for k, v in outdict.items()}
+    else:
+        return {k:v for k, v in outdict.items()}
+
+
+def make_word_to_sigtransforms(nwords, seed):
+    """a random dict like lxa5's WordToSigtransforms:
+    word -> set of (signature, affix)"""
+    rng = random.Random(seed)
+    affixes = ["NULL", "s", "ed", "ing", "er", "ers", "ly", "ness", "es", "d"]
+    sigs = [tuple(sorted(rng.sample(affixes, rng.randint(2, 6))))
+            for _ in range(2000)]
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    WordToSigtransforms = dict()
+    for _ in range(nwords):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(3, 12)))
+        transforms = set()
+        for sig in rng.sample(sigs, rng.randint(1, 4)):
+            transforms.add((sig, rng.choice(sig)))
+        WordToSigtransforms[word] = transforms
+    return WordToSigtransforms
+
+
+def bench_json(args):
+    WordToSigtransforms = make_word_to_sigtransforms(args.words, args.seed)
+
+    legacy_file = io.StringIO()
+    legacy_json_pdump(WordToSigtransforms, legacy_file)
+    typed_file = io.StringIO()
+    json_pdump(WordToSigtransforms, typed_file)
+    pickled = pickle.dumps(WordToSigtransforms, protocol=5)
+
+    timings = list()
+    for label, function, data in [
+            ("eval-based json_pload (former)",
+             lambda x: legacy_json_pload(io.StringIO(x)),
+             legacy_file.getvalue()),
+            ("json_pload, former files",
+             lambda x: json_pload(io.StringIO(x)),
+             legacy_file.getvalue()),
+            ("json_pload, typed json",
+             lambda x: json_pload(io.StringIO(x)),
+             typed_file.getvalue()),
+            ("pickle protocol 5 (for comparison)",
+             pickle.loads, pickled)]:
+        seconds, result = best_time(function, data, repeat=args.repeat)
+        timings.append((label, seconds))
+        if result != WordToSigtransforms:
+            print("WARNING: {} gives a different dict".format(label))
+
+    print_timings("load WordToSigtransforms ({} words)".format(args.words),
+                  timings)
+
+
+#------------------------------------------------------------------------------#
+#    manifold laplacian
+#------------------------------------------------------------------------------#
+
+def legacy_Normalize(NumberOfWordsForAnalysis, CountOfSharedContexts):
+    """the per-word loop formerly in manifold_module"""
+    arr = np.ones((NumberOfWordsForAnalysis), dtype=np.int64)
+    for word_no in range(NumberOfWordsForAnalysis):
+        arr[word_no] = np.sum(CountOfSharedContexts[word_no]) - \
+                       CountOfSharedContexts[word_no, word_no]
+    return arr
+
+
+def legacy_compute_incidence_graph(NumberOfWordsForAnalysis, Diameter,
+                                   CountOfSharedContexts):
+    """the per-word loop formerly in manifold_module"""
+    incidencegraph= np.asarray(CountOfSharedContexts, dtype=np.int64)
+    for word_no in range(NumberOfWordsForAnalysis):
+        incidencegraph[word_no, word_no] = Diameter[word_no]
+    return incidencegraph
+
+
+def legacy_compute_laplacian(NumberOfWordsForAnalysis, Diameter,
+                             incidencegraph):
+    """the n x n np.outer version formerly in manifold_module"""
+    D = np.sqrt(np.outer(Diameter, Diameter))
+    D[D==0] = 1
+    return (1/D) * incidencegraph
+
+
+def legacy_compute_coordinates(NumberOfWordsForAnalysis, NumberOfEigenvectors,
+                               myeigenvectors):
+    """the element by element dict of lists formerly in manifold_module"""
+    Coordinates = dict()
+    for wordno in range(NumberOfWordsForAnalysis):
+        Coordinates[wordno]= list()
+        for eigenno in range(NumberOfEigenvectors):
+            Coordinates[wordno].append( myeigenvectors[ wordno, eigenno ] )
+    return Coordinates
+
+
+def make_context_array(nwords, contexts_per_word, frequent, seed):
+    """a random word-context matrix like the one of
+    manifold_module.GetContextArray: a Zipfian number of contexts per
+    word, the given fraction of them from a few frequent contexts shared
+    by many words (Zipfian too), and the others from the rare ones"""
+    rng = np.random.default_rng(seed)
+    ncontexts = nwords * contexts_per_word
+    counts = np.minimum(rng.zipf(1.5, nwords), 50 * contexts_per_word)
+    word_nos = np.repeat(np.arange(nwords), counts)
+    context_nos = np.where(rng.random(len(word_nos)) < frequent,
+                           np.minimum(rng.zipf(1.5, len(word_nos)),
+                                      ncontexts) - 1,
+                           rng.integers(0, ncontexts, len(word_nos)))
+    context_array = scipy.sparse.csr_matrix(
+                        (np.ones(len(word_nos), dtype=np.int64),
+                         (word_nos, context_nos)),
+                        shape=(nwords, ncontexts), dtype=np.int64)
+    context_array.data[:] = 1
+    return context_array
+
+
+def bench_laplacian(args):
+    for nwords in args.words:
+        context_array = make_context_array(nwords, args.contexts,
+                                           args.frequent, args.seed)
+        CountOfSharedContexts = context_array.dot(context_array.T).tocsr()
+        dense = nwords <= args.dense_limit
+        if dense:
+            DenseCountOfSharedContexts = CountOfSharedContexts.toarray()
+        title = "{} words, {} shared-context entries".format(
+                    nwords, CountOfSharedContexts.nnz)
+        if not dense:
+            title += " (former dense path skipped: --dense-limit)"
+
+        # diameter
+        timings = list()
+        Diameter = Normalize(nwords, CountOfSharedContexts)
+        stages = list()
+        if dense:
+            stages += [("per-word loop, dense (former)", legacy_Normalize,
+                        (nwords, DenseCountOfSharedContexts)),
+                       ("Normalize, dense", Normalize,
+                        (nwords, DenseCountOfSharedContexts))]
+        stages += [("Normalize, sparse", Normalize,
+                    (nwords, CountOfSharedContexts)),
+                   ("compute_diameter, context array", compute_diameter,
+                    (context_array,))]
+        for label, function, function_args in stages:
+            seconds, result = best_time(function, *function_args,
+                                        repeat=args.repeat)
+            timings.append((label, seconds))
+            if not np.array_equal(result, Diameter):
+                print("WARNING: {} gives different diameters".format(label))
+        print_timings("diameter ({})".format(title), timings)
+
+        # incidence graph; replacing the diagonal again gives the same matrix
+        timings = list()
+        stages = list()
+        if dense:
+            stages += [("per-word loop, dense (former)",
+                        legacy_compute_incidence_graph,
+                        (nwords, Diameter, DenseCountOfSharedContexts)),
+                       ("np.fill_diagonal, dense", compute_incidence_graph,
+                        (nwords, Diameter, DenseCountOfSharedContexts))]
+        stages += [("stored diagonal entries, sparse",
+                    compute_incidence_graph,
+                    (nwords, Diameter, CountOfSharedContexts))]
+        for label, function, function_args in stages:
+            seconds, result = best_time(function, *function_args,
+                                        repeat=args.repeat)
+            timings.append((label, seconds))
+        incidencegraph = CountOfSharedContexts
+        if dense and not np.array_equal(DenseCountOfSharedContexts,
+                                        incidencegraph.toarray()):
+            print("WARNING: the incidence graphs are different")
+        print_timings("incidence graph ({})".format(title), timings)
+
+        # laplacian
+        timings = list()
+        stages = list()
+        if dense:
+            stages += [("np.outer, dense (former)", legacy_compute_laplacian,
+                        (nwords, Diameter, DenseCountOfSharedContexts)),
+                       ("row blocks, dense", compute_laplacian,
+                        (nwords, Diameter, DenseCountOfSharedContexts))]
+        stages += [("row blocks, sparse", compute_laplacian,
+                    (nwords, Diameter, incidencegraph)),
+                   ("compute_shared_contexts_laplacian",
+                    lambda x: compute_shared_contexts_laplacian(x,
+                                                memory=args.memory),
+                    (context_array,))]
+        laplacian = compute_laplacian(nwords, Diameter, incidencegraph)
+        for label, function, function_args in stages:
+            seconds, result = best_time(function, *function_args,
+                                        repeat=args.repeat)
+            timings.append((label, seconds))
+            if scipy.sparse.issparse(result):
+                different = (result != laplacian).nnz
+            else:
+                different = not np.array_equal(result, laplacian.toarray())
+            if different:
+                print("WARNING: {} gives a different laplacian".format(label))
+        print_timings("laplacian ({})".format(title), timings)
+
+        if dense:
+            del DenseCountOfSharedContexts, result
+        del CountOfSharedContexts, incidencegraph, laplacian
+
+        # coordinates
+        eigenvectors = np.random.default_rng(args.seed).random(
+                            (nwords, args.eigenvectors))
+        timings = list()
+        expected = None
+        for label, function in [
+                ("element by element (former)", legacy_compute_coordinates),
+                ("compute_coordinates", compute_coordinates)]:
+            seconds, result = best_time(function, nwords, args.eigenvectors,
+                                        eigenvectors, repeat=args.repeat)
+            timings.append((label, seconds))
+            if expected is None:
+                expected = result
+            elif result != expected:
+                print("WARNING: {} gives different coordinates".format(label))
+        print_timings("coordinates ({} words, {} eigenvectors)".format(
+                        nwords, args.eigenvectors), timings)
+
+
+#------------------------------------------------------------------------------#
+
+def makeArgParser():
+    parser = argparse.ArgumentParser(
+        description="Microbenchmarks for the lxa5 components.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--repeat", help="number of timed runs; "
+                        "the best one is reported",
+                        type=int, default=3)
+
+    subparsers = parser.add_subparsers(title="benchmarks", dest="benchmark")
+
+    tokenizer_parser = subparsers.add_parser("tokenizer",
+        help="tokenizer.Tokenizer against the former str.replace path",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    tokenizer_parser.add_argument("corpus", help="path of a corpus text file",
+                                  type=str)
+    tokenizer_parser.add_argument("--language", help="Language name",
+                                  type=str, default=None)
+    tokenizer_parser.set_defaults(func=bench_tokenizer)
+
+    sort_parser = subparsers.add_parser("sort",
+        help="lxa5lib.sorted_alphabetized against the former groupby version",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    sort_parser.add_argument("--rows", help="number of (word, count) items",
+                             type=int, default=1000000)
+    sort_parser.add_argument("--top", help="N for the top-N path",
+                             type=int, default=1000)
+    sort_parser.add_argument("--seed", help="random seed",
+                             type=int, default=0)
+    sort_parser.set_defaults(func=bench_sort)
+
+    json_parser = subparsers.add_parser("json",
+        help="lxa5lib.json_pload against the former eval-based version",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    json_parser.add_argument("--words", help="number of words in the "
+                             "WordToSigtransforms-like dict",
+                             type=int, default=100000)
+    json_parser.add_argument("--seed", help="random seed",
+                             type=int, default=0)
+    json_parser.set_defaults(func=bench_json)
+
+    laplacian_parser = subparsers.add_parser("laplacian",
+        help="the stages of the manifold laplacian (diameter, incidence "
+             "graph, laplacian, coordinates) against the former loops",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    laplacian_parser.add_argument("--words", help="numbers of word types",
+                                  type=int, nargs="+",
+                                  default=[1000, 5000, 20000])
+    laplacian_parser.add_argument("--contexts", help="number of contexts "
+                                  "per word type",
+                                  type=int, default=20)
+    laplacian_parser.add_argument("--frequent", help="fraction of the "
+                                  "word-context pairs with frequent contexts",
+                                  type=float, default=0.1)
+    laplacian_parser.add_argument("--eigenvectors",
+                                  help="number of eigenvectors",
+                                  type=int, default=11)
+    laplacian_parser.add_argument("--dense-limit", help="largest number of "
+                                  "word types for the dense n x n matrices",
+                                  type=int, default=5000)
+    laplacian_parser.add_argument("--memory", help="memory budget (in MB) "
+                                  "of compute_shared_contexts_laplacian",
+                                  type=int, default=256)
+    laplacian_parser.add_argument("--seed", help="random seed",
+                                  type=int, default=0)
+    laplacian_parser.set_defaults(func=bench_laplacian)
+
+    return parser
+
+
+if __name__ == "__main__":
+
+    parser = makeArgParser()
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+    else:
+        args.func(args)
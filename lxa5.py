@@ -7,21 +7,25 @@
 #------------------------------------------------------------------------------#
 
 import argparse
+from collections import OrderedDict
+import multiprocessing
 import time
 from pathlib import Path
+from itertools import takewhile
 import sys
 
 from lxa5_module import (read_word_freq_file, MakeBiSignatures,
-                         MakeStemToWords,
-                         MakeSigToStems, MakeAffixToSigs,
-                         MakeStemToSig, MakeWordToSigs,
-                         MakeWordToSigtransforms)
+                         MakeBiSignaturesIncrementally,
+                         MakeMorphologyRelations)
 
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list, OutputLargeDict,
                      load_config_for_command_line_help,
                      determine_use_corpus, read_word_freq,
-                     sorted_alphabetized, get_wordlist_path_corpus_stem)
+                     sorted_alphabetized, get_wordlist_path_corpus_stem,
+                     open_output, output_path, write_rows, StageTimer,
+                     COMPRESSION_SUFFIXES)
+from stage_cache import get_stage_cache, source_files
 
 import ngrams
 
@@ -73,6 +77,22 @@ def makeArgParser(configfilename="config.json"):
                         " if this is zero, then the program counts "
                         "all word tokens in the corpus",
                         type=int, default=0)
+    parser.add_argument("--compress", help="compress the .txt outputs "
+                        "(xxx.txt.gz or xxx.txt.zst)",
+                        choices=sorted(COMPRESSION_SUFFIXES), default=None)
+    parser.add_argument("--workers", help="number of processes finding "
+                        "bisignatures in parallel; each one works on "
+                        "blocks of words sharing their first minstem letters",
+                        type=int, default=1)
+    parser.add_argument("--incremental", help="reuse the bisignatures saved "
+                        "by the previous incremental run and analyze only "
+                        "the blocks of words (sharing their first minstem "
+                        "letters) which have changed since then",
+                        action="store_true")
+    parser.add_argument("--no-cache", help="run even if the wordlist and "
+                        "the parameters are the same as in the last run "
+                        "(see stage_cache.py)",
+                        action="store_true")
     return parser
 
 # remove this function?
@@ -87,17 +107,8 @@ def create_wordlist(language, filename, datafolder,
     return wordlist, word_freq_dict
 
 
-def main(language=None, corpus=None, datafolder=None, filename=None,
-         MinimumStemLength=4, MaximumAffixLength=3, MinimumNumberofSigUses=5,
-         maxwordtokens=0, use_corpus=True):
-
-    print("\n*****************************************************\n"
-          "Running the lxa5.py program now...\n")
-
-    # -------------------------------------------------------------------------#
-    #       decide suffixing or prefixing
-    # -------------------------------------------------------------------------#
-
+def get_find_suffixes_flag(language):
+    """Decide suffixing or prefixing: return False for a prefixal language"""
     suffix_languages = {"english",
                         "french",
                         "hungarian",
@@ -109,15 +120,26 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     prefix_languages = {"swahili"}
 
     if str(language).casefold() in prefix_languages:
-        FindSuffixesFlag = False  # prefixal
+        return False  # prefixal
     else:
-        FindSuffixesFlag = True  # suffixal
+        return True  # suffixal
+
 
+def find_wordlist(language, corpus, datafolder, filename, maxwordtokens,
+                  use_corpus):
+    """Return (wordlist_path, corpus_stem); ngrams.py is run to make the
+    wordlist if it is not found, or if the corpus file has changed"""
     wordlist_path, corpus_stem = get_wordlist_path_corpus_stem(language, corpus,
                                 datafolder, filename, maxwordtokens, use_corpus)
 
     print("wordlist file path:\n{}\n".format(wordlist_path))
 
+    if use_corpus and wordlist_path.exists():
+        # make the wordlist again if the corpus file has changed since then
+        ngrams.remake_if_stale(language=language, corpus=corpus,
+                               datafolder=datafolder, filename=filename,
+                               maxwordtokens=maxwordtokens)
+
     if not wordlist_path.exists():
         if use_corpus:
             if maxwordtokens:
@@ -133,9 +155,11 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
             sys.exit("\nThe specified wordlist ""\n"
                      "is not found.".format(wordlist_path))
 
-    wordFreqDict = read_word_freq(wordlist_path)
-    wordlist = sorted(wordFreqDict.keys())
+    return wordlist_path, corpus_stem
+
 
+def get_outfolder(language, datafolder, filename):
+    """Return the "lxa" output folder, which is made if needed"""
     if filename:
         outfolder = Path(Path(filename).parent, "lxa")
     else:
@@ -144,59 +168,21 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     if not outfolder.exists():
         outfolder.mkdir(parents=True)
 
-    # TODO -- filenames not yet used in main()
-    outfile_Signatures_name = str(outfolder) + corpus_stem + "_Signatures.txt"
-    outfile_SigTransforms_name = str(outfolder) + corpus_stem + "_SigTransforms.txt"
-    outfile_FSA_name = str(outfolder) + corpus_stem + "_FSA.txt"
-    outfile_FSA_graphics_name = str(outfolder) + corpus_stem + "_FSA_graphics.png"
-
-    # -------------------------------------------------------------------------#
-    #   create: BisigToTuple
-    #                  (key: tuple of bisig | value: set of (stem, word1, word2)
-    #           StemToWords (key: stem | value: set of words)
-    #           SigToStems  (key: tuple of sig | value: set of stems )
-    #           StemToSig   (key: str of stem  | value: tuple of sig )
-    #           WordToSigs  (key: str of word  | value: set of sigs )
-    #           AffixToSigs (key: str of affix | value: set of sigs )
-    # -------------------------------------------------------------------------#
+    return outfolder
 
-    BisigToTuple = MakeBiSignatures(wordlist, MinimumStemLength,
-                                    MaximumAffixLength, FindSuffixesFlag)
-    print("BisigToTuple ready", flush=True)
 
-    StemToWords = MakeStemToWords(BisigToTuple, MinimumNumberofSigUses)
-    print("StemToWords ready", flush=True)
-
-    SigToStems = MakeSigToStems(StemToWords, MaximumAffixLength,
-                                MinimumNumberofSigUses, FindSuffixesFlag)
-    print("SigToStems ready", flush=True)
-
-    StemToSig = MakeStemToSig(SigToStems)
-    print("StemToSig ready", flush=True)
-
-    WordToSigs = MakeWordToSigs(StemToWords, StemToSig)
-    print("WordToSigs ready", flush=True)
-
-    WordToSigtransforms = MakeWordToSigtransforms(WordToSigs)
-    print("WordToSigtransforms ready", flush=True)
-
-    AffixToSigs = MakeAffixToSigs(SigToStems)
-    print("AffixToSigs ready", flush=True)
-
-    # -------------------------------------------------------------------------#
-    #   generate graphs for several dicts
-    # -------------------------------------------------------------------------#
-    #    GenerateGraphFromDict(StemToWords, outfolder, 'StemToWords.gexf')
-    #    GenerateGraphFromDict(SigToStems, outfolder, 'SigToStems.gexf')
-    #    GenerateGraphFromDict(WordToSigs, outfolder, 'WordToSigs.gexf')
-    #    GenerateGraphFromDict(StemToSig, outfolder, 'StemToSig.gexf')
-    # -------------------------------------------------------------------------#
+def output_morphology(outfolder, corpus_stem, wordFreqDict, StemToWords,
+                      SigToStems, WordToSigs, WordToSigtransforms, AffixToSigs,
+                      compress=None):
+    """Write the output files of the morphology, and return their paths"""
 
     # -------------------------------------------------------------------------#
     #      output stem file
     # -------------------------------------------------------------------------#
 
-    stemfilename = Path(outfolder, '{}_StemToWords.txt'.format(corpus_stem))
+    stemfilename = output_path(Path(outfolder,
+                               '{}_StemToWords.txt'.format(corpus_stem)),
+                               compress)
     OutputLargeDict(stemfilename, StemToWords, key=lambda x: len(x[1]),
                     reverse=True,
                     min_cell_width=25, howmanyperline=5)
@@ -207,7 +193,9 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #      output affix file
     # -------------------------------------------------------------------------#
 
-    affixfilename = Path(outfolder, '{}_AffixToSigs.txt'.format(corpus_stem))
+    affixfilename = output_path(Path(outfolder,
+                                '{}_AffixToSigs.txt'.format(corpus_stem)),
+                                compress)
     OutputLargeDict(affixfilename, AffixToSigs, min_cell_width=25,
                     key=lambda x: len(x[1]), reverse=True,
                     howmanyperline=5, SignatureValues=True)
@@ -218,7 +206,8 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     # -------------------------------------------------------------------------#
 
     SigToStems_outfilename = Path(outfolder, corpus_stem + "_SigToStems.txt")
-    OutputLargeDict(SigToStems_outfilename, SigToStems, key=lambda x: len(x[1]),
+    SigToStems_txt = output_path(SigToStems_outfilename, compress)
+    OutputLargeDict(SigToStems_txt, SigToStems, key=lambda x: len(x[1]),
                     reverse=True,
                     howmanyperline=5, SignatureKeys=True)
 
@@ -227,7 +216,7 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     json_pdump(SigToStems, SigToStems_outfilename_json.open("w"),
                key=lambda x : len(x[1]), reverse=True)
 
-    print('===> output file generated:', SigToStems_outfilename, flush=True)
+    print('===> output file generated:', SigToStems_txt, flush=True)
     print('===> output file generated:', SigToStems_outfilename_json, flush=True)
 
     # -------------------------------------------------------------------------#
@@ -235,7 +224,8 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     # -------------------------------------------------------------------------#
 
     WordToSigs_outfilename = Path(outfolder, corpus_stem + "_WordToSigs.txt")
-    OutputLargeDict(WordToSigs_outfilename, WordToSigs, key=lambda x: len(x[1]),
+    WordToSigs_txt = output_path(WordToSigs_outfilename, compress)
+    OutputLargeDict(WordToSigs_txt, WordToSigs, key=lambda x: len(x[1]),
                     reverse=True,
                     min_cell_width=25, SignatureValues=True)
 
@@ -244,7 +234,7 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     json_pdump(WordToSigs, WordToSigs_outfilename_json.open("w"),
                key=lambda x : len(x[1]), reverse=True)
 
-    print('===> output file generated:', WordToSigs_outfilename, flush=True)
+    print('===> output file generated:', WordToSigs_txt, flush=True)
     print('===> output file generated:', WordToSigs_outfilename_json, flush=True)
 
     # -------------------------------------------------------------------------#
@@ -253,11 +243,12 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     WordToSigtransforms_outfilename = Path(outfolder,
                                         corpus_stem + "_WordToSigtransforms.txt")
-    OutputLargeDict(WordToSigtransforms_outfilename, WordToSigtransforms,
+    WordToSigtransforms_txt = output_path(WordToSigtransforms_outfilename, compress)
+    OutputLargeDict(WordToSigtransforms_txt, WordToSigtransforms,
                     min_cell_width=25, sigtransforms=True,
                     key=lambda x: len(x[1]), reverse=True)
     print('===> output file generated:',
-          WordToSigtransforms_outfilename, flush=True)
+          WordToSigtransforms_txt, flush=True)
 
     WordToSigtransforms_outfilename_json = changeFilenameSuffix(
                                   WordToSigtransforms_outfilename, ".json")
@@ -278,12 +269,14 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
                                               corpus_stem +
                                               "_mostFreqWordsNotInSigs.txt")
 
-    with mostFreqWordsNotInSigs_outfilename.open('w') as f:
-        for (word, freq) in wordFreqDict_sorted:
-            if word not in WordToSigs:
-                print(word, freq, file=f)
-            else:
-                break
+    mostFreqWordsNotInSigs_outfilename = output_path(
+                                    mostFreqWordsNotInSigs_outfilename, compress)
+
+    with open_output(mostFreqWordsNotInSigs_outfilename) as f:
+        write_rows(f, ("{} {}".format(word, freq)
+                       for word, freq in takewhile(
+                           lambda x: x[0] not in WordToSigs,
+                           wordFreqDict_sorted)))
 
     print('===> output file generated:',
           mostFreqWordsNotInSigs_outfilename, flush=True)
@@ -292,12 +285,14 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output the word types in induced paradigms
     # -------------------------------------------------------------------------#
 
-    WordsInSigs_outfilename = Path(outfolder, corpus_stem + "_WordsInSigs.txt")
+    WordsInSigs_outfilename = output_path(Path(outfolder,
+                                          corpus_stem + "_WordsInSigs.txt"),
+                                          compress)
 
-    with WordsInSigs_outfilename.open('w') as f:
-        for (word, freq) in wordFreqDict_sorted:
-            if word in WordToSigs:
-                print(word, freq, file=f)
+    with open_output(WordsInSigs_outfilename) as f:
+        write_rows(f, ("{} {}".format(word, freq)
+                       for word, freq in wordFreqDict_sorted
+                       if word in WordToSigs))
 
     print('===> output file generated:',
           WordsInSigs_outfilename, flush=True)
@@ -306,17 +301,252 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     #   output the word types NOT in induced paradigms
     # -------------------------------------------------------------------------#
 
-    WordsNotInSigs_outfilename = Path(outfolder,
-                                      corpus_stem + "_WordsNotInSigs.txt")
+    WordsNotInSigs_outfilename = output_path(Path(outfolder,
+                                      corpus_stem + "_WordsNotInSigs.txt"),
+                                      compress)
 
-    with WordsNotInSigs_outfilename.open('w') as f:
-        for (word, freq) in wordFreqDict_sorted:
-            if word not in WordToSigs:
-                print(word, freq, file=f)
+    with open_output(WordsNotInSigs_outfilename) as f:
+        write_rows(f, ("{} {}".format(word, freq)
+                       for word, freq in wordFreqDict_sorted
+                       if word not in WordToSigs))
 
     print('===> output file generated:',
           WordsNotInSigs_outfilename, flush=True)
 
+    return [stemfilename, affixfilename,
+            SigToStems_txt, SigToStems_outfilename_json,
+            WordToSigs_txt, WordToSigs_outfilename_json,
+            WordToSigtransforms_txt, WordToSigtransforms_outfilename_json,
+            mostFreqWordsNotInSigs_outfilename,
+            WordsInSigs_outfilename, WordsNotInSigs_outfilename]
+
+
+def get_sweep_folder(outfolder, MinimumStemLength, MaximumAffixLength,
+                     MinimumNumberofSigUses):
+    """Return the output folder of one setting of sweep()"""
+    return Path(outfolder, "sweep",
+                "minstem{}_maxaffix{}_minsig{}".format(MinimumStemLength,
+                                                       MaximumAffixLength,
+                                                       MinimumNumberofSigUses))
+
+
+def _sweep_bisignatures(task):
+    """run by sweep(), in a worker process if workers > 1: make BisigToTuple
+    once for (MinimumStemLength, MaximumAffixLength), and the morphology for
+    each value of MinimumNumberofSigUses from it"""
+    (wordlist, wordFreqDict, MinimumStemLength, MaximumAffixLength,
+     MinimumNumberofSigUsesList, FindSuffixesFlag, outfolder, corpus_stem,
+     compress, write_outputs) = task
+
+    BisigToTuple = MakeBiSignatures(list(wordlist), MinimumStemLength,
+                                    MaximumAffixLength, FindSuffixesFlag)
+
+    results = list()
+    for MinimumNumberofSigUses in MinimumNumberofSigUsesList:
+        (StemToWords, SigToStems, StemToSig, WordToSigs, WordToSigtransforms,
+         AffixToSigs) = MakeMorphologyRelations(BisigToTuple,
+                                                MaximumAffixLength,
+                                                MinimumNumberofSigUses,
+                                                FindSuffixesFlag)
+
+        setting = (MinimumStemLength, MaximumAffixLength,
+                   MinimumNumberofSigUses)
+        setting_folder = get_sweep_folder(outfolder, *setting)
+
+        if write_outputs:
+            setting_folder.mkdir(parents=True, exist_ok=True)
+            output_morphology(setting_folder, corpus_stem, wordFreqDict,
+                              StemToWords, SigToStems, WordToSigs,
+                              WordToSigtransforms, AffixToSigs, compress)
+
+        results.append((setting, (setting_folder, len(SigToStems),
+                                  len(StemToSig), len(WordToSigs))))
+    return results
+
+
+def sweep(language=None, corpus=None, datafolder=None, filename=None,
+          MinimumStemLengths=(4,), MaximumAffixLengths=(3,),
+          MinimumNumberofSigUsesList=(5,), maxwordtokens=0, use_corpus=True,
+          compress=None, workers=1, write_outputs=True):
+    """Run lxa5 for every combination of the given values of
+    MinimumStemLength, MaximumAffixLength and MinimumNumberofSigUses.
+
+    The wordlist is read once, and BisigToTuple is made once for each
+    (MinimumStemLength, MaximumAffixLength) pair, since
+    MinimumNumberofSigUses only filters the bisignatures afterwards. If
+    workers > 1, the pairs are run by a pool of worker processes.
+
+    The outputs of each setting are written (with the same filenames as by
+    main()) to lxa/sweep/minstem[m]_maxaffix[a]_minsig[s]/, unless
+    write_outputs is False (writing them takes most of the time of each
+    setting, and the counts below may be all that is needed). Return a dict
+    from each setting (MinimumStemLength, MaximumAffixLength,
+    MinimumNumberofSigUses) to (its output folder, the number of sigs, the
+    number of stems in sigs, the number of words in sigs).
+    """
+    print("\n*****************************************************\n"
+          "Running the lxa5.py parameter sweep now...\n")
+
+    FindSuffixesFlag = get_find_suffixes_flag(language)
+
+    wordlist_path, corpus_stem = find_wordlist(language, corpus, datafolder,
+                                               filename, maxwordtokens,
+                                               use_corpus)
+    wordFreqDict = read_word_freq(wordlist_path)
+    wordlist = sorted(wordFreqDict.keys())
+
+    outfolder = get_outfolder(language, datafolder, filename)
+
+    MinimumNumberofSigUsesList = sorted(set(MinimumNumberofSigUsesList))
+
+    # shorter stems and longer affixes make more bisignatures, so these
+    # pairs are started first
+    tasks = [(wordlist, wordFreqDict, MinimumStemLength, MaximumAffixLength,
+              MinimumNumberofSigUsesList, FindSuffixesFlag, outfolder,
+              corpus_stem, compress, write_outputs)
+             for MinimumStemLength in sorted(set(MinimumStemLengths))
+             for MaximumAffixLength in sorted(set(MaximumAffixLengths),
+                                              reverse=True)]
+
+    SettingToResults = dict()
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            SettingToResults.update(_sweep_bisignatures(task))
+    else:
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            for results in pool.imap_unordered(_sweep_bisignatures, tasks):
+                SettingToResults.update(results)
+
+    SettingToResults = OrderedDict(sorted(SettingToResults.items()))
+
+    print("\nminstem maxaffix minsig    sigs   stems   words")
+    for setting, (_, nSigs, nStems, nWords) in SettingToResults.items():
+        print("{:7d} {:8d} {:6d} {:7d} {:7d} {:7d}".format(*setting, nSigs,
+                                                          nStems, nWords))
+
+    return SettingToResults
+
+
+def remake_if_stale(language=None, corpus=None, datafolder=None,
+                    filename=None, maxwordtokens=0):
+    """Run main() again, with the parameters of its last run, if the wordlist
+    (or the output files) have changed since the outputs were made. Return
+    True if main() is run."""
+    wordlist_path, corpus_stem = get_wordlist_path_corpus_stem(language,
+                                corpus, datafolder, filename, maxwordtokens,
+                                use_corpus=True)
+
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "lxa5:" + corpus_stem
+
+    if not cache.is_stale(stage, [wordlist_path]):
+        return False
+
+    print("\nThe wordlist has changed since the lxa5.py outputs were made.\n"
+          "lxa5.py is now run again.\n")
+    main(language=language, corpus=corpus, datafolder=datafolder,
+         filename=filename, use_corpus=True, **cache.params(stage))
+    return True
+
+
+def main(language=None, corpus=None, datafolder=None, filename=None,
+         MinimumStemLength=4, MaximumAffixLength=3, MinimumNumberofSigUses=5,
+         maxwordtokens=0, use_corpus=True, compress=None, workers=1,
+         incremental=False, use_cache=True):
+
+    print("\n*****************************************************\n"
+          "Running the lxa5.py program now...\n")
+
+    FindSuffixesFlag = get_find_suffixes_flag(language)
+
+    wordlist_path, corpus_stem = find_wordlist(language, corpus, datafolder,
+                                               filename, maxwordtokens,
+                                               use_corpus)
+
+    # the parameters which the outputs depend on; these are also the
+    # arguments of main() with which manifold.py runs lxa5.py again
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "lxa5:" + corpus_stem
+    stage_inputs = [wordlist_path] + source_files("lxa5.py", "lxa5_module.py",
+                                                  "lxa5lib.py",
+                                                  "morphology_tables.py")
+    stage_params = {"MinimumStemLength": MinimumStemLength,
+                    "MaximumAffixLength": MaximumAffixLength,
+                    "MinimumNumberofSigUses": MinimumNumberofSigUses,
+                    "maxwordtokens": maxwordtokens,
+                    "compress": compress}
+
+    if use_cache and cache.is_fresh(stage, stage_inputs, stage_params):
+        print("The lxa5.py outputs are up to date (run with --no-cache to "
+              "make them again).")
+        return
+
+    wordFreqDict = read_word_freq(wordlist_path)
+    wordlist = sorted(wordFreqDict.keys())
+
+    outfolder = get_outfolder(language, datafolder, filename)
+
+    # TODO -- filenames not yet used in main()
+    outfile_Signatures_name = str(outfolder) + corpus_stem + "_Signatures.txt"
+    outfile_SigTransforms_name = str(outfolder) + corpus_stem + "_SigTransforms.txt"
+    outfile_FSA_name = str(outfolder) + corpus_stem + "_FSA.txt"
+    outfile_FSA_graphics_name = str(outfolder) + corpus_stem + "_FSA_graphics.png"
+
+    # -------------------------------------------------------------------------#
+    #   create: BisigToTuple
+    #                  (key: tuple of bisig | value: set of (stem, word1, word2)
+    #           StemToWords (key: stem | value: set of words)
+    #           SigToStems  (key: tuple of sig | value: set of stems )
+    #           StemToSig   (key: str of stem  | value: tuple of sig )
+    #           WordToSigs  (key: str of word  | value: set of sigs )
+    #           AffixToSigs (key: str of affix | value: set of sigs )
+    #
+    #   These are read-only Relations (see morphology_tables.py) which store
+    #   the words, stems, affixes and sigs as integer IDs in arrays, and
+    #   are used like dicts.
+    # -------------------------------------------------------------------------#
+
+    # prints the time and memory use of each of these
+    timer = StageTimer()
+
+    bisig_snapshot_path = Path(outfolder, corpus_stem + "_bisigs.pickle")
+
+    if incremental:
+        BisigToTuple = MakeBiSignaturesIncrementally(wordlist,
+                                    MinimumStemLength, MaximumAffixLength,
+                                    bisig_snapshot_path, FindSuffixesFlag,
+                                    workers=workers)
+    else:
+        BisigToTuple = MakeBiSignatures(wordlist, MinimumStemLength,
+                                        MaximumAffixLength, FindSuffixesFlag,
+                                        workers=workers)
+    timer.stage("BisigToTuple")
+
+    (StemToWords, SigToStems, StemToSig, WordToSigs, WordToSigtransforms,
+     AffixToSigs) = MakeMorphologyRelations(BisigToTuple, MaximumAffixLength,
+                                            MinimumNumberofSigUses,
+                                            FindSuffixesFlag, timer=timer)
+
+    # -------------------------------------------------------------------------#
+    #   generate graphs for several dicts
+    # -------------------------------------------------------------------------#
+    #    GenerateGraphFromDict(StemToWords, outfolder, 'StemToWords.gexf')
+    #    GenerateGraphFromDict(SigToStems, outfolder, 'SigToStems.gexf')
+    #    GenerateGraphFromDict(WordToSigs, outfolder, 'WordToSigs.gexf')
+    #    GenerateGraphFromDict(StemToSig, outfolder, 'StemToSig.gexf')
+    # -------------------------------------------------------------------------#
+
+    outputfiles = output_morphology(outfolder, corpus_stem, wordFreqDict,
+                                    StemToWords, SigToStems, WordToSigs,
+                                    WordToSigtransforms, AffixToSigs,
+                                    compress)
+
+    if incremental:
+        print('===> bisignature snapshot for the next incremental run:',
+              bisig_snapshot_path, flush=True)
+
+    cache.record(stage, stage_inputs, stage_params, outputfiles)
+
 
 # -----------------------------------------------------------------------------#
 
@@ -589,6 +819,10 @@ if __name__ == "__main__":
     MaximumAffixLength = args.maxaffix
     MinimumNumberofSigUses = args.minsig
     maxwordtokens = args.maxwordtokens
+    compress = args.compress
+    workers = args.workers
+    incremental = args.incremental
+    use_cache = not args.no_cache
 
     description="You are running {}.\n".format(__file__) + \
                 "This program computes morphological signatures.\n" + \
@@ -608,6 +842,8 @@ if __name__ == "__main__":
          MinimumStemLength=MinimumStemLength,
          MaximumAffixLength=MaximumAffixLength,
          MinimumNumberofSigUses=MinimumNumberofSigUses,
-         maxwordtokens=maxwordtokens, use_corpus=use_corpus)
+         maxwordtokens=maxwordtokens, use_corpus=use_corpus,
+         compress=compress, workers=workers, incremental=incremental,
+         use_cache=use_cache)
 
 
@@ -1,8 +1,10 @@
+from bisect import (bisect_left, bisect_right)
 from collections import Counter, defaultdict
-from itertools import combinations
 import math
+import multiprocessing
 import os
 from pathlib import Path
+import pickle
 import time
 from pprint import pprint
 
@@ -10,9 +12,13 @@ import numpy as np
 import networkx as nx
 
 from lxa5lib import (read_corpus_file, SEP_SIG, SEP_SIGTRANSFORM)
+from morphology_tables import (SymbolTable, RelationBuilder, single)
 import ngrams
 # from fsm import State, Transducer, get_graph
 
+# number of word-block batches per worker process in MakeBiSignatures
+BATCHES_PER_WORKER = 8
+
 
 
 """"     Signatures is a map: its keys are signatures. Its values are *sets* of stems.
@@ -23,14 +29,26 @@ import ngrams
 """  # ---------------------------------------------------------------------------------------------------------------------------------------------#
 
 
+def GetSymbolTable(relation):
+    '''
+    The SymbolTable of relation (a Relation of morphology_tables), or a new
+    one if relation is a dict, so that the tables made from it share
+    the symbol IDs.
+    '''
+    symbols = getattr(relation, "symbols", None)
+    if symbols is None:
+        symbols = SymbolTable()
+    return symbols
+
+
 def MakeAffixToSigs(sig_to_stems):
-    affix_to_sigs = defaultdict(set)
+    affix_to_sigs = RelationBuilder(GetSymbolTable(sig_to_stems))
 
     for sig in sig_to_stems.keys():
         for affix in sig:
-            affix_to_sigs[affix].add(sig)
+            affix_to_sigs.add(affix, sig)
 
-    return affix_to_sigs
+    return affix_to_sigs.build()
 
 # remove this function?
 def read_word_freq_file(infilename: Path,
@@ -1489,23 +1507,21 @@ def MakeStemCounts(StemToWord, wordFreqDict):
 
 
 def MakeStemToWords(BisigToTuple, MinimumNumberofSigUses):
-    StemToWord = dict()
-    for bisig in BisigToTuple.keys():  # bisig is a tuple
-        if len(BisigToTuple[bisig]) < MinimumNumberofSigUses:
-            pass
-        #            del BisigToTuple[bisig]
-        else:
-            for stem, word1, word2 in BisigToTuple[bisig]:
-                if not stem in StemToWord:
-                    StemToWord[stem] = set()
-                StemToWord[stem].add(word1)
-                StemToWord[stem].add(word2)
+    '''
+    BisigToTuple is the Relation made by MakeBiSignatures. The stems and
+    words of the bisigs with at least MinimumNumberofSigUses chunks are
+    taken from its arrays of symbol IDs, without decoding the chunks.
+    '''
+    sizes = BisigToTuple.value_sizes()
+    used = np.repeat(sizes >= MinimumNumberofSigUses, sizes)
+    stems, words1, words2 = [column[used] for column in BisigToTuple.columns]
 
-    for stem in StemToWord:
-        thislist = list(StemToWord[stem])
-        thislist.sort()
-        StemToWord[stem] = thislist
-    return StemToWord
+    # values: sorted lists of the words of each stem
+    StemToWord = RelationBuilder(BisigToTuple.symbols, container=sorted)
+    StemToWord.add_ids(np.repeat(stems, 2),
+                       np.column_stack([words1, words2]).ravel())
+
+    return StemToWord.build()
 
 # currently not used
 def OutputStemFile(stemfilename: Path, StemToWord, wordFreqDict):
@@ -1518,58 +1534,101 @@ def OutputStemFile(stemfilename: Path, StemToWord, wordFreqDict):
 
 
 # ----------------------------------------------------------------------------------------------------------------------------#
-def MakeBiSignatures(wordlist, MinimumStemLength, MaximumAffixLength,
-                     FindSuffixesFlag=True):
+def FindBisigPairsInBlock(block, MaximumAffixLength):
     '''
-    This function finds pairs of words which make a valid signature,
-    and makes Dictionary whose key is the signature and 
-    whose value is a tuple: stem, word1, word2.
+    Return the pairs (i, j), i < j, of the sorted list of words block such
+    that both words are at most MaximumAffixLength letters longer than
+    their common prefix. The pairs are in the order of
+    itertools.combinations(range(len(block)), 2).
+
+    If len(word2) <= len(word1), the pair is valid if and only if word2
+    starts with word1[: len(word1) - MaximumAffixLength]. These words are
+    one contiguous range of the sorted block, found by bisection; within
+    the range, the words of each length are found by bisection too. So
+    only valid pairs are enumerated, instead of all pairs of the block.
     '''
-    BisigToTuple = dict()
-    nWords = len(wordlist)
+    # for each word length, the sorted indices of the words of that length
+    LengthToIndices = defaultdict(list)
+    for i, word in enumerate(block):
+        LengthToIndices[len(word)].append(i)
+    lengths = sorted(LengthToIndices)
 
-    if not FindSuffixesFlag:  # then alphabetize the words from right to left
-        wordlist.sort(key=lambda x: x[::-1])
-    else:
-        wordlist.sort()
+    pairs = list()
 
-    print('nWords', nWords)
-    print('FindSuffixesFlag', FindSuffixesFlag)
+    for i, word1 in enumerate(block):
+        prefix = word1[: max(len(word1) - MaximumAffixLength, 0)]
+        start = bisect_left(block, prefix)
+        end = bisect_left(block, prefix + "\U0010FFFF", start)
 
-    # subwordlist stores words in wordlist whose first k letters
-    #   are the same (k = MinimumStemLength)
+        for length in lengths:
+            if length > len(word1):
+                break
+            indices = LengthToIndices[length]
+            if length == len(word1):
+                # pairs of words of equal length are found from the first one
+                lo = bisect_right(indices, i)
+            else:
+                lo = bisect_left(indices, start)
+            for j in indices[lo: bisect_left(indices, end, lo)]:
+                pairs.append((i, j) if i < j else (j, i))
+
+    pairs.sort()
+    return pairs
+
+
+def MakeWordBlocks(wordlist, MinimumStemLength, FindSuffixesFlag=True):
+    '''
+    Split the sorted wordlist into blocks of words whose first
+    MinimumStemLength letters are the same (words are reversed if
+    FindSuffixesFlag is False).
+
+    The last block is left out on purpose: the serial pass which the
+    blocks replace analyzed a run of words only when the next run started,
+    so its last run was never analyzed, and MakeBiSignatures still finds
+    the same bisignatures.
+    '''
     if FindSuffixesFlag:
-        subwordlist = [wordlist[0]]
+        words = wordlist
     else:
-        subwordlist = [wordlist[0][::-1]]
+        words = [word[::-1] for word in wordlist]
 
-    for n in range(1, nWords):
-        word1 = wordlist[n - 1]
-        word2 = wordlist[n]
+    blocks = list()
+
+    # subwordlist stores words in wordlist whose first k letters
+    #   are the same (k = MinimumStemLength)
+    subwordlist = [words[0]]
 
-        if not FindSuffixesFlag:
-            word1 = word1[::-1]
-            word2 = word2[::-1]
+    for n in range(1, len(words)):
+        word1 = words[n - 1]
+        word2 = words[n]
 
         minimalstem = word1[: MinimumStemLength]
         if minimalstem == word2[: MinimumStemLength]:
             subwordlist.append(word2)
-            continue
         else:
-            wordlist_forAnalysisNow = list(subwordlist)
+            blocks.append(subwordlist)
             subwordlist = [word2]
 
-        for (word1, word2) in combinations(wordlist_forAnalysisNow, 2):
+    return blocks
+
+
+def FindBlockBiSignatures(blocks, MaximumAffixLength, FindSuffixesFlag=True):
+    '''
+    Return the list of (bisig, (stem, word1, word2)) for the valid pairs of
+    words of a list of word blocks (see MakeBiSignatures).
+    '''
+    BisigChunks = list()
+
+    for block in blocks:
+        for i, j in FindBisigPairsInBlock(block, MaximumAffixLength):
+            word1 = block[i]
+            word2 = block[j]
 
             stem = maximalcommonprefix(word1, word2)
             stemlen = len(stem)
             suffix1 = word1[stemlen:]
             suffix2 = word2[stemlen:]
 
-            if len(suffix1) > MaximumAffixLength or \
-                            len(suffix2) > MaximumAffixLength:
-                continue
-
             if not FindSuffixesFlag:
                 word1 = word1[::-1]
                 word2 = word2[::-1]
@@ -1589,12 +1648,232 @@ def MakeBiSignatures(wordlist, MinimumStemLength, MaximumAffixLength,
             bisig.sort()
             bisigtuple = tuple(bisig)
 
-            if not bisigtuple in BisigToTuple:
-                BisigToTuple[bisigtuple] = set()
             chunk = (stem, word1, word2)
-            BisigToTuple[bisigtuple].add(chunk)
+            BisigChunks.append((bisigtuple, chunk))
+
+    return BisigChunks
+
+
+def _FindBlockBiSignatures(task):
+    """run in a worker process by FindBiSignaturesByBlock"""
+    batch_index, blocks, MaximumAffixLength, FindSuffixesFlag = task
+    return batch_index, [FindBlockBiSignatures([block], MaximumAffixLength,
+                                               FindSuffixesFlag)
+                         for block in blocks]
+
+
+def MakeBlockBatches(blocks, nbatches):
+    '''
+    Group the consecutive blocks into about nbatches batches of similar
+    numbers of words; a large block is a batch of its own.
+    '''
+    target = max(sum(len(block) for block in blocks) // nbatches, 1)
+
+    batches = list()
+    batch = list()
+    batchsize = 0
+
+    for block in blocks:
+        batch.append(block)
+        batchsize += len(block)
+        if batchsize >= target:
+            batches.append(batch)
+            batch = list()
+            batchsize = 0
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def FindBiSignaturesByBlock(blocks, MaximumAffixLength, FindSuffixesFlag=True,
+                            workers=1):
+    '''
+    Yield the bisignatures of each word block in turn, as lists of
+    (bisig, (stem, word1, word2)) (see FindBlockBiSignatures).
+
+    If workers > 1, the word blocks are analyzed by a pool of worker
+    processes; the results are still yielded in block order.
+    '''
+    if workers <= 1:
+        for block in blocks:
+            yield FindBlockBiSignatures([block], MaximumAffixLength,
+                                        FindSuffixesFlag)
+        return
+
+    # several batches per worker, largest first, to even out the load
+    batches = MakeBlockBatches(blocks, workers * BATCHES_PER_WORKER)
+    tasks = sorted([(batch_index, batch, MaximumAffixLength, FindSuffixesFlag)
+                    for batch_index, batch in enumerate(batches)],
+                   key=lambda task: sum(len(block) for block in task[1]),
+                   reverse=True)
+
+    BatchToBisigChunks = dict()
+
+    with multiprocessing.Pool(min(workers, len(tasks)) or 1) as pool:
+        for batch_index, BlockBisigChunks in pool.imap_unordered(
+                                            _FindBlockBiSignatures, tasks):
+            BatchToBisigChunks[batch_index] = BlockBisigChunks
+
+    for batch_index in range(len(batches)):
+        yield from BatchToBisigChunks.pop(batch_index)
+
+
+def SortWordlist(wordlist, FindSuffixesFlag=True):
+    if not FindSuffixesFlag:  # then alphabetize the words from right to left
+        wordlist.sort(key=lambda x: x[::-1])
+    else:
+        wordlist.sort()
+
+
+def MakeBiSignatures(wordlist, MinimumStemLength, MaximumAffixLength,
+                     FindSuffixesFlag=True, workers=1):
+    '''
+    This function finds pairs of words which make a valid signature,
+    and makes a Relation (see morphology_tables) whose key is the signature
+    and whose value is a set of tuples: stem, word1, word2.
+
+    If workers > 1, the word blocks are analyzed by a pool of worker
+    processes; the results are merged in block order, so BisigToTuple is
+    the same as with one process.
+    '''
+    nWords = len(wordlist)
+    SortWordlist(wordlist, FindSuffixesFlag)
+
+    print('nWords', nWords)
+    print('FindSuffixesFlag', FindSuffixesFlag)
+
+    blocks = MakeWordBlocks(wordlist, MinimumStemLength, FindSuffixesFlag)
+
+    BisigToTuple = RelationBuilder(width=3)
+
+    for BisigChunks in FindBiSignaturesByBlock(blocks, MaximumAffixLength,
+                                               FindSuffixesFlag, workers):
+        for bisigtuple, chunk in BisigChunks:
+            BisigToTuple.add(bisigtuple, chunk)
 
-    return BisigToTuple
+    return BisigToTuple.build()
+
+
+def save_bisig_snapshot(snapshot_path: Path, parameters, symbols,
+                        BlockToChunks, chunks):
+    """Save the words and the bisignatures of each word block.
+
+    chunks is an array of rows (bisig, stem, word1, word2) of symbol IDs
+    (see morphology_tables), and BlockToChunks maps the first
+    MinimumStemLength letters of the words of a block to (the list of
+    words, start, end): the rows of the block are chunks[start: end].
+    Only the symbols used in chunks are saved.
+    """
+    used = np.unique(chunks)
+    new_ids = np.zeros(len(symbols), dtype=np.int32)
+    new_ids[used] = np.arange(len(used), dtype=np.int32)
+
+    snapshot = {"parameters": parameters,
+                "symbols": [symbols[i] for i in used.tolist()],
+                "blocks": BlockToChunks,
+                "chunks": new_ids[chunks]}
+
+    with snapshot_path.open('wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_bisig_snapshot(snapshot_path: Path, parameters):
+    """Load (SymbolTable, BlockToChunks, chunks) from the snapshot (see
+    save_bisig_snapshot). If there is no snapshot or if it was made with
+    other parameters, the tables are empty."""
+    snapshot = None
+
+    if snapshot_path.exists():
+        with snapshot_path.open('rb') as f:
+            snapshot = pickle.load(f)
+
+        if snapshot["parameters"] != parameters:
+            print("The parameters have changed since the bisignature "
+                  "snapshot was saved.\nAll word blocks are analyzed again.")
+            snapshot = None
+
+    if snapshot is None:
+        return SymbolTable(), dict(), np.zeros((0, 4), dtype=np.int32)
+
+    return (SymbolTable(snapshot["symbols"]), snapshot["blocks"],
+            snapshot["chunks"])
+
+
+def MakeBiSignaturesIncrementally(wordlist, MinimumStemLength,
+                                  MaximumAffixLength, snapshot_path: Path,
+                                  FindSuffixesFlag=True, workers=1):
+    '''
+    Make BisigToTuple as MakeBiSignatures does, reusing the bisignatures
+    saved in the snapshot by the previous incremental run.
+
+    The bisignatures of a word block depend only on the words of the
+    block, so only the blocks whose words have changed (or which are new)
+    are analyzed; the bisignatures of the other blocks are taken from the
+    snapshot. BisigToTuple is made from the blocks in order, so it has the
+    same keys and values (in the same order) as made by MakeBiSignatures,
+    and the snapshot is updated for the next run.
+    '''
+    nWords = len(wordlist)
+    SortWordlist(wordlist, FindSuffixesFlag)
+
+    print('nWords', nWords)
+    print('FindSuffixesFlag', FindSuffixesFlag)
+
+    blocks = MakeWordBlocks(wordlist, MinimumStemLength, FindSuffixesFlag)
+
+    parameters = {"MinimumStemLength": MinimumStemLength,
+                  "MaximumAffixLength": MaximumAffixLength,
+                  "FindSuffixesFlag": FindSuffixesFlag}
+    symbols, OldBlockToChunks, old_chunks = load_bisig_snapshot(snapshot_path,
+                                                                parameters)
+
+    def BlockKey(block):
+        return block[0][: MinimumStemLength]
+
+    changed_blocks = [block for block in blocks
+                      if OldBlockToChunks.get(BlockKey(block),
+                                              (None,))[0] != block]
+    print("{} of {} word blocks to analyze".format(len(changed_blocks),
+                                                   len(blocks)))
+    changed_BisigChunks = FindBiSignaturesByBlock(changed_blocks,
+                                                  MaximumAffixLength,
+                                                  FindSuffixesFlag, workers)
+
+    intern = symbols.intern
+    BlockToChunks = dict()
+    pieces = list()
+    nchunks = 0
+
+    for block in blocks:
+        key = BlockKey(block)
+        words, start, end = OldBlockToChunks.get(key, (None, 0, 0))
+
+        if words == block:
+            piece = old_chunks[start: end]
+        else:
+            piece = np.array([(intern(bisigtuple), intern(stem),
+                               intern(word1), intern(word2))
+                              for bisigtuple, (stem, word1, word2)
+                              in next(changed_BisigChunks)],
+                             dtype=np.int32).reshape(-1, 4)
+
+        BlockToChunks[key] = (block, nchunks, nchunks + len(piece))
+        pieces.append(piece)
+        nchunks += len(piece)
+
+    chunks = np.concatenate(pieces + [np.zeros((0, 4), dtype=np.int32)])
+    del old_chunks, pieces
+
+    BisigToTuple = RelationBuilder(symbols, width=3)
+    BisigToTuple.add_ids(chunks[:, 0], chunks[:, 1], chunks[:, 2],
+                         chunks[:, 3])
+
+    save_bisig_snapshot(snapshot_path, parameters, symbols, BlockToChunks,
+                        chunks)
+
+    return BisigToTuple.build()
 
 # currently not used
 # ------------------------------------------------------------------------------#
@@ -1648,70 +1927,6 @@ def MakeSignatures(StemToWord, FindSuffixesFlag, MaximumAffixLength,
 
 # ----------------------------------------------------------------------------------------------------------------------------#
 
-def MakeStemToSig(SigToStems):
-    StemToSig = dict()
-
-    for sig in SigToStems.keys():
-        for stem in SigToStems[sig]:
-            StemToSig[stem] = sig
-
-    return StemToSig
-
-
-# ----------------------------------------------------------------------------------------------------------------------------#
-
-def MakeWordToSigs(StemToWords, StemToSig):
-    WordToSigs = dict()
-
-    for stem in StemToSig.keys():
-        _wordset = StemToWords[stem]
-
-        for word in _wordset:
-            if word not in WordToSigs:
-                WordToSigs[word] = list()
-            WordToSigs[word].append(StemToSig[stem])
-
-    return WordToSigs
-
-
-# ----------------------------------------------------------------------------------------------------------------------------#
-
-def MakeWordToSigtransforms(WordToSigs, FindSuffixesFlag=True):
-    if FindSuffixesFlag:
-        def check_affix(word, affix):
-            if affix == "NULL":
-                affix = ""
-            if word.endswith(affix):
-                return True
-            else:
-                return False
-    else:
-        def check_affix(word, affix):
-            if affix == "NULL":
-                affix = ""
-            if word.startswith(affix):
-                return True
-            else:
-                return False
-
-    WordToSigtransforms = dict()
-
-    for word in WordToSigs.keys():
-        sigs = WordToSigs[word]
-        sigtransforms = set()
-
-        for sig in sigs:
-            for affix in sig:
-                if check_affix(word, affix):
-                    sigtransforms.add((sig, affix))
-                    break
-
-        WordToSigtransforms[word] = sigtransforms
-
-    return WordToSigtransforms
-
-# ----------------------------------------------------------------------------------------------------------------------------#
-
 def GetWordFromStemAffix(stem, affix):
     if affix == 'NULL':
         return stem
@@ -1719,44 +1934,150 @@ def GetWordFromStemAffix(stem, affix):
         return stem + affix
 
 
-# ------------------------------------------------------------------------------#
-def MakeSigToStems(StemToWord, MaximumAffixLength, MinimumNumberofSigUses,
-                   FindSuffixesFlag=True, NoAffixLengthRestriction=False):
-    _SigToStems = dict()  # temporary version
+# ----------------------------------------------------------------------------------------------------------------------------#
 
-    for stem in StemToWord.keys():
-        affixset = set()
+def MakeMorphologyRelations(BisigToTuple, MaximumAffixLength,
+                            MinimumNumberofSigUses, FindSuffixesFlag=True,
+                            NoAffixLengthRestriction=False, timer=None):
+    '''
+    Make StemToWords, SigToStems, StemToSig, WordToSigs,
+    WordToSigtransforms and AffixToSigs from BisigToTuple (made by
+    MakeBiSignatures):
+
+    SigToStems           the sig (sorted tuple of the affixes of the words
+                         of a stem; "NULL" for the stem itself) of each stem
+                         of StemToWords, for the sigs with at least
+                         MinimumNumberofSigUses stems
+    StemToSig            the sig of each stem of SigToStems
+    WordToSigs           the sigs of the stems of each word
+    WordToSigtransforms  for each sig of each word, (sig, the first affix of
+                         the sig the word ends with, or starts with if
+                         FindSuffixesFlag is False)
+    AffixToSigs          the sigs with each affix
+
+    A single pass over StemToWords finds the affix of each (stem, word)
+    pair and the sig of each stem. The other relations are made from these
+    arrays of symbol IDs, and WordToSigtransforms reuses the affixes
+    instead of checking the affixes of each sig against the word.
+
+    If timer (a StageTimer of lxa5lib) is given, each relation is reported
+    as a stage when it is ready.
+    '''
+    def stage(name):
+        if timer is not None:
+            timer.stage(name)
+
+    StemToWords = MakeStemToWords(BisigToTuple, MinimumNumberofSigUses)
+    stage("StemToWords")
+
+    symbols = StemToWords.symbols
+    names = symbols.symbols
+    intern = symbols.intern
+    NULL = intern("NULL")
+
+    # the affix of each (stem, word) pair of StemToWords (-1 if the affix is
+    # too long), and the sig of each stem
+    stem_ids = StemToWords.key_ids.tolist()
+    word_ids = StemToWords.columns[0].tolist()
+    offsets = StemToWords.offsets.tolist()
+    pair_affixes = list()
+    stem_sigs = list()
+
+    for row, stem_id in enumerate(stem_ids):
+        stem = names[stem_id]
         stemlength = len(stem)
+        affixset = set()
 
-        for word in StemToWord[stem]:
-            if word == stem:
-                affixset.add("NULL")
+        for word_id in word_ids[offsets[row]: offsets[row + 1]]:
+            if word_id == stem_id:
+                affix_id = NULL
             else:
+                word = names[word_id]
                 affixlength = len(word) - stemlength
                 if NoAffixLengthRestriction == False and \
                                 affixlength > MaximumAffixLength:
+                    pair_affixes.append(-1)
                     continue
                 if FindSuffixesFlag:
-                    affix = word[stemlength:]
+                    affix_id = intern(word[stemlength:])
                 else:
-                    affix = word[: affixlength]
-                affixset.add(affix)
-
-        affixlist = list(affixset)
-        affixlist.sort()
-        affixTuple = tuple(affixlist)
-
-        if not affixTuple in _SigToStems:
-            _SigToStems[affixTuple] = set()
+                    affix_id = intern(word[: affixlength])
+            pair_affixes.append(affix_id)
+            affixset.add(names[affix_id])
+
+        stem_sigs.append(intern(tuple(sorted(affixset))))
+
+    pair_affixes = np.array(pair_affixes, dtype=np.int32)
+    stem_sigs = np.array(stem_sigs, dtype=np.int32)
+
+    # sigs with at least MinimumNumberofSigUses stems
+    sig_ids, sig_counts = np.unique(stem_sigs, return_counts=True)
+    used = np.isin(stem_sigs,
+                   sig_ids[sig_counts >= MinimumNumberofSigUses])
+
+    SigToStems = RelationBuilder(symbols)
+    SigToStems.add_ids(stem_sigs[used], StemToWords.key_ids[used])
+    SigToStems = SigToStems.build()
+    stage("SigToStems")
+
+    StemToSig = RelationBuilder(symbols, container=single, unique=False)
+    StemToSig.add_ids(SigToStems.columns[0],
+                      np.repeat(SigToStems.key_ids, SigToStems.value_sizes()))
+    StemToSig = StemToSig.build()
+    stage("StemToSig")
+
+    # the (word, sig, affix) of the words of the stems in StemToSig,
+    # in the order of the stems of StemToSig
+    counts, index = StemToWords.value_index(StemToSig.key_ids)
+    words = StemToWords.columns[0][index]
+    sigs = np.repeat(StemToSig.columns[0], counts)
+    affixes = pair_affixes[index]
+
+    WordToSigs = RelationBuilder(symbols, container=list, unique=False)
+    WordToSigs.add_ids(words, sigs)
+    WordToSigs = WordToSigs.build()
+    stage("WordToSigs")
+
+    # the sigtransform of (word, sig) is (sig, the first affix of sig which
+    # the word ends with (starts with, for prefixes)). This is the word's own
+    # affix, unless an affix before it matches too; "NULL" matches any word.
+    if FindSuffixesFlag:
+        check_affix = str.endswith
+    else:
+        check_affix = str.startswith
+
+    SigToAffixes = dict()
+    for sig_id in SigToStems.key_ids.tolist():
+        SigToAffixes[sig_id] = [(intern(affix), "" if affix == "NULL" else affix)
+                                for affix in names[sig_id]]
+
+    sigtransform_words = list()
+    sigtransform_sigs = list()
+    sigtransform_affixes = list()
+
+    for word_id, sig_id, own_affix_id in zip(words.tolist(), sigs.tolist(),
+                                             affixes.tolist()):
+        word = names[word_id]
+        for affix_id, affix in SigToAffixes[sig_id]:
+            if affix_id == own_affix_id or check_affix(word, affix):
+                sigtransform_words.append(word_id)
+                sigtransform_sigs.append(sig_id)
+                sigtransform_affixes.append(affix_id)
+                break
 
-        _SigToStems[affixTuple].add(stem)
+    WordToSigtransforms = RelationBuilder(symbols, width=2)
+    # every word in WordToSigs is a key, even with no sigtransforms
+    WordToSigtransforms.add_keys(WordToSigs.key_ids)
+    WordToSigtransforms.add_ids(sigtransform_words, sigtransform_sigs,
+                                sigtransform_affixes)
+    WordToSigtransforms = WordToSigtransforms.build()
+    stage("WordToSigtransforms")
 
-    SigToStems = dict()  # actual version to return
-    for sig in _SigToStems.keys():
-        if len(_SigToStems[sig]) >= MinimumNumberofSigUses:
-            SigToStems[sig] = _SigToStems[sig]
+    AffixToSigs = MakeAffixToSigs(SigToStems)
+    stage("AffixToSigs")
 
-    return SigToStems
+    return (StemToWords, SigToStems, StemToSig, WordToSigs,
+            WordToSigtransforms, AffixToSigs)
 
 
 # ----------------------------------------------------------------------------------------------------------------------------#
@@ -20,19 +20,28 @@ import networkx as nx
 from networkx.readwrite import json_graph
 
 from manifold_module import (GetMyWords, GetContextArray,
-                             Normalize, compute_incidence_graph,
-                             compute_laplacian, GetEigenvectors,
-                             compute_words_distance, compute_closest_neighbors,
+                             compute_shared_contexts_laplacian,
+                             SHARED_CONTEXTS_MEMORY, GetEigenvectors,
+                             save_eigenvectors, load_eigenvectors,
+                             EIGENSOLVERS,
+                             compute_nearest_neighbors,
+                             remove_words_from_neighbors,
+                             compute_approximate_neighbors, neighbor_recall,
+                             ANN_RECALL_SAMPLE,
                              compute_WordToSharedContextsOfNeighbors,
                              output_WordToSharedContextsOfNeighbors,
                              GetMyGraph, output_ImportantContextToWords)
+from ngram_store import (ngram_store_exists, ngram_store_paths,
+                         load_ngram_store)
 import ngrams
 import lxa5
 
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list, json_pload,
                      load_config_for_command_line_help,
+                     find_input_path, open_output, write_rows,
                      SEP_SIG, SEP_SIGTRANSFORM)
+from stage_cache import get_stage_cache, source_files
 
 
 def makeArgParser(configfilename="config.json"):
@@ -75,6 +84,28 @@ def makeArgParser(configfilename="config.json"):
                         type=bool, default=False)
     parser.add_argument("--usesigtransforms", help="use signature transforms?",
                         type=bool, default=True)
+    parser.add_argument("--eigensolver", help="symmetric eigensolver for "
+                        "the laplacian",
+                        choices=EIGENSOLVERS, default="eigsh")
+    parser.add_argument("--warmstart", help="start the eigensolver from "
+                        "the eigenvectors saved by the previous run",
+                        action="store_true")
+    parser.add_argument("--memory", help="memory budget (in MB) for each "
+                        "block of rows of the shared-context matrix",
+                        type=int, default=SHARED_CONTEXTS_MEMORY)
+    parser.add_argument("--trees", help="number of random-projection trees "
+                        "for approximate nearest neighbors (more trees are "
+                        "slower but find more of the exact neighbors); "
+                        "0 for the exact neighbors",
+                        type=int, default=0)
+    parser.add_argument("--recallsample", help="number of words on which "
+                        "the recall of the approximate neighbors is "
+                        "measured (0 for none)",
+                        type=int, default=ANN_RECALL_SAMPLE)
+    parser.add_argument("--no-cache", help="run even if the input files and "
+                        "the parameters are the same as in the last run "
+                        "(see stage_cache.py)",
+                        action="store_true")
 
     return parser
 
@@ -82,7 +113,9 @@ def makeArgParser(configfilename="config.json"):
 def main(language=None, corpus=None, datafolder=None, filename=None,
          maxwordtypes=1000, nNeighbors=9, nEigenvectors=11, 
          create_WordToContexts=False, create_ContextToWords=False,
-         mincontexts=3, usesigtransforms=True):
+         mincontexts=3, usesigtransforms=True, eigensolver="eigsh",
+         warmstart=False, memory=SHARED_CONTEXTS_MEMORY, trees=0,
+         recallsample=ANN_RECALL_SAMPLE, use_cache=True):
 
     print("\n*****************************************************\n"
           "Running the manifold.py program now...\n")
@@ -104,9 +137,12 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     if not outcontextsfolder.exists():
         outcontextsfolder.mkdir(parents=True)
 
-    infileWordsname = Path(infolder, corpusStem + '_words.txt')
-    infileBigramsname = Path(infolder, corpusStem + '_bigrams.txt')
-    infileTrigramsname = Path(infolder, corpusStem + '_trigrams.txt')
+    # the n-gram files may have been written compressed by ngrams.py
+    infileWordsname = find_input_path(Path(infolder, corpusStem + '_words.txt'))
+    infileBigramsname = find_input_path(Path(infolder,
+                                             corpusStem + '_bigrams.txt'))
+    infileTrigramsname = find_input_path(Path(infolder,
+                                              corpusStem + '_trigrams.txt'))
 
     if (not infileWordsname.exists()) or \
        (not infileBigramsname.exists()) or \
@@ -115,6 +151,10 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
               "The program now creates them.\n")
         ngrams.main(language=language, corpus=corpus,
                         datafolder=datafolder, filename=filename)
+    else:
+        # make the n-gram files again if the corpus file has changed
+        ngrams.remake_if_stale(language=language, corpus=corpus,
+                               datafolder=datafolder, filename=filename)
 
     if usesigtransforms:
         if filename:
@@ -123,6 +163,10 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
             infolderlxa = Path(datafolder, language, 'lxa')
         sigtransform_json_fname = Path(infolderlxa,
                                         corpusStem + "_WordToSigtransforms.json")
+        if sigtransform_json_fname.exists():
+            # run lxa5.py again if the wordlist has changed
+            lxa5.remake_if_stale(language=language, corpus=corpus,
+                                 datafolder=datafolder, filename=filename)
         try:
             WordToSigtransforms = json_pload(sigtransform_json_fname.open())
         except FileNotFoundError:
@@ -134,8 +178,14 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     # WordToSigtransforms just read into the program; to be used soon...
 
+    if ngram_store_exists(infolder, corpusStem):
+        print('Loading the binary n-gram store...', flush=True)
+        ngram_store = load_ngram_store(infolder, corpusStem, mmap_mode='r')
+    else:
+        ngram_store = None
+
     print('Reading word list...', flush=True)
-    mywords = GetMyWords(infileWordsname, corpus)
+    mywords = GetMyWords(infileWordsname, corpus, ngram_store=ngram_store)
 
     print("Word file is", infileWordsname, flush=True)
     print("Number of neighbors to find for each word type: ", nNeighbors)
@@ -153,6 +203,31 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     corpusName = corpusStem + '_' + str(nWordsForAnalysis) + '_' + str(nNeighbors)
 
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "manifold:" + corpusName
+    # the binary store is read instead of the .txt n-gram files if it exists
+    stage_inputs = [infileWordsname, infileBigramsname, infileTrigramsname]
+    stage_inputs += list(ngram_store_paths(infolder, corpusStem).values())
+    if usesigtransforms:
+        stage_inputs.append(sigtransform_json_fname)
+    stage_inputs += source_files("manifold.py", "manifold_module.py",
+                                 "ngram_store.py", "lxa5lib.py")
+    stage_params = {"maxwordtypes": maxwordtypes,
+                    "nNeighbors": nNeighbors,
+                    "nEigenvectors": nEigenvectors,
+                    "create_WordToContexts": create_WordToContexts,
+                    "create_ContextToWords": create_ContextToWords,
+                    "mincontexts": mincontexts,
+                    "usesigtransforms": usesigtransforms,
+                    "eigensolver": eigensolver,
+                    "warmstart": warmstart,
+                    "trees": trees}
+
+    if use_cache and cache.is_fresh(stage, stage_inputs, stage_params):
+        print("The manifold.py outputs are up to date (run with --no-cache "
+              "to make them again).")
+        return
+
     outfilenameNeighbors = Path(outfolder, corpusName + "_neighbors.txt")
 
     outfilenameSharedcontexts = Path(outfolder, corpusName + \
@@ -169,64 +244,86 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     outContextToWords_json = Path(outcontextsfolder, corpusName + \
                                        "_ContextToWords.json")
 
+    outfilenameEigenvectors = Path(outfolder, corpusName + "_eigenvectors.npz")
+
     print("Reading bigrams/trigrams and computing context array...", flush=True)
 
     context_array, contextdict, \
     WordToContexts, ContextToWords = GetContextArray(nWordsForAnalysis,
-        worddict, infileBigramsname, infileTrigramsname, mincontexts)
-
-    print("Computing shared context master matrix...", flush=True)
-    CountOfSharedContexts = context_array.dot(context_array.T).todense()
+        worddict, infileBigramsname, infileTrigramsname, mincontexts,
+        ngram_store=ngram_store)
+
+    # the shared context master matrix (context_array times its transpose)
+    # is computed a block of rows at a time, each block turned into the
+    # rows of the laplacian (a scipy sparse matrix), so that neither the
+    # whole shared-context matrix nor any n x n dense matrix is made
+    print("Computing shared contexts and mylaplacian...", flush=True)
+    mylaplacian = compute_shared_contexts_laplacian(context_array,
+                                                    memory=memory)
     del context_array
 
-    print("Computing diameter...", flush=True)
-    Diameter = Normalize(nWordsForAnalysis, CountOfSharedContexts)
-
-    print("Computing incidence graph...", flush=True)
-    incidencegraph = compute_incidence_graph(nWordsForAnalysis, Diameter,
-                                             CountOfSharedContexts)
-    del CountOfSharedContexts
-
-    print("Computing mylaplacian...", flush=True)
-    mylaplacian = compute_laplacian(nWordsForAnalysis, Diameter, incidencegraph)
-    del Diameter
-    del incidencegraph
-
     print("Computing eigenvectors...", flush=True)
-    myeigenvalues, myeigenvectors = GetEigenvectors(mylaplacian)
+    if warmstart:
+        initial_vectors = load_eigenvectors(outfilenameEigenvectors,
+                                            analyzedwordlist)
+    else:
+        initial_vectors = None
+    myeigenvalues, myeigenvectors = GetEigenvectors(mylaplacian,
+                                        nEigenvectors, solver=eigensolver,
+                                        initial_vectors=initial_vectors)
     del mylaplacian
+
+    save_eigenvectors(outfilenameEigenvectors, analyzedwordlist,
+                      myeigenvalues, myeigenvectors)
     del myeigenvalues
 
-    print('Computing distances between words...', flush=True)
     # take first N columns of eigenvector matrix
     coordinates = myeigenvectors[:,:nEigenvectors] 
-    wordsdistance = compute_words_distance(nWordsForAnalysis, coordinates)
-    del coordinates
 
+    # the same neighbors as by compute_closest_neighbors on the matrix of
+    # the distances between words (compute_words_distance), but found with
+    # a KD-tree, without the n x n matrix; or, with trees > 0, approximate
+    # neighbors found with a random-projection forest
     print('Computing nearest neighbors now... ', flush=True)
-    closestNeighbors = compute_closest_neighbors(wordsdistance, nNeighbors)
+    if trees > 0:
+        closestNeighbors = compute_approximate_neighbors(coordinates,
+                                                         nNeighbors,
+                                                         trees=trees)
+        if recallsample > 0:
+            recall = neighbor_recall(coordinates, closestNeighbors,
+                                     nNeighbors, sample=recallsample)
+            print("Recall of the approximate neighbors "
+                  "(on {} words): {:.4f}".format(
+                      min(recallsample, nWordsForAnalysis), recall),
+                  flush=True)
+    else:
+        closestNeighbors = compute_nearest_neighbors(coordinates, nNeighbors)
+    del coordinates
 
     WordToNeighbors_by_str = OrderedDict()
     WordToNeighbors = dict()
 
+    # row wordno is for word wordno; the word itself is not always in its
+    # first column (when words have the same coordinates)
+    closestNeighbors = remove_words_from_neighbors(closestNeighbors)
+
     for wordno in range(nWordsForAnalysis):
-        line = closestNeighbors[wordno]
-        word_idx, neighbors_idx = line[0], line[1:]
-        word = analyzedwordlist[word_idx]
+        neighbors_idx = closestNeighbors[wordno]
+        word = analyzedwordlist[wordno]
         neighbors = [analyzedwordlist[idx] for idx in neighbors_idx]
         WordToNeighbors_by_str[word] = neighbors
-        WordToNeighbors[word_idx] = neighbors_idx
+        WordToNeighbors[wordno] = neighbors_idx
 
     del closestNeighbors
 
-    with outfilenameNeighbors.open('w') as f:
+    with open_output(outfilenameNeighbors) as f:
         print("# language: {}\n# corpus: {}\n"
               "# Number of word types analyzed: {}\n"
               "# Number of neighbors: {}\n".format(language, corpus,
                                          nWordsForAnalysis, nNeighbors), file=f)
 
-        for word, neighbors in WordToNeighbors_by_str.items():
-            print(word, " ".join(neighbors), file=f)
+        write_rows(f, (word + " " + " ".join(neighbors)
+                       for word, neighbors in WordToNeighbors_by_str.items()))
 
     neighbor_graph = GetMyGraph(WordToNeighbors_by_str)
 
@@ -260,7 +357,7 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     outputfilelist = [outfilenameNeighbors, outfilenameNeighborGraph,
                       WordToNeighbors_json, outfilenameSharedcontexts,
                       outfilenameImportantContextToWords,
-                      outfilenameManifoldJson]
+                      outfilenameManifoldJson, outfilenameEigenvectors]
 
     if create_WordToContexts:
         outputfilelist.append(outWordToContexts_json)
@@ -274,6 +371,8 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     stdout_list("Output files:", *outputfilelist)
 
+    cache.record(stage, stage_inputs, stage_params, outputfilelist)
+
 
 if __name__ == "__main__":
 
@@ -286,6 +385,12 @@ if __name__ == "__main__":
     create_ContextToWords = args.contexttowords
     mincontexts = args.mincontexts
     usesigtransforms = args.usesigtransforms
+    eigensolver = args.eigensolver
+    warmstart = args.warmstart
+    memory = args.memory
+    trees = args.trees
+    recallsample = args.recallsample
+    use_cache = not args.no_cache
 
     description="You are running {}.\n".format(__file__) + \
                 "This program computes word neighbors.\n" + \
@@ -295,7 +400,10 @@ if __name__ == "__main__":
                 "create_WordToContexts = {}\n".format(create_WordToContexts) + \
                 "create_ContextToWords = {}\n".format(create_ContextToWords) + \
                 "mincontexts = {}\n".format(mincontexts) + \
-                "usesigtransforms = {}".format(usesigtransforms)
+                "usesigtransforms = {}\n".format(usesigtransforms) + \
+                "eigensolver = {}\n".format(eigensolver) + \
+                "memory = {} MB\n".format(memory) + \
+                "trees = {}".format(trees)
 
     language, corpus, datafolder = get_language_corpus_datafolder(args.language,
                                       args.corpus, args.datafolder, args.config,
@@ -313,5 +421,7 @@ if __name__ == "__main__":
          create_WordToContexts=create_WordToContexts,
          create_ContextToWords=create_ContextToWords,
          mincontexts=mincontexts,
-         usesigtransforms=usesigtransforms)
+         usesigtransforms=usesigtransforms, eigensolver=eigensolver,
+         warmstart=warmstart, memory=memory, trees=trees,
+         recallsample=recallsample, use_cache=use_cache)
 
@@ -10,22 +10,60 @@
 #-----------------------------------------------------------------------#
 
 from collections import (OrderedDict, defaultdict, Counter)
+from collections.abc import Mapping
 from itertools import combinations
 from pathlib import Path
+import time
 
 import numpy as np
 import scipy.spatial
 import scipy.sparse
+import scipy.sparse.linalg
 import networkx as nx
 
-from lxa5lib import sorted_alphabetized
+from lxa5lib import (sorted_alphabetized, open_input, open_output)
+
+# number of rows of the sparse shared-context matrices handled at a time,
+# which bounds the size of the temporary arrays
+ROWBLOCK = 1024
+
+# default memory budget (in MB) for a block of rows of the shared-context
+# matrix in compute_shared_contexts_laplacian, and the bytes taken by
+# each of its entries there (the int64 count and int32 column, and the
+# float64 arrays computing the laplacian entry)
+SHARED_CONTEXTS_MEMORY = 256
+SHARED_CONTEXTS_BYTES_PER_ENTRY = 40
+
+EIGENSOLVERS = ("eigsh", "lobpcg")
+
+# for matrices too small for the iterative eigensolvers (which need more
+# rows than eigenvectors, LOBPCG about five times more)
+LOBPCG_MIN_ROWS_PER_EIGENVECTOR = 5
+
+LOBPCG_TOLERANCE = 1e-8
+LOBPCG_MAXITER = 500
+
+# relative (and absolute) difference within which two distances found by
+# the KD-tree may be a tie, to be broken by the exact distances
+NEIGHBOR_TIE_TOLERANCE = 1e-9
+
+# approximate nearest neighbors (compute_approximate_neighbors): the
+# default number of random-projection trees, the smallest leaf size
+# split by the trees, the rounds of neighbors-of-neighbors refinement,
+# and the number of words on which the recall is measured
+ANN_TREES = 8
+ANN_LEAFSIZE = 32
+ANN_REFINE_ROUNDS = 1
+ANN_RECALL_SAMPLE = 200
 
 def Normalize(NumberOfWordsForAnalysis, CountOfSharedContexts):
-    arr = np.ones((NumberOfWordsForAnalysis), dtype=np.int64)
-    for word_no in range(NumberOfWordsForAnalysis):
-        arr[word_no] = np.sum(CountOfSharedContexts[word_no]) - \
-                       CountOfSharedContexts[word_no, word_no]
-    return arr
+    # the diameter of a word is the number of contexts it shares with the
+    # other words: its row sum minus the diagonal. CountOfSharedContexts is
+    # a scipy sparse matrix (or a dense ndarray or np.matrix); the result is
+    # a 1-d array in all cases
+    rowsums = np.asarray(CountOfSharedContexts.sum(axis=1)).ravel()
+    diagonal = np.asarray(CountOfSharedContexts.diagonal()).ravel()
+    return (rowsums - diagonal).astype(np.int64)
 
 def hasGooglePOSTag(line, corpus):
     if corpus == 'google':
@@ -38,10 +76,23 @@ def hasGooglePOSTag(line, corpus):
     else:
         return False
 
-def GetMyWords(infileWordsname, corpus, minWordFreq=1):
+def GetMyWords(infileWordsname, corpus, minWordFreq=1, ngram_store=None):
     mywords = dict()
 
-    with infileWordsname.open() as wordfile:
+    if ngram_store is not None:
+        # same words and order as in the wordlist file
+        for word, wordFreq in zip(ngram_store.vocabulary,
+                                  ngram_store.word_counts.tolist()):
+            if word.startswith('#') or hasGooglePOSTag(word, corpus):
+                continue
+            if wordFreq < minWordFreq:
+                break
+            mywords[word] = wordFreq
+
+        return OrderedDict(sorted(mywords.items(),
+                                  key=lambda x:x[1], reverse=True))
+
+    with open_input(infileWordsname) as wordfile:
         for line in wordfile:
             line = line.replace('\n', '').replace('\r', '')
             if (not line) or line.startswith('#') or hasGooglePOSTag(line, corpus):
@@ -68,143 +119,409 @@ def GetMyGraph(WordToNeighbors_by_str, useWeights=None):
     return G
 
 
-def GetContextArray(nwords, worddict,
-                    infileBigramsname, infileTrigramsname, mincontexts):
-
-    # this is necessary so we can reference variables from inner functions
-    class Namespace:
-        pass
-    ns = Namespace()
-    # more notes: We use "ncontexts" to keep track of how many unique contexts
-    # there are. Conveniently, ncontexts also serves to provide a unique context
-    # index whenever the program encounters a new context. The dummy class
-    # Namespace is to make it possible that we can refer to and update ncontexts
-    # within inner functions (both "contexts_incr" and "addword")
-    # inside this "GetContextArray" function.
-
-    ns.ncontexts = 0
-    def contexts_incr():
-        tmp = ns.ncontexts
-        ns.ncontexts += 1
-        return tmp
-
-    contextdict = defaultdict(contexts_incr)
-    # key: context (tuple, e.g. ("of", "_", "cat") as a trigram context for "the"
-    # value: context index (int)
-    # This dict is analogous to worddict, where each key is a word (str)
-    # and each value is a word index (int).
-
-    # entries for sparse matrix
-    rows = [] # row numbers are word indices
-    cols = [] # column numbers are context indices
-    vals = [] 
-
-    # both WordToContexts and ContextToWords use integers as indices and do NOT
-    # store strings directly
-    # so WordToContexts maps word indices to context indices
-    # and ContextToWords maps context indices to word indices
-    # we need the indices anyway, because of the use of scipy sparse matrix
-    # and we keep this indexing approach for memory efficiency
-    # (e.g., avoid direct string comparison)
-
-    WordToContexts = defaultdict(Counter)
-    ContextToWords = defaultdict(Counter)
-
-    def addword(word, context, occurrence_count):
-        word_no = worddict[word] # w is a word index
-        context_no = contextdict[context] # c is a context index
-        rows.append(word_no)
-        cols.append(context_no)
-        vals.append(1) # if we use 1, we assume "type" counts.
-                       # What if we use occurrence_count (--> "token" counts)?
-
-        WordToContexts[word_no][context_no] += occurrence_count
-        ContextToWords[context_no][word_no] += occurrence_count
-
-    with infileTrigramsname.open() as trigramfile:
-        for line in trigramfile:
+def read_ngrams(infilename, n, mincontexts):
+    """Yield (word1, ..., wordn, count) for each n-gram in the text file
+    infilename that occurs at least mincontexts times"""
+    with open_input(infilename) as ngramfile:
+        for line in ngramfile:
             line = line.strip()
             if (not line) or line.startswith('#'):
                 continue
             line_components = line.split()
 
-            word1 = line_components[0]
-            word2 = line_components[1]
-            word3 = line_components[2]
-            occurrence_count = int(line_components[3])
+            occurrence_count = int(line_components[n])
 
             if occurrence_count < mincontexts:
                 continue
 
-            context1 = tuple(['_', word2, word3])
-            context2 = tuple([word1, '_', word3])
-            context3 = tuple([word1, word2, '_'])
-
-            if worddict.get(word1) is not None:
-                addword(word1, context1, occurrence_count)
-            if worddict.get(word2) is not None:
-                addword(word2, context2, occurrence_count)
-            if worddict.get(word3) is not None:
-                addword(word3, context3, occurrence_count)
-
-    with infileBigramsname.open() as bigramfile:
-        for line in bigramfile:
-            line = line.strip()
-            if (not line) or line.startswith('#'):
-                continue
-            line_components = line.split()
+            yield tuple(line_components[:n]) + (occurrence_count,)
+
+
+def read_ngram_arrays(infilename, n, mincontexts, vocabulary, WordToID):
+    """Return the n-grams of the text file infilename that occur at least
+    mincontexts times (see read_ngrams) as an (m, n) array of word IDs and
+    an array of counts. The IDs index vocabulary; new words are added to
+    vocabulary and WordToID."""
+    wordIDs = list()
+    counts = list()
+    for *words, occurrence_count in read_ngrams(infilename, n, mincontexts):
+        for word in words:
+            try:
+                wordIDs.append(WordToID[word])
+            except KeyError:
+                WordToID[word] = len(vocabulary)
+                wordIDs.append(len(vocabulary))
+                vocabulary.append(word)
+        counts.append(occurrence_count)
+    return (np.array(wordIDs, dtype=np.int64).reshape(-1, n),
+            np.array(counts, dtype=np.int64))
+
+
+def read_ngram_arrays_from_store(wordIDs, counts, mincontexts):
+    """Same as read_ngram_arrays, but from the word-ID and count arrays of
+    an NgramStore, with the count filter applied to the whole array"""
+    rows = np.flatnonzero(np.asarray(counts) >= mincontexts)
+    return (np.asarray(wordIDs[rows], dtype=np.int64),
+            np.asarray(counts[rows], dtype=np.int64))
+
+
+def _factorize_rows(rows):
+    """Number the distinct rows of the 2-D integer array rows 0, 1, ...
+    in the order in which they first occur. Return (the number of each
+    row, the index of the first occurrence of each number)."""
+    if not len(rows):
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    base = int(rows.max()) + 1
+    if base ** rows.shape[1] < 2 ** 63:
+        # one int64 key per row
+        keys = np.zeros(len(rows), dtype=np.int64)
+        for column in rows.T:
+            keys = keys * base + column
+        _, first, inverse = np.unique(keys, return_index=True,
+                                      return_inverse=True)
+    else:
+        _, first, inverse = np.unique(rows, axis=0, return_index=True,
+                                      return_inverse=True)
+
+    # renumber from the order of the sorted keys to the order of first
+    # occurrence
+    order = np.argsort(first, kind="stable")
+    renumber = np.empty(len(first), dtype=np.int64)
+    renumber[order] = np.arange(len(first))
+    return renumber[inverse.ravel()], first[order]
+
+
+class SparseCounts(Mapping):
+    """Read-only map from row numbers to Counters of column numbers and
+    counts, stored as a csr matrix; used like the defaultdict(Counter)
+    WordToContexts and ContextToWords. The entries of each row are stored
+    in the order of the Counter, and a Counter is only made when its row
+    is looked up (then it is kept for the next lookups). A row with no
+    entries maps to an empty Counter, but is not one of the keys."""
+
+    def __init__(self, matrix, keys):
+        self.matrix = matrix
+        self.keys_array = keys
+        self._counters = dict()
+
+    def __len__(self):
+        return len(self.keys_array)
+
+    def __iter__(self):
+        return iter(self.keys_array.tolist())
+
+    def _is_row(self, row):
+        # any other key (e.g. a string) is simply not in the map
+        return (isinstance(row, (int, np.integer)) and
+                0 <= row < self.matrix.shape[0])
+
+    def __contains__(self, row):
+        return (self._is_row(row) and
+                self.matrix.indptr[row] < self.matrix.indptr[row + 1])
+
+    def __getitem__(self, row):
+        try:
+            return self._counters[row]
+        except KeyError:
+            pass
+        if not self._is_row(row):
+            raise KeyError(row)
+        start, end = self.matrix.indptr[row: row + 2].tolist()
+        counter = Counter(dict(zip(self.matrix.indices[start: end].tolist(),
+                                   self.matrix.data[start: end].tolist())))
+        self._counters[row] = counter
+        return counter
+
+
+def _sparse_counts(rows, columns, counts, nrows, ncolumns):
+    """Make the SparseCounts of the (row, column, count) entries given as
+    arrays; the rows, and the columns of each row, keep the order of the
+    arrays"""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(nrows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=nrows), out=indptr[1:])
+    matrix = scipy.sparse.csr_matrix((counts[order], columns[order], indptr),
+                                     shape=(nrows, ncolumns))
+
+    # the rows in the order in which they first occur
+    _, first = np.unique(rows, return_index=True)
+    keys = rows[np.sort(first)]
+    return SparseCounts(matrix, keys)
 
-            word1 = line_components[0]
-            word2 = line_components[1]
-            occurrence_count = int(line_components[2])
 
-            if occurrence_count < mincontexts:
-                continue
+def GetContextArray(nwords, worddict,
+                    infileBigramsname, infileTrigramsname, mincontexts,
+                    ngram_store=None):
+    """Return (context_array, contextdict, WordToContexts, ContextToWords).
+
+    The contexts of a word are its trigrams and bigrams with the word
+    replaced by "_", e.g. ("of", "_", "cat") as a trigram context for
+    "the". contextdict maps each context (a tuple of words) to its index,
+    in the order in which the contexts first occur (the trigrams first),
+    just as worddict maps each word to its index. context_array is the csr
+    matrix whose [word index, context index] entry is 1 if the word occurs
+    in the context.
+
+    WordToContexts maps word indices to Counters of context indices and
+    the occurrence counts of the n-grams, and ContextToWords maps context
+    indices to Counters of word indices and counts. Both are SparseCounts
+    (used like defaultdict(Counter)), and do NOT store strings directly,
+    for memory efficiency (e.g., avoid direct string comparison).
+
+    All of these are made from arrays of word IDs: each context is a row
+    of word IDs (with an ID for "_"), and the contexts are numbered with
+    np.unique.
+    """
+    if ngram_store is not None:
+        # binary n-gram store written by ngrams.py: no text parsing
+        vocabulary = ngram_store.vocabulary
+        trigrams, trigram_counts = read_ngram_arrays_from_store(
+                ngram_store.trigrams, ngram_store.trigram_counts, mincontexts)
+        bigrams, bigram_counts = read_ngram_arrays_from_store(
+                ngram_store.bigrams, ngram_store.bigram_counts, mincontexts)
+    else:
+        vocabulary = list()
+        WordToID = dict()
+        trigrams, trigram_counts = read_ngram_arrays(infileTrigramsname, 3,
+                                        mincontexts, vocabulary, WordToID)
+        bigrams, bigram_counts = read_ngram_arrays(infileBigramsname, 2,
+                                        mincontexts, vocabulary, WordToID)
+
+    # the word index of each word ID (-1 if the word is not analyzed), and
+    # the ID of "_" (a new one, unless "_" is itself a word)
+    names = list(vocabulary)
+    wordIDToWordNo = np.array([worddict.get(word, -1) for word in names] +
+                              [-1], dtype=np.int64)
+    try:
+        underscore = names.index("_")
+    except ValueError:
+        underscore = len(names)
+        names.append("_")
+
+    word_nos = list()
+    context_nos = list()
+    occurrence_counts = list()
+    contexts = list()
+    ncontexts = 0
+
+    for ngrams, counts in [(trigrams, trigram_counts),
+                           (bigrams, bigram_counts)]:
+        # one (word, context) pair for each analyzed word of each n-gram,
+        # in the order of the n-grams and of the words in them
+        ngram_word_nos = wordIDToWordNo[ngrams]
+        rows, positions = np.nonzero(ngram_word_nos >= 0)
+
+        ngram_contexts = ngrams[rows]
+        ngram_contexts[np.arange(len(rows)), positions] = underscore
+
+        numbers, first = _factorize_rows(ngram_contexts)
+
+        word_nos.append(ngram_word_nos[rows, positions])
+        context_nos.append(numbers + ncontexts)
+        occurrence_counts.append(counts[rows])
+        contexts += ngram_contexts[first].tolist()
+        ncontexts += len(first)
+
+    word_nos = np.concatenate(word_nos)
+    context_nos = np.concatenate(context_nos)
+    occurrence_counts = np.concatenate(occurrence_counts)
+
+    contextdict = {tuple([names[i] for i in context]): context_no
+                   for context_no, context in enumerate(contexts)}
+
+    # entries for sparse matrix: row numbers are word indices, column
+    # numbers are context indices, and the values are 1 (if we use 1, we
+    # assume "type" counts. What if we use occurrence_count (--> "token"
+    # counts)?)
+    # csr_matrix in scipy means compressed matrix
+    context_array = scipy.sparse.csr_matrix(
+                        (np.ones(len(word_nos), dtype=np.int64),
+                         (word_nos, context_nos)),
+                        shape=(nwords, ncontexts + 1), dtype=np.int64)
 
-            context1 = tuple(['_', word2])
-            context2 = tuple([word1, '_'])
+    # the occurrence counts of each distinct (word, context) pair
+    pair_nos, first = _factorize_rows(np.stack([word_nos, context_nos],
+                                               axis=1))
+    pair_counts = np.zeros(len(first), dtype=np.int64)
+    np.add.at(pair_counts, pair_nos, occurrence_counts)
+    pair_words = word_nos[first]
+    pair_contexts = context_nos[first]
 
-            if worddict.get(word1) is not None:
-                addword(word1, context1, occurrence_count)
-            if worddict.get(word2) is not None:
-                addword(word2, context2, occurrence_count)
+    WordToContexts = _sparse_counts(pair_words, pair_contexts, pair_counts,
+                                    nwords, ncontexts)
+    ContextToWords = _sparse_counts(pair_contexts, pair_words, pair_counts,
+                                    ncontexts, nwords)
 
-    # csr_matrix in scipy means compressed matrix
-    return ( scipy.sparse.csr_matrix((vals,(rows,cols)),
-                shape=(nwords, ns.ncontexts+1), dtype=np.int64 ),
-             contextdict, WordToContexts, ContextToWords )
+    return context_array, contextdict, WordToContexts, ContextToWords
 
 
 def counting_context_features(context_array):
     return np.dot(context_array, context_array.T) 
 
 
-def compute_incidence_graph(NumberOfWordsForAnalysis, Diameter, CountOfSharedContexts):
-    incidencegraph= np.asarray(CountOfSharedContexts, dtype=np.int64)
-
-    for word_no in range(NumberOfWordsForAnalysis):
-        incidencegraph[word_no, word_no] = Diameter[word_no]
+def _entry_rows(matrix, start, end, first_row=0):
+    """Word numbers of the stored entries of rows start to end of the csr
+    matrix (aligned with matrix.indices[matrix.indptr[start]:
+    matrix.indptr[end]]), whose first row is the word first_row"""
+    return np.repeat(np.arange(first_row + start, first_row + end,
+                               dtype=np.int32),
+                     np.diff(matrix.indptr[start: end + 1]))
+
+
+def compute_incidence_graph(NumberOfWordsForAnalysis, Diameter, CountOfSharedContexts,
+                            first_row=0):
+    # CountOfSharedContexts (a scipy csr matrix) with its diagonal replaced
+    # by Diameter, in place. A word with no stored diagonal entry has no
+    # contexts at all, so its diameter is zero and nothing is inserted.
+    # CountOfSharedContexts may also be the block of NumberOfWordsForAnalysis
+    # rows starting at the word first_row. A dense CountOfSharedContexts
+    # (e.g. from todense) is handled as an int64 array, also in place.
+    if not scipy.sparse.issparse(CountOfSharedContexts):
+        incidencegraph = np.asarray(CountOfSharedContexts, dtype=np.int64)
+        np.fill_diagonal(incidencegraph[:, first_row:],
+                         Diameter[first_row: first_row + NumberOfWordsForAnalysis])
+        return incidencegraph
+
+    incidencegraph = CountOfSharedContexts
+    for start in range(0, NumberOfWordsForAnalysis, ROWBLOCK):
+        end = min(start + ROWBLOCK, NumberOfWordsForAnalysis)
+        lo, hi = incidencegraph.indptr[start], incidencegraph.indptr[end]
+        rows = _entry_rows(incidencegraph, start, end, first_row)
+        on_diagonal = np.flatnonzero(incidencegraph.indices[lo: hi] == rows)
+        incidencegraph.data[lo + on_diagonal] = Diameter[rows[on_diagonal]]
+    incidencegraph.eliminate_zeros()
     return incidencegraph
 
 
 
-def compute_laplacian(NumberOfWordsForAnalysis, Diameter, incidencegraph): 
-    D = np.sqrt(np.outer(Diameter, Diameter))
-    # we want to NOT have div-by-zero errors,
-    # but if D[i,j] = 0 then incidencegraph[i,j] = 0 too.
-    D[D==0] = 1
-
-    # broadcasts the multiplication, so A[i,j] = B[i,j] * C[i, j]
-    mylaplacian = (1/D) * incidencegraph 
+def compute_laplacian(NumberOfWordsForAnalysis, Diameter, incidencegraph,
+                      first_row=0):
+    # mylaplacian[i,j] = incidencegraph[i,j] / sqrt(Diameter[i] * Diameter[j]),
+    # computed for the stored entries of the sparse incidencegraph only, a
+    # block of rows at a time, so that no n x n matrix such as
+    # np.outer(Diameter, Diameter) is made. mylaplacian shares the indices
+    # of incidencegraph (which may be a block of rows, as in
+    # compute_incidence_graph). A dense incidencegraph gives a dense
+    # mylaplacian, also computed a block of rows at a time.
+    Diameter = np.asarray(Diameter, dtype=np.int64)
+
+    if not scipy.sparse.issparse(incidencegraph):
+        incidencegraph = np.asarray(incidencegraph)
+        mylaplacian = np.empty(incidencegraph.shape, dtype=np.float64)
+        for start in range(0, NumberOfWordsForAnalysis, ROWBLOCK):
+            end = min(start + ROWBLOCK, NumberOfWordsForAnalysis)
+            D = np.sqrt(np.outer(Diameter[first_row + start: first_row + end],
+                                 Diameter))
+            D[D==0] = 1
+            mylaplacian[start: end] = (1/D) * incidencegraph[start: end]
+        return mylaplacian
+
+    data = np.empty(len(incidencegraph.data), dtype=np.float64)
+
+    for start in range(0, NumberOfWordsForAnalysis, ROWBLOCK):
+        end = min(start + ROWBLOCK, NumberOfWordsForAnalysis)
+        lo, hi = incidencegraph.indptr[start], incidencegraph.indptr[end]
+        rows = _entry_rows(incidencegraph, start, end, first_row)
+
+        D = np.sqrt(Diameter[rows] * Diameter[incidencegraph.indices[lo: hi]])
+        # we want to NOT have div-by-zero errors,
+        # but if D[i,j] = 0 then incidencegraph[i,j] = 0 too.
+        D[D==0] = 1
+
+        data[lo: hi] = (1/D) * incidencegraph.data[lo: hi]
+
+    mylaplacian = scipy.sparse.csr_matrix((data, incidencegraph.indices,
+                                           incidencegraph.indptr),
+                                          shape=incidencegraph.shape)
     return mylaplacian
 
+
+def compute_diameter(context_array):
+    """The same diameters as Normalize(n, context_array.dot(context_array.T)),
+    without the shared-context matrix: its row sums are
+    context_array.dot(column sums of context_array)"""
+    rowsums = context_array.dot(np.asarray(context_array.sum(axis=0)).ravel())
+    diagonal = np.asarray(context_array.multiply(context_array).sum(axis=1))
+    return (rowsums - diagonal.ravel()).astype(np.int64)
+
+
+def _shared_context_blocks(context_array, max_entries):
+    """(start, end) of the blocks of rows of the shared-context matrix with
+    at most max_entries stored entries each (or a single row). The number
+    of entries of a row is at most the number of products summed for it,
+    and at most the number of words."""
+    nwords = context_array.shape[0]
+    pattern = context_array.copy()
+    pattern.data = np.ones(len(pattern.data), dtype=np.int64)
+    products = pattern.dot(np.bincount(pattern.indices,
+                                       minlength=pattern.shape[1]))
+    entries = np.cumsum(np.minimum(products, nwords))
+
+    start = 0
+    while start < nwords:
+        offset = entries[start - 1] if start else 0
+        end = int(np.searchsorted(entries, offset + max_entries, side="right"))
+        end = max(end, start + 1)
+        yield start, end
+        start = end
+
+
+def compute_shared_contexts_laplacian(context_array,
+                                      memory=SHARED_CONTEXTS_MEMORY):
+    """Return the laplacian computed by compute_laplacian from the diameters
+    (Normalize) and the incidence graph (compute_incidence_graph) of the
+    shared-context matrix context_array.dot(context_array.T), without
+    making this n x n matrix: it is computed one block of rows at a time,
+    each block taking at most about memory MB, and only the laplacian
+    entries of the block are kept. The diameters come from compute_diameter.
+    """
+    nwords = context_array.shape[0]
+    context_array = context_array.tocsr()
+    context_array_T = context_array.T.tocsr()
+
+    Diameter = compute_diameter(context_array)
+
+    max_entries = max(1, memory * 2**20 // SHARED_CONTEXTS_BYTES_PER_ENTRY)
+    blocks = list(_shared_context_blocks(context_array, max_entries))
+    print("{} block(s) of the shared-context matrix".format(len(blocks)),
+          flush=True)
+
+    # the laplacian entries of each block are appended to indices and data,
+    # which are resized in place (without copying the large arrays)
+    index_dtype = np.int32 if nwords ** 2 < 2**31 else np.int64
+    indptr = np.zeros(nwords + 1, dtype=index_dtype)
+    indices = np.empty(0, dtype=index_dtype)
+    data = np.empty(0, dtype=np.float64)
+
+    for start, end in blocks:
+        CountOfSharedContexts = context_array[start: end].dot(
+                                                context_array_T).tocsr()
+        incidencegraph = compute_incidence_graph(end - start, Diameter,
+                                                 CountOfSharedContexts,
+                                                 first_row=start)
+        block = compute_laplacian(end - start, Diameter, incidencegraph,
+                                  first_row=start)
+        del CountOfSharedContexts, incidencegraph
+
+        lo = len(data)
+        hi = lo + len(block.data)
+        indices.resize(hi, refcheck=False)
+        data.resize(hi, refcheck=False)
+        indices[lo: hi] = block.indices
+        data[lo: hi] = block.data
+        indptr[start + 1: end + 1] = lo + block.indptr[1:]
+        del block
+
+    return scipy.sparse.csr_matrix((data, indices, indptr),
+                                   shape=(nwords, nwords))
+
+
 def compute_coordinates(NumberOfWordsForAnalysis, NumberOfEigenvectors, myeigenvectors):
-    Coordinates = dict()
-    for wordno in range(NumberOfWordsForAnalysis):
-        Coordinates[wordno]= list() 
-        for eigenno in range(NumberOfEigenvectors):
-            Coordinates[wordno].append( myeigenvectors[ wordno, eigenno ] )
-    return Coordinates
+    # word number -> list of its first NumberOfEigenvectors coordinates
+    coordinates = np.asarray(myeigenvectors[:NumberOfWordsForAnalysis,
+                                            :NumberOfEigenvectors])
+    return dict(enumerate(coordinates.tolist()))
 
 
 
@@ -214,51 +531,499 @@ def compute_words_distance(nwords, coordinates):
 
 
 def compute_closest_neighbors(wordsdistance, NumberOfNeighbors):
-    sortedNeighbors = wordsdistance.argsort() # indices of sorted rows, low to high
+    # indices of sorted rows, low to high; the sort is stable, so that words
+    # at the same distance are in the order of their indices
+    sortedNeighbors = wordsdistance.argsort(kind="stable")
     # truncate columns at NumberOfNeighbors+1 
     closestNeighbors = sortedNeighbors[:,:NumberOfNeighbors+1] 
     return closestNeighbors
 
 
-def GetEigenvectors(laplacian):
-    # csr_matrix in scipy means compressed matrix
-    laplacian_sparse = scipy.sparse.csr_matrix(laplacian)
+def remove_words_from_neighbors(closestNeighbors):
+    """Return the rows of closestNeighbors (the word and its closest words,
+    as computed by compute_closest_neighbors or compute_nearest_neighbors)
+    without the word itself, so with one column fewer.
+
+    The first column is not always the word: words at the same coordinates
+    (e.g. all the words with no contexts) are ordered by index, so a word
+    may come after the others, or even not be in its own row. The word is
+    removed wherever it is, and the last column of a row without it.
+    """
+    closestNeighbors = np.asarray(closestNeighbors)
+    nwords, ncolumns = closestNeighbors.shape
+    keep = closestNeighbors != np.arange(nwords)[:, None]
+    keep[keep.all(axis=1), -1] = False
+    return closestNeighbors[keep].reshape(nwords, ncolumns - 1)
+
+
+def _exact_distances(coordinates, rows, candidates):
+    """Euclidean distances between coordinates[rows[i]] and
+    coordinates[candidates[i, j]]; the squares are summed dimension by
+    dimension, with the same arithmetic as pdist in compute_words_distance"""
+    # gathering from the contiguous column of each dimension is faster
+    columns = np.ascontiguousarray(np.asarray(coordinates).T)
+    distances = np.zeros(candidates.shape)
+    for column in columns:
+        distances += (column[rows][:, None] - column[candidates]) ** 2
+    return np.sqrt(distances)
+
+
+def _sort_neighbors(distances, candidates, k):
+    """The first k candidates of each row by (distance, index)"""
+    order = np.lexsort((candidates, distances))[..., :k]
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def compute_nearest_neighbors(coordinates, NumberOfNeighbors, workers=-1):
+    """Return the same array as
+    compute_closest_neighbors(compute_words_distance(n, coordinates),
+    NumberOfNeighbors), the word itself and its NumberOfNeighbors closest
+    words in each row, ordered by (distance, index), but using a KD-tree
+    (scipy.spatial.cKDTree, queried with as many worker threads as
+    workers; -1 for all CPUs) instead of the n x n distance matrix.
+
+    The KD-tree finds the NumberOfNeighbors + 2 nearest words of each word.
+    If the last of them is clearly further away than the one before, the
+    others are the closest words; otherwise (a possible tie at the cutoff),
+    all the words within that distance are taken from the tree. The
+    closest words are then ordered by their exact distances, as computed
+    for compute_words_distance, and by their indices.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    nwords = coordinates.shape[0]
+    k = min(NumberOfNeighbors + 1, nwords)
+    kquery = min(k + 1, nwords)
+
+    tree = scipy.spatial.cKDTree(coordinates)
+    distances, candidates = tree.query(coordinates, k=kquery, workers=workers)
+    distances = distances.reshape(nwords, kquery)
+    candidates = candidates.reshape(nwords, kquery)
+
+    cutoff = distances[:, k - 1] * (1 + NEIGHBOR_TIE_TOLERANCE) + \
+             NEIGHBOR_TIE_TOLERANCE
+    if kquery > k:
+        tied = np.flatnonzero(distances[:, k] <= cutoff)
+    else:
+        # every word is a candidate
+        tied = np.zeros(0, dtype=np.int64)
+
+    rows = np.arange(nwords)
+    candidates = candidates[:, :k]
+    closestNeighbors = _sort_neighbors(
+                            _exact_distances(coordinates, rows, candidates),
+                            candidates, k)
+
+    for word_no in tied.tolist():
+        tied_candidates = np.array(tree.query_ball_point(
+                                        coordinates[word_no], cutoff[word_no]),
+                                   dtype=np.int64)[None, :]
+        closestNeighbors[word_no] = _sort_neighbors(
+                            _exact_distances(coordinates, [word_no],
+                                             tied_candidates),
+                            tied_candidates, k)[0]
 
-    # linalg is the linear algebra module in scipy
-    # eigs takes a matrix and returns (array of eigenvalues, array of eigenvectors)
-    return scipy.sparse.linalg.eigs(laplacian_sparse)
+    return closestNeighbors
 
 
-def compute_WordToSharedContextsOfNeighbors(nWordsForAnalysis, WordToContexts,
-                                        WordToNeighbors, ContextToWords,
-                                        nNeighbors, mincontexts):
+def _random_projection_leaves(coordinates, leafsize, rng):
+    """Leaf number of each word in a random-projection tree: each node with
+    more than leafsize words is split in two halves at the median of the
+    projections of its words on a random direction. The nodes of a level
+    are all split at once. Return (leaf numbers, number of leaves)."""
+    nwords, ndims = coordinates.shape
+    labels = np.zeros(nwords, dtype=np.int64)
+    nlabels = 1
+
+    while True:
+        sizes = np.bincount(labels, minlength=nlabels)
+        split = sizes > leafsize
+        if not split.any():
+            return labels, nlabels
+
+        directions = rng.standard_normal((nlabels, ndims))
+        projections = np.einsum("ij,ij->i", coordinates, directions[labels])
+
+        # rank of each word in its node, by projection
+        order = np.lexsort((projections, labels))
+        starts = np.cumsum(sizes) - sizes
+        ranks = np.empty(nwords, dtype=np.int64)
+        ranks[order] = np.arange(nwords) - starts[labels[order]]
+
+        upper = split[labels] & (ranks >= sizes[labels] // 2)
+        labels = np.unique(labels * 2 + upper, return_inverse=True)[1]
+        nlabels = int(labels.max()) + 1
+
+
+def _best_candidates(coordinates, candidates, k):
+    """The first k candidates of each row by (distance, index), as in
+    _sort_neighbors; repeated candidates and padding (-1) are dropped"""
+    candidates = np.sort(candidates, axis=1)
+    invalid = candidates < 0
+    invalid[:, 1:] |= candidates[:, 1:] == candidates[:, :-1]
+
+    rows = np.arange(len(candidates))
+    distances = _exact_distances(coordinates, rows,
+                                 np.where(invalid, 0, candidates))
+    distances[invalid] = np.inf
+    return _sort_neighbors(distances, candidates, k)
+
+
+def _leaf_distances(coordinates, leaves):
+    """Distances between the words of each leaf (a row of word numbers,
+    padded with -1; inf for the padding), with the same arithmetic as
+    _exact_distances"""
+    distances = np.zeros(leaves.shape + leaves.shape[1:])
+    for column in np.ascontiguousarray(coordinates.T):
+        leaf_column = column[leaves]
+        distances += (leaf_column[:, :, None] - leaf_column[:, None, :]) ** 2
+    padding = leaves < 0
+    distances[padding[:, :, None] | padding[:, None, :]] = np.inf
+    return np.sqrt(distances)
+
+
+def compute_approximate_neighbors(coordinates, NumberOfNeighbors,
+                                  trees=ANN_TREES, seed=0):
+    """Return an array like compute_nearest_neighbors (the word itself and
+    its NumberOfNeighbors closest words in each row, ordered by (distance,
+    index)), but with approximate neighbors found by a forest of
+    random-projection trees: the candidates of a word are the words in
+    its leaf of each tree, and then (ANN_REFINE_ROUNDS times) the
+    neighbors of its neighbors. More trees give more of the exact
+    neighbors (see neighbor_recall), in more time.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    nwords = coordinates.shape[0]
+    k = min(NumberOfNeighbors + 1, nwords)
+    leafsize = max(ANN_LEAFSIZE, 2 * k)
+    rng = np.random.default_rng(seed)
+
+    # the best candidates so far, and their distances
+    closestNeighbors = np.arange(nwords)[:, None]
+    distances = np.zeros((nwords, 1))
+
+    for _ in range(trees):
+        labels, nlabels = _random_projection_leaves(coordinates, leafsize,
+                                                    rng)
+        # the words of each leaf, in a row padded with -1
+        sizes = np.bincount(labels, minlength=nlabels)
+        order = np.argsort(labels, kind="stable")
+        positions = np.empty(nwords, dtype=np.int64)
+        positions[order] = np.arange(nwords) - \
+                           (np.cumsum(sizes) - sizes)[labels[order]]
+        leaves = np.full((nlabels, sizes.max()), -1, dtype=np.int64)
+        leaves[labels, positions] = np.arange(nwords)
+
+        leaf_candidates = leaves[labels]
+        leaf_distances = _leaf_distances(coordinates, leaves)[labels,
+                                                              positions]
+        del leaves
+
+        # the words already among the best candidates are not added again
+        known = (leaf_candidates[:, :, None] ==
+                 closestNeighbors[:, None, :]).any(axis=2)
+        leaf_distances[known] = np.inf
+
+        candidates = np.concatenate([closestNeighbors, leaf_candidates],
+                                    axis=1)
+        candidate_distances = np.concatenate([distances, leaf_distances],
+                                             axis=1)
+        order = np.lexsort((candidates, candidate_distances))[:, :k]
+        closestNeighbors = np.take_along_axis(candidates, order, axis=1)
+        distances = np.take_along_axis(candidate_distances, order, axis=1)
+        del candidates, candidate_distances, leaf_candidates, leaf_distances
+
+    for _ in range(ANN_REFINE_ROUNDS):
+        neighbors_of_neighbors = closestNeighbors[closestNeighbors[:, 1:]]
+        closestNeighbors = _best_candidates(coordinates,
+                                np.concatenate([closestNeighbors,
+                                    neighbors_of_neighbors.reshape(nwords, -1)],
+                                    axis=1), k)
 
-    WordToSharedContextsOfNeighbors = dict()
+    return closestNeighbors
 
-    for word_no in range(nWordsForAnalysis):
-        WordToSharedContextsOfNeighbors[word_no] = dict()
 
-        neighbor_no_list = WordToNeighbors[word_no] # list of neighbor indices
+def neighbor_recall(coordinates, closestNeighbors, NumberOfNeighbors,
+                    sample=ANN_RECALL_SAMPLE, seed=0):
+    """Fraction of the exact neighbors (by compute_closest_neighbors) found
+    in closestNeighbors, over a random sample of words"""
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    nwords = coordinates.shape[0]
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(nwords, min(sample, nwords), replace=False))
+
+    found = 0
+    total = 0
+    for start in range(0, len(sample), ROWBLOCK):
+        words = sample[start: start + ROWBLOCK]
+        wordsdistance = scipy.spatial.distance.cdist(coordinates[words],
+                                                     coordinates, "euclidean")
+        exact = compute_closest_neighbors(wordsdistance, NumberOfNeighbors)
+        del wordsdistance
+
+        for word_no, exact_row, row in zip(words.tolist(), exact.tolist(),
+                                           closestNeighbors[words].tolist()):
+            exact_neighbors = set(exact_row) - {word_no}
+            found += len(exact_neighbors & set(row))
+            total += len(exact_neighbors)
+
+    return found / total if total else 1.0
+
+
+def GetEigenvectors(laplacian, nEigenvectors=6, solver="eigsh",
+                    initial_vectors=None):
+    """Return (eigenvalues, eigenvectors) for the nEigenvectors largest
+    eigenvalues of the laplacian, largest first; eigenvectors[:, i] is the
+    eigenvector of eigenvalues[i].
+
+    The laplacian (a scipy sparse matrix, which is never made dense) is
+    symmetric, so the symmetric solvers are used, which return real
+    vectors: "eigsh" (ARPACK Lanczos) or "lobpcg". initial_vectors (an
+    n x m array, e.g. the eigenvectors of a previous run) warm-start the
+    solver: LOBPCG starts from all of them, and eigsh from the first one.
+    The time taken and the largest residual |Av - lambda v| are printed.
+    """
+    # csr_matrix in scipy means compressed matrix; the laplacian is already
+    # one, and is never made dense
+    laplacian = scipy.sparse.csr_matrix(laplacian, dtype=np.float64)
+    n = laplacian.shape[0]
+    nEigenvectors = min(nEigenvectors, n)
+
+    if solver not in EIGENSOLVERS:
+        raise ValueError("unknown eigensolver: {}".format(solver))
+
+    if initial_vectors is not None:
+        initial_vectors = np.asarray(initial_vectors, dtype=np.float64)
+        if initial_vectors.shape[0] != n or not initial_vectors.any():
+            initial_vectors = None
+
+    start_time = time.time()
+
+    if nEigenvectors >= n - 1 or (solver == "lobpcg" and
+            n < LOBPCG_MIN_ROWS_PER_EIGENVECTOR * nEigenvectors):
+        # too small for the iterative solvers
+        solver = "dense"
+        eigenvalues, eigenvectors = np.linalg.eigh(laplacian.toarray())
+        iterations = ""
+
+    elif solver == "eigsh":
+        # a fixed start vector (rather than ARPACK's random one), so that
+        # the eigenvectors are the same in every run
+        if initial_vectors is not None:
+            v0 = initial_vectors[:, 0]
+        else:
+            v0 = np.ones(n)
+        eigenvalues, eigenvectors = scipy.sparse.linalg.eigsh(laplacian,
+                                        k=nEigenvectors, which="LA", v0=v0)
+        iterations = ""
 
-        for context_no in WordToContexts[word_no].keys():
-            WordToSharedContextsOfNeighbors[word_no][context_no] = list()
+    else:
+        # the diagonal of the normalized laplacian is all ones, so there
+        # is no useful Jacobi preconditioner; the start block is padded
+        # with seeded random vectors
+        X = np.random.RandomState(0).uniform(-1, 1, size=(n, nEigenvectors))
+        if initial_vectors is not None:
+            m = min(initial_vectors.shape[1], nEigenvectors)
+            X[:, :m] = initial_vectors[:, :m]
+        eigenvalues, eigenvectors, residual_history = \
+            scipy.sparse.linalg.lobpcg(laplacian, X, largest=True,
+                                       tol=LOBPCG_TOLERANCE,
+                                       maxiter=LOBPCG_MAXITER,
+                                       retResidualNormsHistory=True)
+        iterations = ", {} iterations".format(len(residual_history))
+
+    # largest eigenvalues first
+    order = np.argsort(eigenvalues)[::-1][:nEigenvectors]
+    eigenvalues = eigenvalues[order]
+    eigenvectors = eigenvectors[:, order]
+
+    residuals = np.linalg.norm(laplacian.dot(eigenvectors) -
+                               eigenvectors * eigenvalues, axis=0)
+    print("{}: {} eigenvectors in {:.2f} s{}, largest residual {:.1e}"
+          .format(solver, nEigenvectors, time.time() - start_time,
+                  iterations, residuals.max() if len(residuals) else 0.0),
+          flush=True)
+
+    return eigenvalues, eigenvectors
+
+
+def save_eigenvectors(outfilename, words, eigenvalues, eigenvectors):
+    """Save the eigenvectors (one row per word) for a later warm start"""
+    with open(str(outfilename), "wb") as f:
+        np.savez(f, words=np.array(words, dtype=str),
+                 eigenvalues=eigenvalues, eigenvectors=eigenvectors)
+
+
+def load_eigenvectors(infilename, words):
+    """Return the eigenvectors saved by save_eigenvectors, with their rows
+    in the order of words (zero rows for the words not saved), or None if
+    there is no such file or it has no word in common with words"""
+    infilename = Path(infilename)
+    if not infilename.exists():
+        return None
+
+    with np.load(str(infilename)) as saved:
+        saved_words = saved["words"].tolist()
+        saved_eigenvectors = saved["eigenvectors"]
+
+    WordToRow = {word: row for row, word in enumerate(saved_words)}
+    rows = np.array([WordToRow.get(word, -1) for word in words],
+                    dtype=np.int64)
+    if not (rows >= 0).any():
+        return None
+
+    eigenvectors = np.zeros((len(words), saved_eigenvectors.shape[1]))
+    eigenvectors[rows >= 0] = saved_eigenvectors[rows[rows >= 0]]
+    return eigenvectors
+
+
+def _as_sparse_counts(WordToContexts, nwords):
+    """WordToContexts as SparseCounts (it may also be a dict of Counters)"""
+    if isinstance(WordToContexts, SparseCounts):
+        return WordToContexts
+    rows, columns, counts = list(), list(), list()
+    for word_no, ContextToCount in WordToContexts.items():
+        for context_no, count in ContextToCount.items():
+            rows.append(word_no)
+            columns.append(context_no)
+            counts.append(count)
+    return _sparse_counts(np.array(rows, dtype=np.int64),
+                          np.array(columns, dtype=np.int64),
+                          np.array(counts, dtype=np.int64),
+                          max([nwords] + [row + 1 for row in rows]),
+                          max(columns, default=-1) + 1)
+
+
+def _find_keys(sorted_keys, keys):
+    """Positions of keys in the array sorted_keys, and whether each of them
+    is there (if not, its position is meaningless)"""
+    if not len(sorted_keys):
+        return (np.zeros(keys.shape, dtype=np.int64),
+                np.zeros(keys.shape, dtype=bool))
+    positions = np.minimum(np.searchsorted(sorted_keys, keys),
+                           len(sorted_keys) - 1)
+    return positions, sorted_keys[positions] == keys
 
-            for neighbor_no in neighbor_no_list:
-                if neighbor_no in ContextToWords[context_no]:
-                    WordToSharedContextsOfNeighbors[word_no][context_no].append(neighbor_no)
 
-            if len(WordToSharedContextsOfNeighbors[word_no][context_no]) < mincontexts:
-                del WordToSharedContextsOfNeighbors[word_no][context_no]
+def compute_WordToSharedContextsOfNeighbors(nWordsForAnalysis, WordToContexts,
+                                        WordToNeighbors, ContextToWords,
+                                        nNeighbors, mincontexts):
+    """For each word, map each of its contexts shared by at least mincontexts
+    of its neighbors to the list of these neighbors (in the order of
+    WordToNeighbors); the contexts keep the order of WordToContexts.
+    ImportantContextToWords maps each of these contexts to the words
+    which occur at least mincontexts times in it, and these counts.
+
+    The number of neighbors of each word sharing each context is computed
+    a block of ROWBLOCK words at a time, as the product of the matrix of
+    the neighbors of the words (one row per word) and the word-context
+    incidence matrix; the lists of neighbors are only made for the
+    contexts kept. ContextToWords has the same (word, context) pairs as
+    WordToContexts, which are the only ones used.
+    """
+    counts = _as_sparse_counts(WordToContexts, nWordsForAnalysis).matrix
+    nrows, ncontexts = counts.shape
+
+    # the (word, context) pairs, the contexts of each word in the order of
+    # WordToContexts, and their keys word * ncontexts + context
+    indptr = counts.indptr.astype(np.int64)
+    indices = counts.indices.astype(np.int64)
+    pair_words = np.repeat(np.arange(nrows, dtype=np.int64), np.diff(indptr))
+    pair_keys = pair_words * ncontexts + indices
+    sorted_pair_keys = np.sort(pair_keys)
+    incidence = scipy.sparse.csr_matrix(
+                    (np.ones(len(indices), dtype=np.int64), indices, indptr),
+                    shape=counts.shape)
+
+    # the neighbors of each word, in a row padded with -1, and as the rows
+    # of a 0/1 matrix
+    neighbor_lists = [WordToNeighbors[word_no]
+                      for word_no in range(nWordsForAnalysis)]
+    neighbors = np.full((nWordsForAnalysis,
+                         max(map(len, neighbor_lists), default=0)),
+                        -1, dtype=np.int64)
+    for word_no, neighbor_list in enumerate(neighbor_lists):
+        neighbors[word_no, :len(neighbor_list)] = neighbor_list
+    del neighbor_lists
+    is_neighbor = neighbors >= 0
+    neighbor_matrix = scipy.sparse.csr_matrix(
+                        (np.ones(is_neighbor.sum(), dtype=np.int64),
+                         neighbors[is_neighbor],
+                         np.concatenate([[0], np.cumsum(is_neighbor.sum(axis=1))])),
+                        shape=(nWordsForAnalysis, nrows))
 
-    ImportantContextToWords = dict()
-    for word_no in range(nWordsForAnalysis):
-        for context_no in WordToSharedContextsOfNeighbors[word_no].keys():
-            NumberOfTimesThisWordOccursInThisContext = ContextToWords[context_no][word_no]
-            if NumberOfTimesThisWordOccursInThisContext >= mincontexts:
-                if context_no not in ImportantContextToWords:
-                    ImportantContextToWords[context_no] = dict()
+    WordToSharedContextsOfNeighbors = dict()
+    important_words = list()
+    important_contexts = list()
+    important_counts = list()
+
+    for start in range(0, nWordsForAnalysis, ROWBLOCK):
+        end = min(start + ROWBLOCK, nWordsForAnalysis)
+        lo, hi = indptr[start], indptr[end]
+
+        # the number of the neighbors of each word sharing each context,
+        # for the contexts of the word
+        shared = neighbor_matrix[start: end].dot(incidence)
+        shared.sum_duplicates()
+        shared_keys = (np.repeat(np.arange(start, end, dtype=np.int64),
+                                 np.diff(shared.indptr)) * ncontexts +
+                       shared.indices)
+        positions, found = _find_keys(shared_keys, pair_keys[lo: hi])
+        nshared = np.zeros(hi - lo, dtype=np.int64)
+        nshared[found] = shared.data[positions[found]]
+        kept = lo + np.flatnonzero(nshared >= mincontexts)
+        del shared, shared_keys
+
+        # the neighbors having each context kept
+        kept_words = pair_words[kept]
+        kept_contexts = indices[kept]
+        kept_counts = counts.data[kept]
+        candidates = neighbors[kept_words]
+        _, have_context = _find_keys(sorted_pair_keys,
+                                     candidates * ncontexts +
+                                     kept_contexts[:, None])
+        have_context &= candidates >= 0
+
+        # the list of these neighbors for each context kept, and the dict of
+        # these lists for each word
+        shared_neighbors = candidates[have_context].tolist()
+        ends = np.cumsum(have_context.sum(axis=1)).tolist()
+        shared_lists = [shared_neighbors[i: j]
+                        for i, j in zip([0] + ends[:-1], ends)]
+        word_ends = np.searchsorted(kept_words,
+                                    np.arange(start, end) + 1).tolist()
+        kept_context_list = kept_contexts.tolist()
+        for word_no, i, j in zip(range(start, end), [0] + word_ends[:-1],
+                                 word_ends):
+            WordToSharedContextsOfNeighbors[word_no] = dict(
+                zip(kept_context_list[i: j], shared_lists[i: j]))
+        del shared_neighbors, shared_lists, kept_context_list
+
+        important = kept_counts >= mincontexts
+        important_words.append(kept_words[important])
+        important_contexts.append(kept_contexts[important])
+        important_counts.append(kept_counts[important])
+
+    # the contexts in the order in which they are first found, each with
+    # its words in the order of the words
+    empty = np.zeros(0, dtype=np.int64)
+    important_words = np.concatenate(important_words + [empty])
+    important_contexts = np.concatenate(important_contexts + [empty])
+    important_counts = np.concatenate(important_counts + [empty])
+
+    order = np.argsort(important_contexts, kind="stable")
+    contexts, first, sizes = np.unique(important_contexts, return_index=True,
+                                       return_counts=True)
+    context_ends = np.cumsum(sizes).tolist()
+    context_starts = (np.cumsum(sizes) - sizes).tolist()
+    context_list = contexts.tolist()
+    word_list = important_words[order].tolist()
+    count_list = important_counts[order].tolist()
 
-                ImportantContextToWords[context_no][word_no] = NumberOfTimesThisWordOccursInThisContext
+    ImportantContextToWords = dict()
+    for row in np.argsort(first, kind="stable").tolist():
+        i, j = context_starts[row], context_ends[row]
+        ImportantContextToWords[context_list[row]] = dict(
+            zip(word_list[i: j], count_list[i: j]))
 
     return (WordToSharedContextsOfNeighbors, ImportantContextToWords)
 
@@ -271,7 +1036,7 @@ def output_WordToSharedContextsOfNeighbors(outfilenameSharedcontexts,
     _worddict = {v:k for k,v in worddict.items()} # from index to word
     _contextdict = {v:k for k,v in contextdict.items()} # from index to context tuple
 
-    with outfilenameSharedcontexts.open("w") as f:
+    with open_output(outfilenameSharedcontexts) as f:
         for word_idx in range(nWordsForAnalysis):
 
             ContextToNeighbors = WordToSharedContextsOfNeighbors[word_idx] # a dict
@@ -314,7 +1079,7 @@ def output_ImportantContextToWords(outfilename, ImportantContextToWords,
 
     WordToCount_list = [WordToCount for _, WordToCount in ImportantContextToWords_sorted]
 
-    with outfilename.open("w") as f:
+    with open_output(outfilename) as f:
         for context_str, WordToCount in zip(context_str_list, WordToCount_list):
             print("{} {}".format(context_str.ljust(max_key_length),
                                  len(WordToCount)), file=f)
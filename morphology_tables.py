@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Compact tables for the morphology maps built by lxa5 (BisigToTuple,
+#    StemToWords, SigToStems, StemToSig, WordToSigs, WordToSigtransforms
+#    and AffixToSigs).
+#
+#    Every word, stem, affix and signature is interned once in a
+#    SymbolTable, which gives it an integer ID. Each map is a Relation:
+#    a read-only Mapping whose values are stored CSR-style, i.e. the
+#    values of the i-th key are the entries offsets[i]:offsets[i+1] of
+#    integer ID arrays (one array per tuple position for values like
+#    (stem, word1, word2)). A value is decoded into the same set, list or
+#    tuple as in the former dicts only when it is accessed, so the
+#    existing callers keep working.
+#
+#------------------------------------------------------------------------------#
+
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class SymbolTable:
+    """Interned symbols (strings, or tuples of strings for signatures),
+    each with an integer ID"""
+
+    def __init__(self, symbols=()):
+        self.symbols = list(symbols)
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, symbol_id):
+        return self.symbols[symbol_id]
+
+    def intern(self, symbol):
+        """Return the ID of symbol, adding the symbol if it is new"""
+        try:
+            return self.ids[symbol]
+        except KeyError:
+            symbol_id = len(self.symbols)
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+            return symbol_id
+
+
+def single(values):
+    """Relation container for a map with one value per key, e.g. StemToSig;
+    as with repeated dict assignments, the last value added is kept"""
+    return values[-1]
+
+
+class Relation(Mapping):
+    """Read-only map from keys to values stored as CSR arrays of symbol IDs.
+
+    container turns the list of decoded values of a key into the value
+    returned by relation[key]: set, list, sorted, or single.
+    """
+
+    def __init__(self, symbols, key_ids, offsets, columns, container):
+        self.symbols = symbols
+        self.key_ids = key_ids
+        self.offsets = offsets
+        self.columns = columns
+        self.container = container
+
+        # row of each key, indexed by the key's symbol ID (-1 if not a key)
+        self._key_rows = np.full(len(symbols), -1, dtype=np.int32)
+        self._key_rows[key_ids] = np.arange(len(key_ids), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    def __iter__(self):
+        symbols = self.symbols.symbols
+        for key_id in self.key_ids.tolist():
+            yield symbols[key_id]
+
+    def _row(self, key):
+        key_id = self.symbols.ids.get(key)
+        if key_id is None or key_id >= len(self._key_rows):
+            return -1
+        return int(self._key_rows[key_id])
+
+    def __contains__(self, key):
+        return self._row(key) >= 0
+
+    def __getitem__(self, key):
+        row = self._row(key)
+        if row < 0:
+            raise KeyError(key)
+        return self.row_values(row)
+
+    def row_values(self, row):
+        """The value of the key in the given row"""
+        start, end = self.offsets[row: row + 2].tolist()
+        symbols = self.symbols.symbols
+
+        if len(self.columns) == 1:
+            values = [symbols[i] for i in self.columns[0][start: end].tolist()]
+        else:
+            values = [tuple([symbols[i] for i in ids])
+                      for ids in zip(*[column[start: end].tolist()
+                                       for column in self.columns])]
+
+        return self.container(values)
+
+    def items(self):
+        symbols = self.symbols.symbols
+        return [(symbols[key_id], self.row_values(row))
+                for row, key_id in enumerate(self.key_ids.tolist())]
+
+    def value_index(self, key_ids):
+        """For the given keys (an array of their symbol IDs, all of them keys
+        of the relation), return the number of values of each key, and the
+        positions of these values in the arrays of self.columns"""
+        rows = self._key_rows[key_ids]
+        starts = self.offsets[rows]
+        counts = self.offsets[rows + 1] - starts
+        index = (np.repeat(starts - np.cumsum(counts) + counts, counts) +
+                 np.arange(counts.sum()))
+        return counts, index
+
+    def gather(self, key_ids):
+        """The values of the given keys (see value_index) as symbol IDs:
+        return the number of values of each key, and the list of the arrays
+        of the values, one per tuple position"""
+        counts, index = self.value_index(key_ids)
+        return counts, [column[index] for column in self.columns]
+
+    def value_sizes(self):
+        """Array of the number of values of each key, in key order"""
+        return np.diff(self.offsets)
+
+    def nbytes(self):
+        """Size of the arrays of this relation, in bytes"""
+        return (self.key_ids.nbytes + self.offsets.nbytes +
+                self._key_rows.nbytes +
+                sum(column.nbytes for column in self.columns))
+
+
+class RelationBuilder:
+    """Collect (key, value) pairs and build a Relation.
+
+    The keys keep the order in which they are first added. width is the
+    length of the tuple values (1 for values that are not tuples). If
+    unique is True, repeated (key, value) pairs are kept once, as in sets.
+    """
+
+    def __init__(self, symbols=None, width=1, container=set, unique=True):
+        if symbols is None:
+            symbols = SymbolTable()
+        self.symbols = symbols
+        self.width = width
+        self.container = container
+        self.unique = unique
+
+        self._key_rows = dict()  # key ID -> row
+        self._rows = array("i")
+        self._columns = [array("i") for _ in range(width)]
+
+    def add_key(self, key):
+        """Add key (with no values yet), and return its row"""
+        key_id = self.symbols.intern(key)
+        try:
+            return self._key_rows[key_id]
+        except KeyError:
+            row = len(self._key_rows)
+            self._key_rows[key_id] = row
+            return row
+
+    def add(self, key, value):
+        # most keys and values are known symbols, so look them up directly
+        ids = self.symbols.ids
+        try:
+            row = self._key_rows[ids[key]]
+        except KeyError:
+            row = self.add_key(key)
+        self._rows.append(row)
+
+        if self.width == 1:
+            value = (value,)
+        for column, item in zip(self._columns, value):
+            try:
+                column.append(ids[item])
+            except KeyError:
+                column.append(self.symbols.intern(item))
+
+    def add_keys(self, key_ids):
+        """Add keys given as an array of symbol IDs (with no values yet),
+        and return the array of their rows"""
+        key_ids = np.asarray(key_ids, dtype=np.int32)
+        unique_ids, first = np.unique(key_ids, return_index=True)
+
+        # new keys in the order in which they first appear
+        for key_id in unique_ids[np.argsort(first)].tolist():
+            if key_id not in self._key_rows:
+                self._key_rows[key_id] = len(self._key_rows)
+
+        unique_rows = np.array([self._key_rows[key_id]
+                                for key_id in unique_ids.tolist()],
+                               dtype=np.int32)
+        return unique_rows[np.searchsorted(unique_ids, key_ids)]
+
+    def add_ids(self, key_ids, *value_ids):
+        """Add (key, value) pairs given as arrays of symbol IDs; value_ids
+        has one array per tuple position of the values"""
+        self._rows.frombytes(self.add_keys(key_ids).tobytes())
+        for column, ids in zip(self._columns, value_ids):
+            column.frombytes(np.asarray(ids, dtype=np.int32).tobytes())
+
+    def build(self):
+        nkeys = len(self._key_rows)
+        key_ids = np.fromiter(self._key_rows, dtype=np.int32, count=nkeys)
+
+        rows = np.frombuffer(self._rows, dtype=np.int32)
+        columns = [np.frombuffer(column, dtype=np.int32)
+                   for column in self._columns]
+
+        if self.unique:
+            # sort by key and value, and keep each (key, value) once
+            order = np.lexsort(columns[::-1] + [rows])
+            rows = rows[order]
+            columns = [column[order] for column in columns]
+
+            repeated = np.ones(len(rows), dtype=bool)
+            for array_ in [rows] + columns:
+                repeated[1:] &= array_[1:] == array_[:-1]
+            repeated[:1] = False
+            rows = rows[~repeated]
+            columns = [column[~repeated] for column in columns]
+        else:
+            # the values of each key stay in the order they were added
+            order = np.argsort(rows, kind="stable")
+            rows = rows[order]
+            columns = [column[order] for column in columns]
+
+        offsets = np.zeros(nkeys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=nkeys), out=offsets[1:])
+
+        self._key_rows = dict()
+        self._rows = array("i")
+        self._columns = [array("i") for _ in range(self.width)]
+
+        return Relation(self.symbols, key_ids, offsets, tuple(columns),
+                        self.container)
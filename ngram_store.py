@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Binary columnar n-gram store written by ngrams.py next to the
+#    _words.txt, _bigrams.txt and _trigrams.txt files.
+#
+#    For the corpus name xxx, the store consists of:
+#
+#        xxx_vocab.txt            one word per line; the line number
+#                                 (from 0) is the word ID, and the words
+#                                 are in the same order as in xxx_words.txt
+#        xxx_words.npy            word counts (int64), indexed by word ID
+#        xxx_bigrams.npy          word IDs (int32), one row per bigram
+#        xxx_bigrams_counts.npy   bigram counts (int64)
+#        xxx_trigrams.npy         word IDs (int32), one row per trigram
+#        xxx_trigrams_counts.npy  trigram counts (int64)
+#
+#    The rows are in the same order as the lines of the text files. The
+#    word-ID arrays are stored column-major, so that each column is a
+#    contiguous array when memory-mapped with np.load(mmap_mode='r').
+#
+#------------------------------------------------------------------------------#
+
+from collections import (Counter, namedtuple)
+from pathlib import Path
+
+import numpy as np
+
+from lxa5lib import COMPRESSION_SUFFIXES
+
+NgramStore = namedtuple("NgramStore", ["vocabulary", "word_counts",
+                                       "bigrams", "bigram_counts",
+                                       "trigrams", "trigram_counts"])
+
+WORDLIST_SUFFIX = "_words.txt"
+
+
+def ngram_store_paths(folder, corpusName):
+    """Return the dict of file paths of the store, keyed by NgramStore field"""
+    return {"vocabulary": Path(folder, corpusName + "_vocab.txt"),
+            "word_counts": Path(folder, corpusName + "_words.npy"),
+            "bigrams": Path(folder, corpusName + "_bigrams.npy"),
+            "bigram_counts": Path(folder, corpusName + "_bigrams_counts.npy"),
+            "trigrams": Path(folder, corpusName + "_trigrams.npy"),
+            "trigram_counts": Path(folder, corpusName + "_trigrams_counts.npy")}
+
+
+def ngram_store_exists(folder, corpusName):
+    return all(path.exists()
+               for path in ngram_store_paths(folder, corpusName).values())
+
+
+def _ngram_arrays(ngramsSorted, word_to_id, n, sep):
+    ids = np.fromiter((word_to_id[word]
+                       for ngram, _ in ngramsSorted
+                       for word in ngram.split(sep)),
+                      dtype=np.int32, count=n * len(ngramsSorted))
+    counts = np.fromiter((freq for _, freq in ngramsSorted),
+                         dtype=np.int64, count=len(ngramsSorted))
+    return np.asfortranarray(ids.reshape(-1, n)), counts
+
+
+def write_ngram_store(folder, corpusName, wordsSorted, bigramsSorted,
+                      trigramsSorted, sep="\t"):
+    """Write the store from the sorted (ngram, count) lists of ngrams.main.
+
+    Return the list of paths written.
+    """
+    paths = ngram_store_paths(folder, corpusName)
+
+    with paths["vocabulary"].open("w") as f:
+        f.write("\n".join(word for word, _ in wordsSorted))
+
+    word_to_id = {word: i for i, (word, _) in enumerate(wordsSorted)}
+
+    np.save(str(paths["word_counts"]),
+            np.fromiter((freq for _, freq in wordsSorted),
+                        dtype=np.int64, count=len(wordsSorted)))
+
+    bigrams, bigram_counts = _ngram_arrays(bigramsSorted, word_to_id, 2, sep)
+    np.save(str(paths["bigrams"]), bigrams)
+    np.save(str(paths["bigram_counts"]), bigram_counts)
+
+    trigrams, trigram_counts = _ngram_arrays(trigramsSorted, word_to_id, 3, sep)
+    np.save(str(paths["trigrams"]), trigrams)
+    np.save(str(paths["trigram_counts"]), trigram_counts)
+
+    return list(paths.values())
+
+
+def load_ngram_store(folder, corpusName, mmap_mode="r"):
+    """Load the store as an NgramStore; the arrays are memory-mapped
+    unless mmap_mode is None."""
+    paths = ngram_store_paths(folder, corpusName)
+
+    with paths["vocabulary"].open() as f:
+        text = f.read()
+    vocabulary = text.split("\n") if text else list()
+
+    arrays = {field: np.load(str(path), mmap_mode=mmap_mode)
+              for field, path in paths.items() if field != "vocabulary"}
+
+    return NgramStore(vocabulary=vocabulary, **arrays)
+
+
+def _corpus_name_for_wordlist(wordlist_path: Path):
+    """corpusName of the wordlist xxx_words.txt (or xxx_words.txt.gz etc.),
+    or None if it is not named so (e.g. a wordlist given by the user)"""
+    name = wordlist_path.name
+    if wordlist_path.suffix in COMPRESSION_SUFFIXES.values():
+        # xxx_words.txt.gz or xxx_words.txt.zst
+        name = wordlist_path.stem
+    if not name.endswith(WORDLIST_SUFFIX):
+        return None
+    return name[: -len(WORDLIST_SUFFIX)]
+
+
+def ngram_store_paths_for_wordlist(wordlist_path: Path):
+    """Return the list of the file paths of the store written along with
+    the wordlist xxx_words.txt (whether they exist or not; they are inputs
+    of the stages which read the store), or an empty list if the wordlist
+    cannot have a store."""
+    corpusName = _corpus_name_for_wordlist(wordlist_path)
+    if corpusName is None:
+        return list()
+    return list(ngram_store_paths(wordlist_path.parent, corpusName).values())
+
+
+def load_ngram_store_for_wordlist(wordlist_path: Path, mmap_mode="r"):
+    """Return the NgramStore written along with the wordlist xxx_words.txt,
+    or None if the wordlist has no store (e.g. a wordlist given by the user).
+    """
+    corpusName = _corpus_name_for_wordlist(wordlist_path)
+    if corpusName is None or \
+       not ngram_store_exists(wordlist_path.parent, corpusName):
+        return None
+
+    return load_ngram_store(wordlist_path.parent, corpusName,
+                            mmap_mode=mmap_mode)
+
+
+def read_word_freq_from_store(store, casefold=True) -> Counter:
+    """Word frequencies from an NgramStore, read the same way as
+    lxa5lib.read_word_freq reads the wordlist xxx_words.txt."""
+    word_frequencies = Counter()
+
+    for word, freq in zip(store.vocabulary, store.word_counts.tolist()):
+        if word.startswith("#"):
+            # a comment line in the wordlist
+            continue
+        if casefold:
+            word = word.casefold()
+        word_frequencies[word] += freq
+
+    return word_frequencies
@@ -2,11 +2,20 @@
 
 from collections import Counter
 import argparse
+import hashlib
+import locale
+import math
+import multiprocessing
+import pickle
 from pathlib import Path
 
 from lxa5lib import (get_language_corpus_datafolder, stdout_list,
                      load_config_for_command_line_help, sorted_alphabetized,
-                     changeFilenameSuffix, json_pdump)
+                     changeFilenameSuffix, json_pdump, output_path,
+                     open_output, write_rows, COMPRESSION_SUFFIXES)
+from tokenizer import get_tokenizer
+from ngram_store import write_ngram_store
+from stage_cache import (get_stage_cache, get_corpus_path, source_files)
 
 #------------------------------------------------------------------------------#
 #
@@ -19,6 +28,12 @@ from lxa5lib import (get_language_corpus_datafolder, stdout_list,
 #
 #------------------------------------------------------------------------------#
 
+CHUNKSIZE = 1 << 20 # number of characters read from the corpus file at a time
+
+# format of the count snapshot of --incremental (save_count_snapshot); a
+# snapshot in another format is not used
+SNAPSHOT_FORMAT = "lxa5-count-snapshot-1"
+
 def makeArgParser(configfilename="config.json"):
 
     language, \
@@ -45,11 +60,583 @@ def makeArgParser(configfilename="config.json"):
                         " if this is zero, then the program reads "
                         "all word tokens in the corpus",
                         type=int, default=0)
+    parser.add_argument("--chunksize", help="number of characters read from "
+                        "the corpus file at a time",
+                        type=int, default=CHUNKSIZE)
+    parser.add_argument("--workers", help="number of processes counting "
+                        "n-grams in parallel; each one works on a shard of "
+                        "the corpus file (not used with --maxwordtokens)",
+                        type=int, default=1)
+    parser.add_argument("--punctuation", help="punctuation characters split "
+                        "off as separate tokens; if not given, the scrubbing "
+                        "rules for the language in tokenizer.py are used",
+                        type=str, default=None)
+    parser.add_argument("--incremental", help="reuse the counts saved by "
+                        "the previous incremental run and count only the "
+                        "text appended to the corpus file since then",
+                        action="store_true")
+    parser.add_argument("--no-cache", help="run even if the corpus file and "
+                        "the parameters are the same as in the last run "
+                        "(see stage_cache.py)",
+                        action="store_true")
+    parser.add_argument("--max-error", help="if not zero, count bigrams and "
+                        "trigrams in bounded memory by lossy counting: "
+                        "n-grams rarer than this fraction of all n-gram "
+                        "tokens may be dropped, and counts may be too low "
+                        "by at most this fraction of all n-gram tokens",
+                        type=float, default=0)
+    parser.add_argument("--min-count", help="drop the bigrams and trigrams "
+                        "that occur fewer than this many times before "
+                        "anything is written",
+                        type=int, default=0)
+    parser.add_argument("--compress", help="compress the .txt and .dx1 "
+                        "outputs (xxx.txt.gz or xxx.txt.zst)",
+                        choices=sorted(COMPRESSION_SUFFIXES), default=None)
     return parser
 
 
+def read_corpus_lines(infilename: Path, chunksize=CHUNKSIZE):
+    """Yield the lines of the corpus file, reading it chunksize characters
+    at a time instead of loading the whole file with readlines()."""
+    with infilename.open() as f:
+        remainder = ""
+        while True:
+            chunk = f.read(chunksize)
+            if not chunk:
+                break
+            lines = (remainder + chunk).split("\n")
+            remainder = lines.pop() # last piece may be an incomplete line
+            yield from lines
+        if remainder:
+            yield remainder
+
+
+def tokenize_lines(lines, tokenizer=None):
+    """Yield the list of word tokens of each line."""
+    if tokenizer is None:
+        tokenizer = get_tokenizer()
+
+    return tokenizer.tokenize_lines(lines)
+
+
+class LossyCounter(Counter):
+    """Counter whose size stays bounded, by lossy counting
+    (Manku and Motwani 2002).
+
+    Keys are counted as a stream, cut into buckets of 1/error keys. At the
+    end of each bucket, a key is dropped if it may have occurred no more
+    than error * N times among the N keys counted so far. This keeps at
+    most (1/error) * log(error * N) keys. Every key that occurs more than
+    error * N times is kept, and its count is too low by at most error * N.
+    """
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+        self.bucket_width = math.ceil(1 / error)
+        self.stream_length = 0
+        self.deltas = dict() # key -> max. number of occurrences not counted
+
+    def __reduce__(self):
+        return (self.__class__, (self.error,), self.__dict__, None,
+                iter(self.items()))
+
+    def add(self, keys):
+        """Count each key in keys once."""
+        width = self.bucket_width
+        deltas = self.deltas
+
+        for key in keys:
+            self.stream_length += 1
+            if key in self:
+                self[key] += 1
+            else:
+                self[key] = 1
+                deltas[key] = (self.stream_length - 1) // width
+
+            if self.stream_length % width == 0:
+                self.prune()
+
+    def prune(self):
+        bucket = self.stream_length // self.bucket_width
+        deltas = self.deltas
+        for key in [key for key, count in self.items()
+                    if count + deltas[key] <= bucket]:
+            del self[key]
+            del deltas[key]
+
+    def merge(self, items, deltas, stream_length):
+        """Add the counts of another LossyCounter, given as its (key, count)
+        items, its deltas and its stream_length. The error bounds add up."""
+        width = self.bucket_width
+        other_bucket = stream_length // width
+        own_bucket = self.stream_length // width
+
+        # a key missing from one counter may have been dropped from it
+        for key in self:
+            if key not in deltas:
+                self.deltas[key] += other_bucket
+
+        for key, count in items:
+            if key in self:
+                self[key] += count
+                self.deltas[key] += deltas[key]
+            else:
+                self[key] = count
+                self.deltas[key] = deltas[key] + own_bucket
+
+        self.stream_length += stream_length
+        self.prune()
+
+
+class NgramCounter:
+    """Word, bigram and trigram counts keyed by integer word IDs.
+
+    Each word type is interned once in a vocabulary table. A bigram is
+    counted under the packed integer (ID1 << ID_BITS) | ID2, and a trigram
+    under ((ID1 << ID_BITS) | ID2) << ID_BITS | ID3, so no n-gram string is
+    built while counting. The n-grams are turned back into text (joined by
+    sep) only by the *_items() methods used for output.
+
+    If error is not zero, bigrams and trigrams are counted in LossyCounters
+    with this error bound, so their memory stays bounded.
+    """
+
+    ID_BITS = 32
+    ID_MASK = (1 << ID_BITS) - 1
+
+    def __init__(self, error=0):
+        self.error = error
+        self.vocabulary = list() # word ID -> word
+        self.word_to_id = dict() # word -> word ID
+        self.words = Counter()
+        if error:
+            self.bigrams = LossyCounter(error)
+            self.trigrams = LossyCounter(error)
+        else:
+            self.bigrams = Counter()
+            self.trigrams = Counter()
+        self.token_count = 0
+
+    def intern(self, word):
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            word_id = self.word_to_id[word] = len(self.vocabulary)
+            self.vocabulary.append(word)
+        return word_id
+
+    def add_sentence(self, words):
+        """Count the words, bigrams and trigrams of one list of tokens.
+
+        As in the original counting loop, only lines of at least three
+        tokens contribute n-grams, but all tokens add to token_count.
+        """
+        self.token_count += len(words)
+        if len(words) < 3:
+            return
+
+        bits = self.ID_BITS
+        ids = [self.intern(word) for word in words]
+        bigram_keys = [(id1 << bits) | id2 for id1, id2 in zip(ids, ids[1:])]
+
+        trigram_keys = [(key << bits) | id3
+                        for key, id3 in zip(bigram_keys, ids[2:])]
+
+        self.words.update(ids)
+        if self.error:
+            self.bigrams.add(bigram_keys)
+            self.trigrams.add(trigram_keys)
+        else:
+            self.bigrams.update(bigram_keys)
+            self.trigrams.update(trigram_keys)
+
+    def update(self, other):
+        """Add the counts of another NgramCounter (with the same error)
+        to this one."""
+        bits = self.ID_BITS
+        mask = self.ID_MASK
+        new_ids = [self.intern(word) for word in other.vocabulary]
+
+        def new_bigram_key(key):
+            return (new_ids[key >> bits] << bits) | new_ids[key & mask]
+
+        def new_trigram_key(key):
+            return (new_bigram_key(key >> bits) << bits) | new_ids[key & mask]
+
+        for word_id, count in other.words.items():
+            self.words[new_ids[word_id]] += count
+
+        for table, other_table, new_key in [
+                (self.bigrams, other.bigrams, new_bigram_key),
+                (self.trigrams, other.trigrams, new_trigram_key)]:
+            if self.error:
+                table.merge([(new_key(key), count)
+                             for key, count in other_table.items()],
+                            {new_key(key): delta
+                             for key, delta in other_table.deltas.items()},
+                            other_table.stream_length)
+            else:
+                for key, count in other_table.items():
+                    table[new_key(key)] += count
+
+        self.token_count += other.token_count
+
+    def prune(self, min_count):
+        """Drop the bigrams and trigrams counted fewer than min_count times."""
+        for table in [self.bigrams, self.trigrams]:
+            for key in [key for key, count in table.items()
+                        if count < min_count]:
+                del table[key]
+
+    def word_items(self):
+        vocabulary = self.vocabulary
+        return [(vocabulary[word_id], count)
+                for word_id, count in self.words.items()]
+
+    def bigram_items(self, sep="\t"):
+        vocabulary = self.vocabulary
+        bits = self.ID_BITS
+        mask = self.ID_MASK
+        return [(vocabulary[key >> bits] + sep + vocabulary[key & mask], count)
+                for key, count in self.bigrams.items()]
+
+    def trigram_items(self, sep="\t"):
+        vocabulary = self.vocabulary
+        bits = self.ID_BITS
+        mask = self.ID_MASK
+        return [(vocabulary[key >> (2 * bits)] + sep +
+                 vocabulary[(key >> bits) & mask] + sep +
+                 vocabulary[key & mask], count)
+                for key, count in self.trigrams.items()]
+
+
+def count_ngrams(sentences, maxwordtokens=0, error=0):
+    """Count words, bigrams and trigrams over an iterable of token lists.
+
+    Reading stops as soon as more than maxwordtokens word tokens have been
+    seen (if maxwordtokens is not zero). If error is not zero, bigrams and
+    trigrams are counted by lossy counting with this error bound.
+
+    Return an NgramCounter.
+    """
+    counter = NgramCounter(error)
+
+    for words in sentences:
+        counter.add_sentence(words)
+
+        if maxwordtokens and counter.token_count > maxwordtokens:
+            break
+
+    return counter
+
+
+def find_shards(infilename: Path, nshards, start=0, end=None):
+    """Split the bytes start to end of the corpus file (the whole file by
+    default) into at most nshards (start, end) byte ranges.
+
+    start must be at the beginning of a line. Every range starts at the
+    beginning of a line and ends right after a newline (or at end), so no
+    line is split across shards.
+    """
+    if end is None:
+        end = infilename.stat().st_size
+    boundaries = [start]
+
+    with infilename.open('rb') as f:
+        for i in range(1, nshards):
+            f.seek(start + (end - start) * i // nshards)
+            f.readline() # move on to the start of the next line
+            position = f.tell()
+            if boundaries[-1] < position < end:
+                boundaries.append(position)
+
+    boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def read_shard_lines(infilename: Path, start, end, chunksize=CHUNKSIZE):
+    """Yield the lines of the corpus file between the byte offsets start
+    and end, decoded the same way as infilename.open() does."""
+    encoding = locale.getpreferredencoding(False)
+
+    with infilename.open('rb') as f:
+        f.seek(start)
+        remainder = b""
+        bytes_left = end - start
+
+        while bytes_left > 0:
+            chunk = f.read(min(chunksize, bytes_left))
+            if not chunk:
+                break
+            bytes_left -= len(chunk)
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for line in lines:
+                # text mode also treats a lone "\r" as a line break
+                yield from line.decode(encoding).split("\r")
+
+        if remainder:
+            yield from remainder.decode(encoding).split("\r")
+
+
+def count_shard(shard):
+    """Count n-grams in one shard; run in a worker process by main()."""
+    infilename, start, end, chunksize, tokenizer, error = shard
+    lines = read_shard_lines(infilename, start, end, chunksize=chunksize)
+    return count_ngrams(tokenize_lines(lines, tokenizer), error=error)
+
+
+def count_ngrams_in_parallel(infilename: Path, workers, chunksize=CHUNKSIZE,
+                             tokenizer=None, start=0, end=None, error=0):
+    """Count n-grams of the corpus file (or of its bytes start to end)
+    with a pool of worker processes.
+
+    The corpus is cut into one shard per worker (see find_shards), and the
+    per-shard NgramCounters are merged. The counts are the same as those of
+    count_ngrams over the whole file.
+    """
+    shards = [(infilename, shard_start, shard_end, chunksize, tokenizer, error)
+              for shard_start, shard_end in find_shards(infilename, workers,
+                                                        start, end)]
+
+    counter = NgramCounter(error)
+
+    with multiprocessing.Pool(min(workers, len(shards))) as pool:
+        for shard_counter in pool.imap_unordered(count_shard, shards):
+            counter.update(shard_counter)
+
+    return counter
+
+
+def count_byte_range(infilename: Path, start, end, workers=1,
+                     chunksize=CHUNKSIZE, tokenizer=None, error=0):
+    """Count n-grams in the bytes start to end of the corpus file"""
+    if workers > 1:
+        return count_ngrams_in_parallel(infilename, workers,
+                                        chunksize=chunksize,
+                                        tokenizer=tokenizer,
+                                        start=start, end=end, error=error)
+    else:
+        return count_shard((infilename, start, end, chunksize, tokenizer,
+                            error))
+
+
+def find_last_line_end(infilename: Path, chunksize=CHUNKSIZE):
+    """Return the byte offset right after the last newline of the file
+    (0 if there is none)."""
+    with infilename.open('rb') as f:
+        end = f.seek(0, 2)
+        while end > 0:
+            start = max(0, end - chunksize)
+            f.seek(start)
+            newline_index = f.read(end - start).rfind(b"\n")
+            if newline_index >= 0:
+                return start + newline_index + 1
+            end = start
+    return 0
+
+
+def update_checksum(checksum, infilename: Path, start, end,
+                    chunksize=CHUNKSIZE):
+    """Feed the bytes start to end of the file to the hashlib object"""
+    with infilename.open('rb') as f:
+        f.seek(start)
+        bytes_left = end - start
+        while bytes_left > 0:
+            chunk = f.read(min(chunksize, bytes_left))
+            if not chunk:
+                break
+            bytes_left -= len(chunk)
+            checksum.update(chunk)
+
+
+def counter_state(counter):
+    """The counts of a Counter or LossyCounter as plain dicts and ints:
+    {"items": ..., "deltas": ..., "stream_length": ...} for a LossyCounter"""
+    if isinstance(counter, LossyCounter):
+        return {"items": dict(counter),
+                "deltas": dict(counter.deltas),
+                "stream_length": counter.stream_length}
+    return dict(counter)
+
+
+def restore_counter(state, error=0):
+    """The Counter (or LossyCounter, if error is not zero) of counter_state"""
+    if not error:
+        return Counter(state)
+    counter = LossyCounter(error)
+    dict.update(counter, state["items"])
+    counter.deltas = dict(state["deltas"])
+    counter.stream_length = state["stream_length"]
+    return counter
+
+
+def save_count_snapshot(snapshot_path: Path, counter, offset, checksum,
+                        tokenizer):
+    """Save the counts of the first offset bytes of the corpus file.
+
+    The snapshot stores plain containers only (not an NgramCounter or
+    LossyCounters, see counter_state), so it can be loaded whether
+    ngrams.py runs as a script or as a module.
+    """
+    snapshot = {"format": SNAPSHOT_FORMAT,
+                "offset": offset,
+                "checksum": checksum,
+                "punctuation": tokenizer.punctuation,
+                "error": counter.error,
+                "vocabulary": counter.vocabulary,
+                "words": dict(counter.words),
+                "bigrams": counter_state(counter.bigrams),
+                "trigrams": counter_state(counter.trigrams),
+                "token_count": counter.token_count}
+
+    with snapshot_path.open('wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_count_snapshot(snapshot_path: Path, infilename: Path, tokenizer,
+                        chunksize=CHUNKSIZE, error=0):
+    """Load a count snapshot if it is still valid for the corpus file.
+
+    Return (NgramCounter or None, offset, checksum), where the hashlib
+    object checksum has consumed the first offset bytes of the corpus file.
+    The snapshot is valid if it is in the format SNAPSHOT_FORMAT, if the
+    file still starts with the bytes counted in it, and if the same
+    punctuation and error bound were used.
+    """
+    checksum = hashlib.sha1()
+
+    if not snapshot_path.exists():
+        return None, 0, checksum
+
+    try:
+        with snapshot_path.open('rb') as f:
+            snapshot = pickle.load(f)
+    except (pickle.UnpicklingError, AttributeError, ImportError, EOFError):
+        snapshot = None
+
+    if not isinstance(snapshot, dict) or \
+       snapshot.get("format") != SNAPSHOT_FORMAT:
+        print("The count snapshot is not in the format {}.\n"
+              "The whole corpus is counted again.".format(SNAPSHOT_FORMAT))
+        return None, 0, checksum
+
+    offset = snapshot["offset"]
+
+    if snapshot["punctuation"] != tokenizer.punctuation:
+        print("The punctuation has changed since the count snapshot "
+              "was saved.\nThe whole corpus is counted again.")
+        return None, 0, checksum
+
+    if snapshot["error"] != error:
+        print("The error bound has changed since the count snapshot "
+              "was saved.\nThe whole corpus is counted again.")
+        return None, 0, checksum
+
+    if infilename.stat().st_size < offset:
+        print("The corpus file is shorter than when the count snapshot "
+              "was saved.\nThe whole corpus is counted again.")
+        return None, 0, checksum
+
+    update_checksum(checksum, infilename, 0, offset, chunksize)
+    if checksum.hexdigest() != snapshot["checksum"]:
+        print("The corpus file has changed (not just grown) since the count "
+              "snapshot was saved.\nThe whole corpus is counted again.")
+        return None, 0, hashlib.sha1()
+
+    counter = NgramCounter(error)
+    counter.vocabulary = snapshot["vocabulary"]
+    counter.word_to_id = {word: i for i, word in enumerate(counter.vocabulary)}
+    counter.words = Counter(snapshot["words"])
+    counter.bigrams = restore_counter(snapshot["bigrams"], error)
+    counter.trigrams = restore_counter(snapshot["trigrams"], error)
+    counter.token_count = snapshot["token_count"]
+
+    return counter, offset, checksum
+
+
+def count_ngrams_incrementally(infilename: Path, snapshot_path: Path,
+                               workers=1, chunksize=CHUNKSIZE, tokenizer=None,
+                               error=0):
+    """Count n-grams of the corpus file, reusing the counts in the snapshot.
+
+    Only the part of the corpus file after the bytes already counted in the
+    snapshot is read and counted. The snapshot is then updated to cover
+    the file up to its last newline. A final line without a newline may
+    still grow, so it is counted in the returned NgramCounter but is not
+    saved in the snapshot.
+    """
+    if tokenizer is None:
+        tokenizer = get_tokenizer()
+
+    counter, offset, checksum = load_count_snapshot(snapshot_path, infilename,
+                                                    tokenizer, chunksize,
+                                                    error)
+    if counter is not None:
+        print("Count snapshot loaded: {} bytes of the corpus file "
+              "already counted.".format(offset))
+
+    end = find_last_line_end(infilename, chunksize)
+
+    if end > offset:
+        print("Counting bytes {} to {} of the corpus file...".format(offset,
+                                                                    end))
+        new_counter = count_byte_range(infilename, offset, end, workers,
+                                       chunksize, tokenizer, error)
+        if counter is None:
+            counter = new_counter
+        else:
+            counter.update(new_counter)
+        update_checksum(checksum, infilename, offset, end, chunksize)
+    elif counter is None:
+        counter = NgramCounter(error)
+
+    save_count_snapshot(snapshot_path, counter, end, checksum.hexdigest(),
+                        tokenizer)
+
+    filesize = infilename.stat().st_size
+    if filesize > end:
+        counter.update(count_byte_range(infilename, end, filesize,
+                                        chunksize=chunksize,
+                                        tokenizer=tokenizer, error=error))
+
+    return counter
+
+
+def get_corpus_name(corpus, maxwordtokens=0):
+    """Return the stem of the names of the n-gram files of the corpus"""
+    if maxwordtokens:
+        return Path(corpus).stem + "_{}-tokens".format(maxwordtokens)
+    else:
+        return Path(corpus).stem
+
+
+def remake_if_stale(language=None, corpus=None, datafolder=None,
+                    filename=None, maxwordtokens=0):
+    """Run main() again, with the parameters of its last run, if the corpus
+    file (or the n-gram files) have changed since the n-gram files were
+    made. Return True if main() is run."""
+    if filename:
+        corpus = Path(filename).name
+
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "ngrams:" + get_corpus_name(corpus, maxwordtokens)
+    corpus_path = get_corpus_path(language, corpus, datafolder, filename)
+
+    if not cache.is_stale(stage, [corpus_path]):
+        return False
+
+    print("\nThe corpus file has changed since its n-gram files were made.\n"
+          "ngrams.py is now run again.\n")
+    main(language=language, corpus=corpus, datafolder=datafolder,
+         filename=filename, **cache.params(stage))
+    return True
+
+
 def main(language=None, corpus=None, datafolder=None, filename=None,
-         maxwordtokens=0):
+         maxwordtokens=0, chunksize=CHUNKSIZE, workers=1, punctuation=None,
+         incremental=False, max_error=0, min_count=0, compress=None,
+         use_cache=True):
 
     print("\n*****************************************************\n"
           "Running the ngrams.py program now...\n")
@@ -70,68 +657,74 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     if not outfolderDx1.exists():
         outfolderDx1.mkdir(parents=True)
 
-    if maxwordtokens:
-        corpusName = Path(corpus).stem + "_{}-tokens".format(maxwordtokens)
-    else:
-        corpusName = Path(corpus).stem
+    corpusName = get_corpus_name(corpus, maxwordtokens)
 
     outfilenameWords = Path(outfolder, corpusName + "_words.txt")
     outfilenameBigrams = Path(outfolder, corpusName + "_bigrams.txt")
     outfilenameTrigrams = Path(outfolder, corpusName + "_trigrams.txt")
     outfilenameDx1 = Path(outfolderDx1, corpusName + ".dx1")
+    outfilenameSnapshot = Path(outfolder, corpusName + "_counts.pickle")
 
-    wordDict = Counter()
-    trigramDict = Counter()
-    bigramDict = Counter()
-    sep = "\t"
-    corpusCurrentSize = 0 # running word token count
-
-    print('Reading the corpus file now...')
-
-    with infilename.open() as f:
-        for line in f.readlines():
-            if not line:
-                continue
-
-            line = line.strip().casefold()
-
-            # TODO: modify/combine these with "scrubbing", cf. Alchemist and Lxa4
-            line = line.replace(".", " . ")
-            line = line.replace(",", " , ")
-            line = line.replace(";", " ; ")
-            line = line.replace("!", " ! ")
-            line = line.replace("?", " ? ")
-            line = line.replace(":", " : ")
-            line = line.replace(")", " ) ")
-            line = line.replace("(", " ( ")
-
-            words = line.split()
-            lenWords = len(words)
+    # the text outputs, with .gz or .zst added if compressed
+    outfilenameWordsTxt = output_path(outfilenameWords, compress)
+    outfilenameBigramsTxt = output_path(outfilenameBigrams, compress)
+    outfilenameTrigramsTxt = output_path(outfilenameTrigrams, compress)
+    outfilenameDx1Txt = output_path(outfilenameDx1, compress)
 
-            corpusCurrentSize += lenWords
-
-            for i in range(lenWords-2):
+    sep = "\t"
 
-                word1 = words[i]
-                word2 = words[i+1]
-                word3 = words[i+2]
+    if workers > 1 and maxwordtokens:
+        # where to stop depends on reading the corpus from the beginning
+        print("maxwordtokens is set, so the corpus is read by one process.")
+        workers = 1
+
+    if incremental and maxwordtokens:
+        print("maxwordtokens is set, so the incremental mode is not used.")
+        incremental = False
+
+    tokenizer = get_tokenizer(language, punctuation=punctuation)
+
+    # the parameters which the outputs depend on; these are also the
+    # arguments of main() with which the other programs run ngrams.py again
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "ngrams:" + corpusName
+    stage_inputs = [infilename] + source_files("ngrams.py", "tokenizer.py",
+                                               "ngram_store.py", "lxa5lib.py")
+    stage_params = {"maxwordtokens": maxwordtokens,
+                    "punctuation": tokenizer.punctuation,
+                    "max_error": max_error,
+                    "min_count": min_count,
+                    "compress": compress}
+
+    if use_cache and cache.is_fresh(stage, stage_inputs, stage_params):
+        print("The n-gram files are up to date (run with --no-cache to "
+              "make them again).")
+        return
 
-                wordDict[word3] += 1
+    print('Reading the corpus file now...')
 
-                if i == 0:
-                    wordDict[word1] += 1
-                    wordDict[word2] += 1
-                    bigram = word1 + sep + word2
-                    bigramDict[bigram] += 1
+    if incremental:
+        counter = count_ngrams_incrementally(infilename, outfilenameSnapshot,
+                                             workers=workers,
+                                             chunksize=chunksize,
+                                             tokenizer=tokenizer,
+                                             error=max_error)
+    elif workers > 1:
+        counter = count_ngrams_in_parallel(infilename, workers,
+                                           chunksize=chunksize,
+                                           tokenizer=tokenizer,
+                                           error=max_error)
+    else:
+        # the corpus is streamed through read_corpus_lines -> tokenize_lines
+        # -> count_ngrams, so only the n-gram counts are held in memory
+        lines = read_corpus_lines(infilename, chunksize=chunksize)
+        counter = count_ngrams(tokenize_lines(lines, tokenizer),
+                               maxwordtokens=maxwordtokens, error=max_error)
 
-                bigram = word2 + sep + word3
-                trigram = word1 + sep + word2 + sep + word3
+    if min_count > 1:
+        counter.prune(min_count)
 
-                trigramDict[trigram] += 1
-                bigramDict[bigram] += 1
-
-            if maxwordtokens and corpusCurrentSize > maxwordtokens:
-                break
+    corpusCurrentSize = counter.token_count
 
     print("\nCompleted counting words, bigrams, and trigrams.")
     print("Token count: {}".format(corpusCurrentSize))
@@ -141,38 +734,43 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
 #    wordsSorted = sorted(wordDict.items(),
 #                                      key=lambda x: x[1], reverse=True)
-    wordsSorted = sorted_alphabetized(wordDict.items(),
-                                      key=lambda x: x[1], reverse=True)
+    # n-grams are turned back into tab-joined strings only now;
+    # a table may be empty (e.g. pruned by min_count), and is then written
+    # with no rows
+    wordsSorted = sorted_alphabetized(counter.word_items(),
+                                      key=lambda x: x[1],
+                                      reverse=True) or list()
 
-    bigramsSorted = sorted_alphabetized(bigramDict.items(),
-                                        key=lambda x: x[1], reverse=True)
+    bigramsSorted = sorted_alphabetized(counter.bigram_items(sep),
+                                        key=lambda x: x[1],
+                                        reverse=True) or list()
 
-    trigramsSorted = sorted_alphabetized(trigramDict.items(),
-                                         key=lambda x: x[1], reverse=True)
+    trigramsSorted = sorted_alphabetized(counter.trigram_items(sep),
+                                         key=lambda x: x[1],
+                                         reverse=True) or list()
 
     # print txt outputs
-    with outfilenameWords.open('w') as f:
+    with open_output(outfilenameWordsTxt) as f:
         print(intro_string, file=f)
         print("# type count: {}".format(len(wordsSorted)), file=f)
-        for (word, freq) in wordsSorted:
-            print(word + sep + str(freq), file=f)
+        write_rows(f, (word + sep + str(freq) for word, freq in wordsSorted))
 
-    with outfilenameBigrams.open('w') as f:
+    with open_output(outfilenameBigramsTxt) as f:
         print(intro_string, file=f)
         print("# type count: {}".format(len(bigramsSorted)), file=f)
-        for (bigram, freq) in bigramsSorted:
-            print(bigram + sep +  str(freq), file=f)
+        write_rows(f, (bigram + sep + str(freq)
+                       for bigram, freq in bigramsSorted))
 
-    with outfilenameTrigrams.open('w') as f:
+    with open_output(outfilenameTrigramsTxt) as f:
         print(intro_string, file=f)
         print("# type count: {}".format(len(trigramsSorted)), file=f)
-        for (trigram, freq) in trigramsSorted:
-            print(trigram + sep + str(freq), file=f)
+        write_rows(f, (trigram + sep + str(freq)
+                       for trigram, freq in trigramsSorted))
 
     # print dx1 output
-    with outfilenameDx1.open('w') as f:
-        for (word, freq) in wordsSorted:
-            print(word, freq, ' '.join(word), file=f)
+    with open_output(outfilenameDx1Txt) as f:
+        write_rows(f, ("{} {} {}".format(word, freq, " ".join(word))
+                       for word, freq in wordsSorted))
 
     # print json outputs
     with changeFilenameSuffix(outfilenameWords, ".json").open('w') as f:
@@ -184,14 +782,31 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     with changeFilenameSuffix(outfilenameTrigrams, ".json").open('w') as f:
         json_pdump(dict(trigramsSorted), f)
 
+    # binary n-gram store (vocabulary + .npy arrays) for the other components
+    ngram_store_files = write_ngram_store(outfolder, corpusName, wordsSorted,
+                                          bigramsSorted, trigramsSorted, sep)
+
     print('wordlist, bigram and trigram files ready')
     print('dx1 file ready')
 
-    stdout_list("Output files:", outfilenameWords,
-                outfilenameBigrams, outfilenameTrigrams, outfilenameDx1,
+    stdout_list("Output files:", outfilenameWordsTxt,
+                outfilenameBigramsTxt, outfilenameTrigramsTxt, outfilenameDx1Txt,
                 changeFilenameSuffix(outfilenameWords, ".json"),
                 changeFilenameSuffix(outfilenameBigrams, ".json"),
-                changeFilenameSuffix(outfilenameTrigrams, ".json"))
+                changeFilenameSuffix(outfilenameTrigrams, ".json"),
+                *ngram_store_files)
+
+    if incremental:
+        stdout_list("Count snapshot for the next incremental run:",
+                    outfilenameSnapshot)
+
+    cache.record(stage, stage_inputs, stage_params,
+                 [outfilenameWordsTxt, outfilenameBigramsTxt,
+                  outfilenameTrigramsTxt, outfilenameDx1Txt,
+                  changeFilenameSuffix(outfilenameWords, ".json"),
+                  changeFilenameSuffix(outfilenameBigrams, ".json"),
+                  changeFilenameSuffix(outfilenameTrigrams, ".json"),
+                  *ngram_store_files])
 
 
 if __name__ == "__main__":
@@ -199,6 +814,14 @@ if __name__ == "__main__":
     args = makeArgParser().parse_args()
 
     maxwordtokens = args.maxwordtokens
+    chunksize = args.chunksize
+    workers = args.workers
+    punctuation = args.punctuation
+    incremental = args.incremental
+    max_error = args.max_error
+    min_count = args.min_count
+    compress = args.compress
+    use_cache = not args.no_cache
 
     description="You are running {}.\n".format(__file__) + \
                 "This program extracts word n-grams.\n" + \
@@ -210,5 +833,8 @@ if __name__ == "__main__":
                                       scriptname=__file__)
 
     main(language=language, corpus=corpus, datafolder=datafolder,
-         maxwordtokens=maxwordtokens)
+         maxwordtokens=maxwordtokens, chunksize=chunksize, workers=workers,
+         punctuation=punctuation, incremental=incremental,
+         max_error=max_error, min_count=min_count, compress=compress,
+         use_cache=use_cache)
 
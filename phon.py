@@ -5,11 +5,16 @@ import argparse
 from pathlib import Path
 
 import ngrams
+from ngram_store import (load_ngram_store_for_wordlist,
+                         ngram_store_paths_for_wordlist,
+                         read_word_freq_from_store)
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list,
                      load_config_for_command_line_help,
                      determine_use_corpus, get_wordlist_path_corpus_stem,
-                     sorted_alphabetized)
+                     sorted_alphabetized, open_input, open_output,
+                     output_path, write_rows, COMPRESSION_SUFFIXES)
+from stage_cache import get_stage_cache, source_files
 
 #------------------------------------------------------------------------------#
 #
@@ -48,11 +53,39 @@ def makeArgParser(configfilename="config.json"):
                         " if this is zero, then the program counts "
                         "all word tokens in the corpus",
                         type=int, default=0)
+    parser.add_argument("--compress", help="compress the .txt outputs "
+                        "(xxx.txt.gz or xxx.txt.zst)",
+                        choices=sorted(COMPRESSION_SUFFIXES), default=None)
+    parser.add_argument("--no-cache", help="run even if the wordlist and "
+                        "the parameters are the same as in the last run "
+                        "(see stage_cache.py)",
+                        action="store_true")
     return parser
 
 
+def read_wordlist_lines(infilename):
+    """Yield (word, freq) for each line of the wordlist text file"""
+    with open_input(infilename) as f:
+        lines = f.readlines()
+
+        for line in lines:
+            if not line or line.startswith("#"):
+                continue
+
+            line = line.strip().casefold()
+
+            phones, *rest = line.split()
+
+            try:
+                freq = int(rest[0])
+            except (ValueError, IndexError):
+                freq = 1
+
+            yield phones, freq
+
+
 def main(language=None, corpus=None, datafolder=None, filename=None,
-         maxwordtokens=0, use_corpus=True):
+         maxwordtokens=0, use_corpus=True, compress=None, use_cache=True):
 
     print("\n*****************************************************\n"
           "Running the phon.py program now...\n")
@@ -60,6 +93,12 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     infilename, corpusName = get_wordlist_path_corpus_stem(language, corpus,
                                 datafolder, filename, maxwordtokens, use_corpus)
 
+    if use_corpus and infilename.exists():
+        # make the wordlist again if the corpus file has changed since then
+        ngrams.remake_if_stale(language=language, corpus=corpus,
+                               datafolder=datafolder, filename=filename,
+                               maxwordtokens=maxwordtokens)
+
     if not infilename.exists():
         if use_corpus:
             if maxwordtokens:
@@ -75,6 +114,17 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
             sys.exit("\nThe specified wordlist ""\n"
                      "is not found.".format(infilename))
 
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "phon:" + corpusName
+    stage_inputs = [infilename] + ngram_store_paths_for_wordlist(infilename)
+    stage_inputs += source_files("phon.py", "ngram_store.py", "lxa5lib.py")
+    stage_params = {"maxwordtokens": maxwordtokens, "compress": compress}
+
+    if use_cache and cache.is_fresh(stage, stage_inputs, stage_params):
+        print("The phon.py outputs are up to date (run with --no-cache to "
+              "make them again).")
+        return
+
     if filename:
         outfolder = Path(Path(filename).parent, "phon")
     else:
@@ -87,6 +137,11 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     outfilenameBiphones = Path(outfolder, corpusName + "_biphones.txt")
     outfilenameTriphones = Path(outfolder, corpusName + "_triphones.txt")
 
+    # the text outputs, with .gz or .zst added if compressed
+    outfilenamePhonesTxt = output_path(outfilenamePhones, compress)
+    outfilenameBiphonesTxt = output_path(outfilenameBiphones, compress)
+    outfilenameTriphonesTxt = output_path(outfilenameTriphones, compress)
+
     phoneDict = Counter()
     triphoneDict = Counter()
     biphoneDict = Counter()
@@ -94,44 +149,37 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     print('Reading the wordlist file now...')
 
-    with infilename.open() as f:
-        lines = f.readlines()
-
-        for line in lines:
-            if not line or line.startswith("#"):
-                continue
-
-            line = line.strip().casefold()
-
-            phones, *rest = line.split()
+    ngram_store = load_ngram_store_for_wordlist(infilename)
+    if ngram_store is not None:
+        # memory-mapped binary store written by ngrams.py
+        word_freqs = read_word_freq_from_store(ngram_store).items()
+    else:
+        word_freqs = read_wordlist_lines(infilename)
 
-            try:
-                freq = int(rest[0])
-            except (ValueError, IndexError):
-                freq = 1
+    for phones, freq in word_freqs:
 
-            phones = "#{}#".format(phones) # add word boundaries
-            lenPhones = len(phones)
+        phones = "#{}#".format(phones) # add word boundaries
+        lenPhones = len(phones)
 
-            for i in range(lenPhones-2):
+        for i in range(lenPhones-2):
 
-                phone1 = phones[i]
-                phone2 = phones[i+1]
-                phone3 = phones[i+2]
+            phone1 = phones[i]
+            phone2 = phones[i+1]
+            phone3 = phones[i+2]
 
-                phoneDict[phone3] += freq
+            phoneDict[phone3] += freq
 
-                if i == 0:
-                    phoneDict[phone1] += freq
-                    phoneDict[phone2] += freq
-                    biphone = phone1 + sep + phone2
-                    biphoneDict[biphone] += freq
+            if i == 0:
+                phoneDict[phone1] += freq
+                phoneDict[phone2] += freq
+                biphone = phone1 + sep + phone2
+                biphoneDict[biphone] += freq
 
-                biphone = phone2 + sep + phone3
-                triphone = phone1 + sep + phone2 + sep + phone3
+            biphone = phone2 + sep + phone3
+            triphone = phone1 + sep + phone2 + sep + phone3
 
-                triphoneDict[triphone] += freq
-                biphoneDict[biphone] += freq
+            triphoneDict[triphone] += freq
+            biphoneDict[biphone] += freq
 
     print("\nCompleted counting phones, biphones, and triphones.")
 
@@ -150,28 +198,27 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     # generate .txt output files
     #--------------------------------------------------------------------------#
 
-    with outfilenamePhones.open('w') as f:
+    with open_output(outfilenamePhonesTxt) as f:
         print(intro_string, file=f)
         print("# type count: {}".format(len(phonesSorted)), file=f)
         print("# token count: {}".format(str(sum(phoneDict.values()))), file=f)
-        for (phone, freq) in phonesSorted:
-            print(phone + sep + str(freq), file=f)
+        write_rows(f, (phone + sep + str(freq) for phone, freq in phonesSorted))
 
-    with outfilenameBiphones.open('w') as f:
+    with open_output(outfilenameBiphonesTxt) as f:
         print(intro_string, file=f)
         print("# type count: {}".format(len(biphonesSorted)), file=f)
         print("# token count: {}".format(str(sum(biphoneDict.values()))),
                                                                         file=f)
-        for (biphone, freq) in biphonesSorted:
-            print(biphone + sep +  str(freq), file=f)
+        write_rows(f, (biphone + sep + str(freq)
+                       for biphone, freq in biphonesSorted))
 
-    with outfilenameTriphones.open('w') as f:
+    with open_output(outfilenameTriphonesTxt) as f:
         print(intro_string, file=f)
         print("# type count: {}".format(len(triphonesSorted)), file=f)
         print("# token count: {}".format(str(sum(triphoneDict.values()))),
                                                                         file=f)
-        for (triphone, freq) in triphonesSorted:
-            print(triphone + sep + str(freq), file=f)
+        write_rows(f, (triphone + sep + str(freq)
+                       for triphone, freq in triphonesSorted))
 
     #--------------------------------------------------------------------------#
     # generate .json output files
@@ -191,14 +238,21 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     print('phone, biphone and triphone files ready')
 
+    cache.record(stage, stage_inputs, stage_params,
+                 [outfilenamePhonesTxt, outfilenameBiphonesTxt,
+                  outfilenameTriphonesTxt, outfilenamePhones_json,
+                  outfilenameBiphones_json, outfilenameTriphones_json])
+
     stdout_list("Output files:",
-        outfilenamePhones, outfilenameBiphones, outfilenameTriphones,
+        outfilenamePhonesTxt, outfilenameBiphonesTxt, outfilenameTriphonesTxt,
         outfilenamePhones_json, outfilenameBiphones_json, outfilenameTriphones_json)
 
 if __name__ == "__main__":
 
     args = makeArgParser().parse_args()
     maxwordtokens = args.maxwordtokens
+    compress = args.compress
+    use_cache = not args.no_cache
 
     description="You are running {}.\n".format(__file__) + \
                 "This program works on the phonology-related tasks.\n" + \
@@ -212,6 +266,7 @@ if __name__ == "__main__":
     use_corpus = determine_use_corpus()
 
     main(language=language, corpus=corpus, datafolder=datafolder,
-         maxwordtokens=maxwordtokens, use_corpus=use_corpus)
+         maxwordtokens=maxwordtokens, use_corpus=use_corpus,
+         compress=compress, use_cache=use_cache)
 
 
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Records of the pipeline stages (ngrams.py, lxa5.py, phon.py, tries.py,
+#    manifold.py) run on a corpus, so that a stage whose inputs and
+#    parameters have not changed since its last run is skipped, and so that
+#    an upstream stage is run again when its input has changed (not only
+#    when its output files are missing).
+#
+#    The records are kept in the "cache" folder next to the corpus file:
+#
+#        [datafolder]/[language]/cache/stages.json
+#        [datafolder]/[language]/cache/digests.json
+#
+#    stages.json maps a stage (e.g. "lxa5:english-brown") to the SHA-1
+#    digests of its input files (which include the program's own .py files),
+#    its parameters, and the size and modification time of its output files.
+#    A stage is up to date if all of these are unchanged.
+#
+#    digests.json memoizes the digest of each file by its size and
+#    modification time, so that unchanged files are not read again.
+#
+#------------------------------------------------------------------------------#
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+CACHE_FOLDER = "cache"
+STAGES_FILENAME = "stages.json"
+DIGESTS_FILENAME = "digests.json"
+
+DIGEST_CHUNKSIZE = 1 << 20
+
+
+def get_stage_cache(language, datafolder, filename):
+    """Return the StageCache of the folder of the corpus"""
+    if filename:
+        folder = Path(Path(filename).parent, CACHE_FOLDER)
+    else:
+        folder = Path(datafolder, language, CACHE_FOLDER)
+    return StageCache(folder)
+
+
+def get_corpus_path(language, corpus, datafolder, filename):
+    """Return the path of the corpus file"""
+    if filename:
+        return Path(filename)
+    return Path(datafolder, language, corpus)
+
+
+def source_files(*names):
+    """Return the paths of the given .py files of this program; they are
+    inputs of the stages, so that a stage runs again if its code changes"""
+    folder = Path(__file__).resolve().parent
+    return [Path(folder, name) for name in names]
+
+
+def _read_json(path: Path):
+    try:
+        with path.open() as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def _write_json(path: Path, data):
+    # write to a temporary file first, so that the file is never half written
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = Path(str(path) + ".tmp{}".format(os.getpid()))
+    with temp_path.open("w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(str(temp_path), str(path))
+
+
+def _file_stat(path: Path):
+    """Return [size, modification time in ns] of the file, or None if it
+    does not exist"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class StageCache:
+    """The records of the stages run on the files of a corpus folder"""
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.stages_path = Path(folder, STAGES_FILENAME)
+        self.digests_path = Path(folder, DIGESTS_FILENAME)
+
+    def digest(self, path: Path):
+        """Return the SHA-1 digest of the file (None if it does not exist),
+        computed only if its size or modification time has changed"""
+        return self._input_digests([path])[str(Path(path).resolve())]
+
+    @staticmethod
+    def _file_digest(path: Path, digests):
+        """Return (digest of the file, whether it is new): the digest is
+        taken from the dict digests (as in digests.json) if the file is
+        unchanged; otherwise it is computed and added to digests"""
+        stat = _file_stat(path)
+        if stat is None:
+            return None, False
+
+        name = str(Path(path).resolve())
+        if name in digests and digests[name][:2] == stat:
+            return digests[name][2], False
+
+        checksum = hashlib.sha1()
+        with Path(path).open("rb") as f:
+            for chunk in iter(lambda: f.read(DIGEST_CHUNKSIZE), b""):
+                checksum.update(chunk)
+
+        digests[name] = stat + [checksum.hexdigest()]
+        return checksum.hexdigest(), True
+
+    def _input_digests(self, inputs):
+        # digests.json is read once, and written once if a digest is new
+        digests = _read_json(self.digests_path)
+        result = dict()
+        changed = False
+        for path in inputs:
+            digest, new = self._file_digest(Path(path), digests)
+            result[str(Path(path).resolve())] = digest
+            changed |= new
+        if changed:
+            _write_json(self.digests_path, digests)
+        return result
+
+    def _outputs_unchanged(self, record):
+        return all(_file_stat(Path(path)) == stat
+                   for path, stat in record["outputs"].items())
+
+    def is_fresh(self, stage, inputs, params):
+        """Return True if stage was last run with the same input files and
+        parameters, and its output files have not changed since then"""
+        record = _read_json(self.stages_path).get(stage)
+        if record is None:
+            return False
+        return (record["params"] == params and
+                record["inputs"] == self._input_digests(inputs) and
+                self._outputs_unchanged(record))
+
+    def is_stale(self, stage, inputs):
+        """Return True if stage has been run, but the given input files (some
+        of its inputs) or its output files have changed since then. A stage
+        which has never been recorded is not stale."""
+        record = _read_json(self.stages_path).get(stage)
+        if record is None:
+            return False
+        for name, digest in self._input_digests(inputs).items():
+            if name in record["inputs"] and record["inputs"][name] != digest:
+                return True
+        return not self._outputs_unchanged(record)
+
+    def params(self, stage):
+        """Return the parameters with which stage was last run (an empty
+        dict if it has never been recorded)"""
+        record = _read_json(self.stages_path).get(stage)
+        if record is None:
+            return dict()
+        return record["params"]
+
+    def record(self, stage, inputs, params, outputs):
+        """Record that stage has been run with the given input files and
+        parameters (json-serializable), and has written the output files"""
+        record = {"inputs": self._input_digests(inputs),
+                  "params": params,
+                  "outputs": {str(Path(path).resolve()): _file_stat(Path(path))
+                              for path in outputs}}
+
+        stages = _read_json(self.stages_path)
+        stages[stage] = record
+        _write_json(self.stages_path, stages)
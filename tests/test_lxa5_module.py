@@ -0,0 +1,82 @@
+import random
+import sys
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lxa5_module import (FindBlockBiSignatures, MakeBiSignatures,
+                         MakeWordBlocks, SortWordlist, maximalcommonprefix)
+
+
+def serial_bisignatures(wordlist, MinimumStemLength, MaximumAffixLength,
+                        FindSuffixesFlag):
+    """the serial pass of MakeBiSignatures before the word blocks: each run
+    of words with the same first MinimumStemLength letters is analyzed when
+    the next run starts, so the last run is not analyzed"""
+    BisigToTuple = dict()
+    words = sorted(wordlist, key=(None if FindSuffixesFlag
+                                  else lambda x: x[::-1]))
+    if not FindSuffixesFlag:
+        words = [word[::-1] for word in words]
+
+    subwordlist = [words[0]]
+    for word1, word2 in zip(words, words[1:]):
+        if word1[:MinimumStemLength] == word2[:MinimumStemLength]:
+            subwordlist.append(word2)
+            continue
+        for w1, w2 in combinations(subwordlist, 2):
+            stem = maximalcommonprefix(w1, w2)
+            suffix1, suffix2 = w1[len(stem):], w2[len(stem):]
+            if len(suffix1) > MaximumAffixLength or \
+               len(suffix2) > MaximumAffixLength:
+                continue
+            if not FindSuffixesFlag:
+                w1, w2, stem = w1[::-1], w2[::-1], stem[::-1]
+                suffix1, suffix2 = suffix1[::-1], suffix2[::-1]
+            bisig = tuple(sorted([suffix1 or "NULL", suffix2 or "NULL"]))
+            BisigToTuple.setdefault(bisig, set()).add((stem, w1, w2))
+        subwordlist = [word2]
+
+    return BisigToTuple
+
+
+def random_wordlist(rng):
+    stems = {"".join(rng.choice("abcd") for _ in range(rng.randrange(2, 6)))
+             for _ in range(30)}
+    affixes = ["", "s", "ed", "ing", "er", "ers", "ly", "ness"]
+    return sorted({stem + affix if rng.random() < 0.5 else affix + stem
+                   for stem in stems for affix in rng.sample(affixes, 3)})
+
+
+def test_block_bisignatures_equal_serial_pass():
+    rng = random.Random(0)
+    for _ in range(20):
+        wordlist = random_wordlist(rng)
+        for FindSuffixesFlag in [True, False]:
+            expected = serial_bisignatures(wordlist, 2, 3, FindSuffixesFlag)
+
+            words = list(wordlist)
+            SortWordlist(words, FindSuffixesFlag)
+            blocks = MakeWordBlocks(words, 2, FindSuffixesFlag)
+            BlockToTuple = dict()
+            for bisig, chunk in FindBlockBiSignatures(blocks, 3,
+                                                      FindSuffixesFlag):
+                BlockToTuple.setdefault(bisig, set()).add(chunk)
+            assert BlockToTuple == expected
+
+            for workers in [1, 2]:
+                BisigToTuple = MakeBiSignatures(list(wordlist), 2, 3,
+                                                FindSuffixesFlag,
+                                                workers=workers)
+                assert {bisig: set(chunks)
+                        for bisig, chunks in BisigToTuple.items()} == expected
+
+
+def test_last_word_block_is_not_analyzed():
+    # as in the serial pass, a block is analyzed when the next one starts
+    wordlist = ["jump", "jumped", "jumps", "walk", "walked", "walks"]
+    blocks = MakeWordBlocks(wordlist, 3)
+    assert blocks == [["jump", "jumped", "jumps"]]
+    assert set(MakeBiSignatures(list(wordlist), 3, 3)) == \
+        {("NULL", "ed"), ("NULL", "s"), ("ed", "s")}
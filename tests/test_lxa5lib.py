@@ -0,0 +1,93 @@
+import io
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from lxa5lib import json_pdump, json_pload, sorted_alphabetized
+
+
+def composite_sorted(items, key, reverse, subkey, subreverse):
+    """a single stable sort on the composite key (key, subkey)"""
+    sign = 1 if reverse == subreverse else -1
+    return sorted(items, key=lambda x: (sign * key(x), subkey(x)),
+                  reverse=subreverse)
+
+
+def test_sorted_alphabetized_composite_key():
+    rng = random.Random(0)
+    items = [("w{}".format(rng.randrange(50)), rng.randrange(8))
+             for _ in range(200)]
+    count = lambda x: x[1]
+    word = lambda x: x[0]
+
+    for reverse in [False, True]:
+        for subreverse in [False, True]:
+            expected = composite_sorted(items, count, reverse, word, subreverse)
+            assert sorted_alphabetized(items, key=count, reverse=reverse,
+                                       subkey=word,
+                                       subreverse=subreverse) == expected
+            assert sorted_alphabetized(items, key=count, reverse=reverse,
+                                       subkey=word, subreverse=subreverse,
+                                       top=15) == expected[:15]
+
+    assert sorted_alphabetized(items, key=count, reverse=True) == \
+        composite_sorted(items, count, True, lambda x: x, False)
+    assert sorted_alphabetized(list(), key=count) is None
+
+
+def dump_and_load(data, **kwargs):
+    f = io.StringIO()
+    json_pdump(data, f, **kwargs)
+    f.seek(0)
+    return json_pload(f)
+
+
+def test_json_round_trip_keeps_types():
+    data = {("NULL", "s"): {("jump", "jump", "jumps"), ("walk", "walk",
+                                                      "walks")},
+            "word": ["a", ("b", 1), {"c"}],
+            3: Counter({"the": 5, ("of", "the"): 2}),
+            2.5: {"nested": frozenset({1, 2}), "none": None, "flag": True},
+            (1, ("x", "y")): np.int64(7)}
+    # keys of mixed types cannot be sorted, so they are written as they are
+    loaded = dump_and_load(data, asis=True)
+    assert loaded == {key: (int(value) if isinstance(value, np.integer)
+                            else value)
+                      for key, value in data.items()}
+    assert type(loaded["word"]) is list
+    assert type(loaded["word"][2]) is set
+    assert type(loaded[3]) is Counter
+    assert type(loaded[2.5]["nested"]) is frozenset
+    assert type(loaded[(1, ("x", "y"))]) is int
+
+    sigs = {("NULL", "s"): 3, ("ed", "ing"): 2, ("NULL", "ed"): 5}
+    assert list(dump_and_load(sigs)) == sorted(sigs)
+    assert dump_and_load(dict()) == dict()
+    # asis keeps the order of the dict
+    assert list(dump_and_load({"b": 1, "a": 2}, asis=True)) == ["b", "a"]
+
+
+def test_json_pload_reads_legacy_repr_files():
+    # as written by the former json_pdump: str() of every key and value
+    legacy = {str(("NULL", "s")): str({("jump", "jump", "jumps")}),
+              str(3): str(Counter({"the": 5})),
+              str(("ed",)): str(["a", "b"])}
+    loaded = json_pload(io.StringIO(json.dumps(legacy)))
+    assert loaded == {("NULL", "s"): {("jump", "jump", "jumps")},
+                      3: Counter({"the": 5}),
+                      ("ed",): ["a", "b"]}
+
+    # the keys (and the values) are converted only if all of them are
+    # python literals; nothing else is evaluated
+    legacy = {"jump": "__import__('os').getcwd()", "5": "7"}
+    assert json_pload(io.StringIO(json.dumps(legacy))) == \
+        {"jump": "__import__('os').getcwd()", "5": "7"}
+    legacy = {"jump": "5", "walk": "(1, 2)"}
+    assert json_pload(io.StringIO(json.dumps(legacy))) == \
+        {"jump": 5, "walk": (1, 2)}
@@ -0,0 +1,141 @@
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+import scipy.sparse
+
+from manifold_module import (Normalize, SHARED_CONTEXTS_MEMORY,
+                             _as_sparse_counts,
+                             compute_closest_neighbors, compute_diameter,
+                             compute_incidence_graph, compute_laplacian,
+                             compute_nearest_neighbors,
+                             compute_shared_contexts_laplacian,
+                             compute_words_distance,
+                             remove_words_from_neighbors)
+
+
+def make_counts():
+    return _as_sparse_counts({0: Counter({2: 1, 1: 3}), 2: Counter({0: 2})},
+                             nwords=3)
+
+
+def test_sparse_counts_rows():
+    counts = make_counts()
+    assert list(counts) == [0, 2]
+    assert 0 in counts and 2 in counts
+    assert 1 not in counts and 3 not in counts and -1 not in counts
+    assert counts[0] == Counter({2: 1, 1: 3})
+    assert counts[1] == Counter()
+    with pytest.raises(KeyError):
+        counts[3]
+
+
+def test_sparse_counts_other_keys():
+    counts = make_counts()
+    for key in ("the", None, 1.5, (0,)):
+        assert key not in counts
+        with pytest.raises(KeyError):
+            counts[key]
+    assert counts.get("the") is None
+
+
+def test_normalize_sparse_and_dense():
+    shared = scipy.sparse.csr_matrix(np.array([[3, 1, 0, 2],
+                                               [1, 2, 1, 0],
+                                               [0, 1, 4, 1],
+                                               [2, 0, 1, 5]]))
+    expected = np.array([3, 2, 2, 3])
+    for matrix in [shared, shared.toarray(), shared.todense()]:
+        diameter = Normalize(4, matrix)
+        assert type(diameter) is np.ndarray
+        assert diameter.dtype == np.int64
+        assert diameter.shape == (4,)
+        assert diameter.tolist() == expected.tolist()
+
+
+def test_neighbors_of_words_with_the_same_coordinates():
+    rng = np.random.default_rng(0)
+    coordinates = rng.random((10, 3))
+    # words 1, 3 and 7, and words 4, 5, 6 and 8 (like words with no
+    # contexts), have the same coordinates
+    coordinates[[3, 7]] = coordinates[1]
+    coordinates[[5, 6, 8]] = coordinates[4]
+    nNeighbors = 2
+
+    for closestNeighbors in [
+            compute_nearest_neighbors(coordinates, nNeighbors),
+            compute_closest_neighbors(
+                compute_words_distance(10, coordinates), nNeighbors)]:
+        # word 3 comes after word 1 in its own row, and word 8 is not in
+        # its own row at all
+        assert closestNeighbors[3].tolist() == [1, 3, 7]
+        assert closestNeighbors[8].tolist() == [4, 5, 6]
+
+        neighbors = remove_words_from_neighbors(closestNeighbors)
+        assert neighbors.shape == (10, nNeighbors)
+        assert neighbors[3].tolist() == [1, 7]
+        assert neighbors[8].tolist() == [4, 5]
+        assert neighbors[1].tolist() == [3, 7]
+        for word_no, row in enumerate(neighbors.tolist()):
+            assert word_no not in row
+
+
+def test_kdtree_neighbors_equal_sorted_distances():
+    rng = np.random.default_rng(1)
+    for nwords, ndims, nNeighbors in [(200, 3, 9), (50, 6, 4), (8, 2, 9)]:
+        # coordinates on a coarse grid, so that many distances are tied
+        coordinates = rng.integers(0, 4, size=(nwords, ndims)) / 4
+        coordinates[: nwords // 10] = 0
+        expected = compute_closest_neighbors(
+                        compute_words_distance(nwords, coordinates), nNeighbors)
+        assert np.array_equal(compute_nearest_neighbors(coordinates,
+                                                        nNeighbors),
+                              expected)
+
+
+def random_context_array(nwords, ncontexts, seed):
+    """a 0/1 word-context matrix in which some words have no contexts"""
+    rng = np.random.default_rng(seed)
+    dense = (rng.random((nwords, ncontexts)) < 0.15).astype(np.int64)
+    dense[rng.choice(nwords, nwords // 8, replace=False)] = 0
+    return scipy.sparse.csr_matrix(dense)
+
+
+def test_sparse_laplacian_equals_dense_laplacian():
+    nwords = 60
+    context_array = random_context_array(nwords, 40, seed=2)
+    shared = context_array.dot(context_array.T).todense()
+
+    # the laplacian as defined: shared contexts, with the diameters on the
+    # diagonal, divided by sqrt(diameter[i] * diameter[j]) (by 1 if zero)
+    diameter = np.asarray(shared.sum(axis=1)).ravel() - np.diag(shared)
+    incidence = np.array(shared)
+    np.fill_diagonal(incidence, diameter)
+    D = np.sqrt(np.outer(diameter, diameter))
+    D[D == 0] = 1
+    expected = incidence / D
+
+    assert np.array_equal(compute_diameter(context_array), diameter)
+
+    Diameter = Normalize(nwords, shared)
+    dense = compute_laplacian(nwords, Diameter,
+                              compute_incidence_graph(nwords, Diameter,
+                                                      shared.copy()))
+    assert np.allclose(dense, expected, rtol=0, atol=1e-15)
+
+    sparse_shared = context_array.dot(context_array.T).tocsr()
+    sparse = compute_laplacian(nwords, Diameter,
+                               compute_incidence_graph(nwords, Diameter,
+                                                       sparse_shared))
+    assert scipy.sparse.issparse(sparse)
+    assert np.allclose(sparse.toarray(), expected, rtol=0, atol=1e-15)
+
+    # by blocks of rows, down to one row per block
+    for memory in [SHARED_CONTEXTS_MEMORY, 0]:
+        blocks = compute_shared_contexts_laplacian(context_array,
+                                                   memory=memory)
+        assert np.allclose(blocks.toarray(), expected, rtol=0, atol=1e-15)
@@ -0,0 +1,193 @@
+import hashlib
+import importlib.util
+import pickle
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import ngrams
+from lxa5lib import json_pload
+from ngram_store import load_ngram_store
+from tokenizer import get_tokenizer
+
+
+def load_module_as(name):
+    """ngrams.py loaded again as the module name (e.g. as when it runs as a
+    script, under "__main__"), with classes distinct from ngrams'"""
+    spec = importlib.util.spec_from_file_location(name, str(ROOT / "ngrams.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_lossy_snapshot_loads_from_another_module(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("the cat sat on the mat\nthe dog sat on the log\n" * 50)
+    error = 0.01
+    tokenizer = get_tokenizer()
+
+    script = load_module_as("ngrams_as_script")
+    try:
+        counter = script.NgramCounter(error)
+        for line in corpus.read_text().splitlines():
+            counter.add_sentence(line.split())
+        assert isinstance(counter.bigrams, script.LossyCounter)
+
+        snapshot_path = tmp_path / "corpus_counts.pickle"
+        data = corpus.read_bytes()
+        script.save_count_snapshot(snapshot_path, counter, len(data),
+                                   hashlib.sha1(data).hexdigest(), tokenizer)
+    finally:
+        del sys.modules["ngrams_as_script"]
+
+    assert b"LossyCounter" not in snapshot_path.read_bytes()
+
+    loaded, offset, _ = ngrams.load_count_snapshot(snapshot_path, corpus,
+                                                   tokenizer, error=error)
+    assert offset == len(data)
+    assert loaded.vocabulary == counter.vocabulary
+    assert loaded.words == counter.words
+    for name in ["bigrams", "trigrams"]:
+        original = getattr(counter, name)
+        restored = getattr(loaded, name)
+        assert isinstance(restored, ngrams.LossyCounter)
+        assert dict(restored) == dict(original)
+        assert restored.deltas == original.deltas
+        assert restored.stream_length == original.stream_length
+        assert restored.bucket_width == original.bucket_width
+
+
+def test_exact_snapshot_round_trip(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("a b c d\nb c d e\n")
+    tokenizer = get_tokenizer()
+
+    counter = ngrams.NgramCounter()
+    for line in corpus.read_text().splitlines():
+        counter.add_sentence(line.split())
+
+    snapshot_path = tmp_path / "corpus_counts.pickle"
+    data = corpus.read_bytes()
+    ngrams.save_count_snapshot(snapshot_path, counter, len(data),
+                               hashlib.sha1(data).hexdigest(), tokenizer)
+
+    loaded, _, _ = ngrams.load_count_snapshot(snapshot_path, corpus, tokenizer)
+    assert loaded.bigrams == counter.bigrams
+    assert loaded.trigrams == counter.trigrams
+    assert loaded.token_count == counter.token_count
+
+
+def test_min_count_prunes_tables_to_nothing(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("the cat sat on the mat\nthe dog sat on the log\n")
+
+    # no bigram or trigram occurs 10 times
+    ngrams.main(filename=str(corpus), min_count=10, use_cache=False)
+
+    outfolder = tmp_path / "ngrams"
+    for name in ["bigrams", "trigrams"]:
+        lines = (outfolder / "corpus_{}.txt".format(name)).read_text()
+        assert lines.splitlines()[-1] == "# type count: 0"
+        with (outfolder / "corpus_{}.json".format(name)).open() as f:
+            assert json_pload(f) == dict()
+
+    store = load_ngram_store(outfolder, "corpus")
+    assert store.vocabulary[0] == "the"
+    assert store.word_counts.tolist()[0] == 4
+    assert store.bigrams.shape == (0, 2) and len(store.bigram_counts) == 0
+    assert store.trigrams.shape == (0, 3) and len(store.trigram_counts) == 0
+
+
+def test_snapshot_in_unknown_format_is_not_used(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("a b c d\nb c d e\n")
+    data = corpus.read_bytes()
+    tokenizer = get_tokenizer()
+
+    counter = ngrams.NgramCounter()
+    for line in corpus.read_text().splitlines():
+        counter.add_sentence(line.split())
+
+    snapshot_path = tmp_path / "corpus_counts.pickle"
+    ngrams.save_count_snapshot(snapshot_path, counter, len(data),
+                               hashlib.sha1(data).hexdigest(), tokenizer)
+    with snapshot_path.open("rb") as f:
+        snapshot = pickle.load(f)
+
+    # no format (as saved with Counters before), another format, not a dict
+    del snapshot["format"]
+    snapshot["bigrams"] = counter.bigrams
+    for unknown in [snapshot, dict(snapshot, format="other"), [snapshot]]:
+        with snapshot_path.open("wb") as f:
+            pickle.dump(unknown, f)
+        loaded, offset, checksum = ngrams.load_count_snapshot(
+                                        snapshot_path, corpus, tokenizer)
+        assert loaded is None and offset == 0
+        assert checksum.hexdigest() == hashlib.sha1().hexdigest()
+
+    snapshot_path.write_bytes(b"not a pickle")
+    assert ngrams.load_count_snapshot(snapshot_path, corpus,
+                                      tokenizer)[0] is None
+
+
+def write_corpus(path, nlines, seed=0):
+    rng = random.Random(seed)
+    words = ["the", "cat", "dog", "sat", "on", "a", "mat", "log", "and",
+             "ran", "away", "home"]
+    path.write_text("".join(" ".join(rng.choice(words)
+                                     for _ in range(rng.randrange(1, 12))) +
+                            rng.choice(["", ".", " ,", "!"]) + "\n"
+                            for _ in range(nlines)))
+
+
+def counts(counter):
+    """the counts of an NgramCounter, independent of its word IDs"""
+    return (dict(counter.word_items()), dict(counter.bigram_items()),
+            dict(counter.trigram_items()), counter.token_count)
+
+
+def serial_counts(corpus, tokenizer):
+    lines = ngrams.read_corpus_lines(corpus)
+    return counts(ngrams.count_ngrams(ngrams.tokenize_lines(lines,
+                                                            tokenizer)))
+
+
+def test_sharded_counts_equal_serial_counts(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    write_corpus(corpus, 500)
+    tokenizer = get_tokenizer()
+    expected = serial_counts(corpus, tokenizer)
+
+    for workers in [2, 3]:
+        counter = ngrams.count_ngrams_in_parallel(corpus, workers,
+                                                  chunksize=100,
+                                                  tokenizer=tokenizer)
+        assert counts(counter) == expected
+
+
+def test_incremental_counts_equal_serial_counts(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    write_corpus(corpus, 300, seed=1)
+    text = corpus.read_text()
+    tokenizer = get_tokenizer()
+    snapshot_path = tmp_path / "corpus_counts.pickle"
+
+    # the corpus grows in three steps; the second step ends in the middle
+    # of a line, which is counted but not saved in the snapshot
+    middle = text.index("\n", len(text) // 3) + 5
+    for part in [text[: len(text) // 3 // 2], text[: middle], text]:
+        corpus.write_text(part)
+        counter = ngrams.count_ngrams_incrementally(corpus, snapshot_path,
+                                                    chunksize=64,
+                                                    tokenizer=tokenizer)
+        assert counts(counter) == serial_counts(corpus, tokenizer)
+
+    # the corpus changes (not just grows): it is counted again
+    corpus.write_text("a dog\n" + text)
+    counter = ngrams.count_ngrams_incrementally(corpus, snapshot_path,
+                                                tokenizer=tokenizer)
+    assert counts(counter) == serial_counts(corpus, tokenizer)
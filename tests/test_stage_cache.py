@@ -0,0 +1,97 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ngrams
+from stage_cache import get_stage_cache, StageCache
+
+
+def touch(path, seconds):
+    """set the modification time of the file seconds later"""
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns,
+                            stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def make_stage(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("the cat sat\n")
+    output = tmp_path / "corpus_words.txt"
+    output.write_text("the 1\ncat 1\nsat 1\n")
+    cache = StageCache(tmp_path / "cache")
+    cache.record("ngrams:corpus", [corpus], {"min_count": 0}, [output])
+    return cache, corpus, output
+
+
+def test_recorded_stage_is_fresh(tmp_path):
+    cache, corpus, output = make_stage(tmp_path)
+
+    assert cache.is_fresh("ngrams:corpus", [corpus], {"min_count": 0})
+    assert not cache.is_stale("ngrams:corpus", [corpus])
+    assert cache.params("ngrams:corpus") == {"min_count": 0}
+
+    # other parameters, another input, or a stage never run
+    assert not cache.is_fresh("ngrams:corpus", [corpus], {"min_count": 2})
+    other = tmp_path / "other.txt"
+    other.write_text("")
+    assert not cache.is_fresh("ngrams:corpus", [corpus, other],
+                              {"min_count": 0})
+    assert not cache.is_fresh("lxa5:corpus", [corpus], {})
+    assert not cache.is_stale("lxa5:corpus", [corpus])
+    assert cache.params("lxa5:corpus") == dict()
+
+
+def test_input_changes(tmp_path):
+    cache, corpus, output = make_stage(tmp_path)
+
+    # a new modification time alone does not change the digest
+    touch(corpus, 10)
+    assert cache.is_fresh("ngrams:corpus", [corpus], {"min_count": 0})
+
+    corpus.write_text("the cat sat on the mat\n")
+    assert not cache.is_fresh("ngrams:corpus", [corpus], {"min_count": 0})
+    assert cache.is_stale("ngrams:corpus", [corpus])
+
+    # a missing input differs from any file
+    corpus.unlink()
+    assert cache.is_stale("ngrams:corpus", [corpus])
+
+
+def test_output_changes(tmp_path):
+    cache, corpus, output = make_stage(tmp_path)
+
+    touch(output, 10)
+    assert not cache.is_fresh("ngrams:corpus", [corpus], {"min_count": 0})
+    assert cache.is_stale("ngrams:corpus", [corpus])
+
+    cache.record("ngrams:corpus", [corpus], {"min_count": 0}, [output])
+    output.unlink()
+    assert not cache.is_fresh("ngrams:corpus", [corpus], {"min_count": 0})
+
+
+def test_ngrams_runs_again_only_if_the_corpus_changes(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("the cat sat on the mat\n")
+    words = tmp_path / "ngrams" / "corpus_words.txt"
+
+    ngrams.main(filename=str(corpus))
+
+    # an output file has changed (here, its time), so ngrams runs again
+    touch(words, -10)
+    mtime = words.stat().st_mtime_ns
+    ngrams.main(filename=str(corpus))
+    assert words.stat().st_mtime_ns != mtime
+
+    # nothing has changed, so ngrams does not run
+    mtime = words.stat().st_mtime_ns
+    ngrams.main(filename=str(corpus))
+    assert words.stat().st_mtime_ns == mtime
+    assert not ngrams.remake_if_stale(filename=str(corpus))
+
+    corpus.write_text("the dog sat on the log\n")
+    assert ngrams.remake_if_stale(filename=str(corpus))
+    assert "dog" in words.read_text()
+    assert get_stage_cache(None, None, str(corpus)).params(
+        "ngrams:corpus")["min_count"] == 0
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tokenizer import DEFAULT_PUNCTUATION, get_tokenizer
+
+
+def test_default_punctuation():
+    tokenizer = get_tokenizer("english")
+    assert tokenizer.punctuation == DEFAULT_PUNCTUATION
+    assert tokenizer("The cat (a tabby) sat.") == \
+        ["the", "cat", "(", "a", "tabby", ")", "sat", "."]
+
+
+def test_language_punctuation():
+    tokenizer = get_tokenizer("Spanish")
+    assert tokenizer("¿Qué pasa? ¡Hola!") == \
+        ["¿", "qué", "pasa", "?", "¡", "hola", "!"]
+    assert get_tokenizer("french")("«Bonjour»") == ["«", "bonjour", "»"]
+
+
+def test_punctuation_overrides_language():
+    tokenizer = get_tokenizer("spanish", punctuation=".")
+    assert tokenizer("¿Qué?.") == ["¿qué?", "."]
+
+
+def test_tokenize_lines_keeps_lines():
+    lines = ["A b.", "", "c, d"] * 5
+    tokenizer = get_tokenizer()
+    assert list(tokenizer.tokenize_lines(lines, blocksize=4)) == \
+        [tokenizer(line) for line in lines]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------#
+#
+#    Tokenizer for corpus text, shared by the lxa5 components.
+#
+#    Every punctuation character is split off as a token of its own, and
+#    the rest of a line is split on whitespace. Lines are tokenized a block
+#    at a time: the block is casefolded once and each punctuation character
+#    is padded with spaces by one str.replace call over the whole block,
+#    instead of nine string operations per line.
+#    (A compiled regex or a str.translate table is slower than this in
+#    CPython; see "python3 benchmarks.py tokenizer -h".)
+#
+#------------------------------------------------------------------------------#
+
+# punctuation characters split off as separate tokens
+DEFAULT_PUNCTUATION = ".,;!?:)("
+
+# scrubbing rules for particular languages, keyed by casefolded language
+# name (the --language of the components); a language not listed here
+# uses DEFAULT_PUNCTUATION
+PUNCTUATION_BY_LANGUAGE = {
+    "spanish": DEFAULT_PUNCTUATION + "¿¡",
+    "french": DEFAULT_PUNCTUATION + "«»",
+}
+
+# number of lines tokenized together by tokenize_lines()
+BLOCKSIZE = 10000
+
+
+class Tokenizer:
+
+    def __init__(self, punctuation=DEFAULT_PUNCTUATION, casefold=True):
+        self.punctuation = punctuation
+        self.casefold = casefold
+        self.replacements = [(char, " " + char + " ") for char in punctuation
+                             if not char.isspace()]
+
+    def tokenize_block(self, lines):
+        """Return the list of tokens of each line in the list lines."""
+        text = "\n".join(lines)
+        if self.casefold:
+            text = text.casefold()
+        for char, spaced_char in self.replacements:
+            text = text.replace(char, spaced_char)
+        return [line.split() for line in text.split("\n")]
+
+    def tokenize(self, line):
+        """Return the list of tokens of line."""
+        return self.tokenize_block([line])[0]
+
+    __call__ = tokenize
+
+    def tokenize_lines(self, lines, blocksize=BLOCKSIZE):
+        """Yield the list of tokens of each line from the iterable lines."""
+        block = list()
+        for line in lines:
+            block.append(line)
+            if len(block) == blocksize:
+                yield from self.tokenize_block(block)
+                block = list()
+        if block:
+            yield from self.tokenize_block(block)
+
+    def __repr__(self):
+        return "Tokenizer(punctuation={!r}, casefold={!r})".format(
+                   self.punctuation, self.casefold)
+
+
+def get_tokenizer(language=None, punctuation=None, casefold=True):
+    """Return the Tokenizer for language.
+
+    If punctuation is given, it overrides the scrubbing rules of language.
+    """
+    if punctuation is None:
+        punctuation = PUNCTUATION_BY_LANGUAGE.get(str(language).casefold(),
+                                                  DEFAULT_PUNCTUATION)
+    return Tokenizer(punctuation=punctuation, casefold=casefold)
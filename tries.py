@@ -11,11 +11,16 @@ import argparse
 from pathlib import Path
 
 import ngrams
+from ngram_store import (load_ngram_store_for_wordlist,
+                         ngram_store_paths_for_wordlist,
+                         read_word_freq_from_store)
 from lxa5lib import (get_language_corpus_datafolder, json_pdump,
                      changeFilenameSuffix, stdout_list,
                      load_config_for_command_line_help,
                      determine_use_corpus, get_wordlist_path_corpus_stem,
-                     read_word_freq)
+                     read_word_freq, open_output, output_path, write_rows,
+                     COMPRESSION_SUFFIXES)
+from stage_cache import get_stage_cache, source_files
 
 import ngrams
 
@@ -55,6 +60,13 @@ def makeArgParser(configfilename="config.json"):
                         " if this is zero, then the program counts "
                         "all word tokens in the corpus",
                         type=int, default=0)
+    parser.add_argument("--compress", help="compress the .txt outputs "
+                        "(xxx.txt.gz or xxx.txt.zst)",
+                        choices=sorted(COMPRESSION_SUFFIXES), default=None)
+    parser.add_argument("--no-cache", help="run even if the wordlist and "
+                        "the parameters are the same as in the last run "
+                        "(see stage_cache.py)",
+                        action="store_true")
     return parser
 
 
@@ -167,15 +179,11 @@ def OutputSuccessors(outfilename, successors, SF_threshold, reverse=False):
 
     stemlist =  sorted(successors)
 
-    with outfilename.open("w") as f:
-        for word in stemlist:
-            SF_size = len(successors[word])
-
-            if SF_size < SF_threshold:
-                continue
-
-            print(word + "\t" + str(SF_size) + "\t" + \
-                  "\t".join(sorted(successors[word])), file=f)
+    with open_output(outfilename) as f:
+        write_rows(f, (word + "\t" + str(len(successors[word])) + "\t" +
+                       "\t".join(sorted(successors[word]))
+                       for word in stemlist
+                       if len(successors[word]) >= SF_threshold))
 
 def OutputSignatures1(outfilename, successors):
     stemlist = list(successors.keys())
@@ -183,7 +191,7 @@ def OutputSignatures1(outfilename, successors):
     sigs = dict()
     columnwidth = 12
     howmanyperline = 5
-    with outfilename.open("w") as f:
+    with open_output(outfilename) as f:
         for stem in stemlist:
             suffixes= successors[stem]
             if len(suffixes) == 1 and suffixes[0]=="NULL":
@@ -220,12 +228,10 @@ def OutputTrie(outfile, wordlist, WordsBroken, reverse=False):
             WordsBroken_new[i] = [x[::-1] for x in BrokenWord][::-1]
         WordsBroken = WordsBroken_new
 
-    with outfile.open("w") as f:
-        for thisword in wordlist:
-            for j in range(len(WordsBroken[thisword])):
-                thispiece = WordsBroken[thisword][j]
-                print(thispiece, file=f, end="\t")
-            print(file=f)
+    with open_output(outfile) as f:
+        write_rows(f, ("".join(thispiece + "\t"
+                               for thispiece in WordsBroken[thisword])
+                       for thisword in wordlist))
 
 
 def lengthofcommonprefix(s1, s2):
@@ -242,7 +248,7 @@ def lengthofcommonprefix(s1, s2):
 
 def main(language=None, corpus=None, datafolder=None, filename=None,
          MinimumStemLength=4, MinimumAffixLength=1, SF_threshold=3,
-         maxwordtokens=0, use_corpus=True):
+         maxwordtokens=0, use_corpus=True, compress=None, use_cache=True):
 
     print("\n*****************************************************\n"
           "Running the tries.py program now...\n")
@@ -258,6 +264,12 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     print("wordlist file path:\n{}\n".format(wordlist_path))
 
+    if use_corpus and wordlist_path.exists():
+        # make the wordlist again if the corpus file has changed since then
+        ngrams.remake_if_stale(language=language, corpus=corpus,
+                               datafolder=datafolder, filename=filename,
+                               maxwordtokens=maxwordtokens)
+
     if not wordlist_path.exists():
         if use_corpus:
             if maxwordtokens:
@@ -273,7 +285,28 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
             sys.exit("\nThe specified wordlist ""\n"
                      "is not found.".format(wordlist_path))
 
-    wordFreqDict = read_word_freq(wordlist_path)
+    cache = get_stage_cache(language, datafolder, filename)
+    stage = "tries:" + corpusName
+    stage_inputs = [wordlist_path] + \
+                   ngram_store_paths_for_wordlist(wordlist_path)
+    stage_inputs += source_files("tries.py", "ngram_store.py", "lxa5lib.py")
+    stage_params = {"MinimumStemLength": MinimumStemLength,
+                    "MinimumAffixLength": MinimumAffixLength,
+                    "SF_threshold": SF_threshold,
+                    "maxwordtokens": maxwordtokens,
+                    "compress": compress}
+
+    if use_cache and cache.is_fresh(stage, stage_inputs, stage_params):
+        print("The tries.py outputs are up to date (run with --no-cache to "
+              "make them again).")
+        return
+
+    ngram_store = load_ngram_store_for_wordlist(wordlist_path)
+    if ngram_store is not None:
+        # memory-mapped binary store written by ngrams.py
+        wordFreqDict = read_word_freq_from_store(ngram_store)
+    else:
+        wordFreqDict = read_word_freq(wordlist_path)
     wordlist = sorted(wordFreqDict.keys())
     reversedwordlist = sorted([x[::-1] for x in wordlist])
 
@@ -297,6 +330,13 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     outfile_Signatures_name = Path(outfolder, corpusName + "_Signatures.txt")
 
+    # the text outputs, with .gz or .zst added if compressed
+    outfile_SF_txt = output_path(outfile_SF_name, compress)
+    outfile_PF_txt = output_path(outfile_PF_name, compress)
+    outfile_trieLtoR_txt = output_path(outfile_trieLtoR_name, compress)
+    outfile_trieRtoL_txt = output_path(outfile_trieRtoL_name, compress)
+    outfile_Signatures_txt = output_path(outfile_Signatures_name, compress)
+
     #--------------------------------------------------------------------##
     #        Find breaks in words (left-to-right and right-to-left)
     #--------------------------------------------------------------------##
@@ -320,10 +360,10 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     print("computing successors and predecessors...", flush=True)
 
     successors = GetSuccessors(wordlist, WordsBrokenLtoR)
-    OutputSuccessors(outfile_SF_name, successors, SF_threshold)
+    OutputSuccessors(outfile_SF_txt, successors, SF_threshold)
 
     predecessors = GetSuccessors(reversedwordlist, WordsBrokenRtoL)
-    OutputSuccessors(outfile_PF_name, predecessors, SF_threshold, reverse=True)
+    OutputSuccessors(outfile_PF_txt, predecessors, SF_threshold, reverse=True)
 
     outfile_SF_name_json = changeFilenameSuffix(outfile_SF_name, ".json")
     json_pdump(successors, outfile_SF_name_json.open("w"))
@@ -332,7 +372,7 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     json_pdump(predecessors, outfile_PF_name_json.open("w"))
 
     print("printing signatures...", flush=True)
-    OutputSignatures1(outfile_Signatures_name, successors)
+    OutputSignatures1(outfile_Signatures_txt, successors)
 
     #--------------------------------------------------------------------------#
     #        Print tries (left-to-right, right-to-left)
@@ -340,8 +380,8 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
 
     print("printing tries...", flush=True)
 
-    OutputTrie(outfile_trieLtoR_name, wordlist, WordsBrokenLtoR)
-    OutputTrie(outfile_trieRtoL_name, reversedwordlist, WordsBrokenRtoL, reverse=True)
+    OutputTrie(outfile_trieLtoR_txt, wordlist, WordsBrokenLtoR)
+    OutputTrie(outfile_trieRtoL_txt, reversedwordlist, WordsBrokenRtoL, reverse=True)
 
     outfile_trieLtoR_name_json = changeFilenameSuffix(outfile_trieLtoR_name, ".json")
     json_pdump(WordsBrokenLtoR, outfile_trieLtoR_name_json.open("w"))
@@ -349,13 +389,20 @@ def main(language=None, corpus=None, datafolder=None, filename=None,
     outfile_trieRtoL_name_json = changeFilenameSuffix(outfile_trieRtoL_name, ".json")
     json_pdump(WordsBrokenRtoL, outfile_trieRtoL_name_json.open("w"))
 
-    stdout_list("Output files:", outfile_SF_name, outfile_PF_name,
-                                 outfile_trieLtoR_name, outfile_trieRtoL_name,
-                                 outfile_Signatures_name,
+    stdout_list("Output files:", outfile_SF_txt, outfile_PF_txt,
+                                 outfile_trieLtoR_txt, outfile_trieRtoL_txt,
+                                 outfile_Signatures_txt,
                                  outfile_SF_name_json, outfile_PF_name_json,
                                  outfile_trieLtoR_name_json,
                                  outfile_trieRtoL_name_json)
 
+    cache.record(stage, stage_inputs, stage_params,
+                 [outfile_SF_txt, outfile_PF_txt,
+                  outfile_trieLtoR_txt, outfile_trieRtoL_txt,
+                  outfile_Signatures_txt,
+                  outfile_SF_name_json, outfile_PF_name_json,
+                  outfile_trieLtoR_name_json, outfile_trieRtoL_name_json])
+
 
 if __name__ == "__main__":
 
@@ -365,6 +412,8 @@ if __name__ == "__main__":
     MinimumAffixLength = args.minaffix
     SF_threshold = args.minsize
     maxwordtokens = args.maxwordtokens
+    compress = args.compress
+    use_cache = not args.no_cache
 
     description="You are running {}.\n".format(__file__) + \
                 "This program computes tries.\n" + \
@@ -384,5 +433,6 @@ if __name__ == "__main__":
          MinimumStemLength=MinimumStemLength,
          MinimumAffixLength=MinimumAffixLength,
          SF_threshold=SF_threshold,
-         maxwordtokens=maxwordtokens, use_corpus=use_corpus)
+         maxwordtokens=maxwordtokens, use_corpus=use_corpus,
+         compress=compress, use_cache=use_cache)
 